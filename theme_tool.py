@@ -1,16 +1,31 @@
+import base64
 import json
 import os
 import re
 import shutil
-import zipfile
+import sys
 import tkinter as tk
 import tkinter.font as tkfont
+from pathlib import Path
 from tkinter import colorchooser, ttk, filedialog, messagebox, simpledialog
 
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+if TOOLS_DIR not in sys.path:
+    sys.path.insert(0, TOOLS_DIR)
+
+from theme_archive import sidecar_path, write_manifest  # noqa: E402
+from theme_color import parse_color as parse_css_color  # noqa: E402
+from theme_integrity import REQUIRED_ICON_NAMES, TreeSnapshot, check_integrity  # noqa: E402
+from theme_pack import METHOD_NAMES, collect_theme, pack_files  # noqa: E402
+from theme_palette import PaletteCache  # noqa: E402
+from theme_preview import preview_layout  # noqa: E402
+from theme_scene import CanvasScene, RegionIndex, RenderScheduler  # noqa: E402
+from theme_schema import validate_theme  # noqa: E402
+from theme_suggest import PaletteSuggester, SuggestionWorker, apply_suggestion  # noqa: E402
+from theme_thumbs import ThumbnailCache, ThumbnailLoader  # noqa: E402
 
 THEME_SCHEMA_VERSION = "1.0"
 ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
-RGBA_RE = re.compile(r"rgba?\\((\\d+),\\s*(\\d+),\\s*(\\d+)(?:,\\s*([0-9.]+))?\\)")
 
 UI_PALETTE = {
     "bg": "#f6f7fb",
@@ -56,32 +71,6 @@ DEFAULT_LYRIC = {
     "active_bg": "rgba(0,229,255,0.2)",
 }
 
-REQUIRED_ICON_NAMES = [
-    "\u9996\u9875.png",
-    "\u97f3\u91cf.png",
-    "\u97f3\u4e50.png",
-    "\u95f9\u949f.png",
-    "\u8fd4\u56de.png",
-    "\u8ba2\u9605.png",
-    "\u8b66\u544a.png",
-    "\u83dc\u5355.png",
-    "\u6682\u505c.png",
-    "\u64ad\u653e.png",
-    "\u641c\u7d22.png",
-    "\u559c\u6b22.png",
-    "\u52a0\u8f7d.png",
-    "\u52a0.png",
-    "\u5220\u9664.png",
-    "\u51cf.png",
-    "\u5173\u4e8e.png",
-    "\u5149\u76d8.png",
-    "\u4e0d\u559c\u6b22.png",
-    "\u4e0b\u8f7d.png",
-    "\u4e0b\u4e00\u66f2.png",
-    "\u4e0a\u4e00\u66f2.png",
-    "logo.png",
-]
-
 
 def default_theme(theme_id="new_theme"):
     return {
@@ -154,44 +143,13 @@ def rel_path(path):
 
 
 def parse_color(value, fallback="#000000"):
-    if value is None:
-        return fallback
-    text = str(value).strip()
-    if not text:
-        return fallback
-    if text.startswith("#"):
-        return text
-    match = RGBA_RE.match(text)
-    if match:
-        r = max(0, min(255, int(match.group(1))))
-        g = max(0, min(255, int(match.group(2))))
-        b = max(0, min(255, int(match.group(3))))
-        return f"#{r:02x}{g:02x}{b:02x}"
-    return fallback
+    color = parse_css_color(value)
+    return color.hex if color is not None else fallback
 
 
 def parse_rgba(value):
-    if value is None:
-        return None
-    text = str(value).strip().lower()
-    if text.startswith("#") and len(text) in (4, 7):
-        if len(text) == 4:
-            r = int(text[1] * 2, 16)
-            g = int(text[2] * 2, 16)
-            b = int(text[3] * 2, 16)
-        else:
-            r = int(text[1:3], 16)
-            g = int(text[3:5], 16)
-            b = int(text[5:7], 16)
-        return r, g, b, None
-    match = RGBA_RE.match(text)
-    if match:
-        r = int(match.group(1))
-        g = int(match.group(2))
-        b = int(match.group(3))
-        a = match.group(4)
-        return r, g, b, float(a) if a is not None else None
-    return None
+    color = parse_css_color(value)
+    return tuple(color) if color is not None else None
 
 
 def apply_modern_theme(root):
@@ -306,16 +264,6 @@ def validate_id(value):
     return bool(ID_PATTERN.match(value))
 
 
-def validate_paths(data):
-    warnings = []
-    assets = data.get("assets") or {}
-    for key in ("base", "images", "buttons"):
-        val = assets.get(key, "")
-        if ".." in str(val):
-            warnings.append(f"assets.{key} 包含 \"..\": {val}")
-    return warnings
-
-
 def copy_into_project(project_dir, src_path, subdir):
     dest_dir = os.path.join(project_dir, subdir)
     ensure_dir(dest_dir)
@@ -386,8 +334,8 @@ class KeyValueDialog(tk.Toplevel):
         b = int(hex_color[5:7], 16)
         text = (current or "").lower()
         if text.startswith("rgba"):
-            match = RGBA_RE.match(text)
-            alpha = match.group(4) if match and match.group(4) is not None else "1"
+            color = parse_css_color(text)
+            alpha = f"{color.a:g}" if color is not None else "1"
             self.value_var.set(f"rgba({r},{g},{b},{alpha})")
         elif text.startswith("rgb"):
             self.value_var.set(f"rgb({r},{g},{b})")
@@ -558,7 +506,13 @@ class ThemeToolApp:
         self.project_dir = None
         self.theme_data = default_theme()
         self.preview_image = None
+        self.preview_thumbs = ThumbnailCache(wrap=lambda data: tk.PhotoImage(data=base64.b64encode(data)))
+        self.preview_loader = ThumbnailLoader(self.preview_thumbs, self.root.after)
+        self.preview_stats = None
         self.preview_tags = []
+        self.preview_index = RegionIndex()
+        self.palette_cache = PaletteCache()
+        self.palette_worker = SuggestionWorker(PaletteSuggester(), self.root.after)
         self.preview_hover_key = None
         self.preview_status_var = tk.StringVar(value="")
         self.tab_frames = {}
@@ -594,6 +548,7 @@ class ThemeToolApp:
         ttk.Button(actions, text="导出压缩包", command=self.export_zip, style="Accent.TButton").pack(
             side="right", padx=4
         )
+        ttk.Button(actions, text="检查资源", command=self.check_assets).pack(side="right", padx=4)
 
         content = ttk.PanedWindow(self.root, orient="horizontal")
         content.pack(fill="both", expand=True, padx=16, pady=10)
@@ -691,6 +646,7 @@ class ThemeToolApp:
         ttk.Button(quick, text="应用到背景", command=self.apply_app_background).grid(
             row=0, column=5, padx=6, pady=6
         )
+        ttk.Button(quick, text="推荐配色", command=self.suggest_palette).grid(row=0, column=6, padx=6, pady=6)
         quick.columnconfigure(3, weight=1)
 
         self.backgrounds_tree = self.make_tree(frame, ["键", "类型", "值", "适配"])
@@ -802,6 +758,12 @@ class ThemeToolApp:
             bg=UI_PALETTE["card"],
         )
         self.preview_canvas.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+        self.preview_scene = CanvasScene(self.preview_canvas)
+        # Live preview: edits to the fields the preview shows are coalesced into one refresh per frame.
+        self.preview_scheduler = RenderScheduler(self.root.after, self.refresh_preview, self.preview_inputs)
+        for var in (self.name_var, self.app_bg_type_var, self.app_bg_value_var, *self.lyric_vars.values()):
+            var.trace_add("write", self.preview_scheduler.request)
+        self.preview_canvas.bind("<Configure>", self.preview_scheduler.request)
         self.preview_canvas.bind("<Motion>", self.on_preview_hover)
         self.preview_canvas.bind("<Leave>", self.on_preview_leave)
         self.preview_canvas.bind("<Button-1>", self.on_preview_click)
@@ -815,6 +777,17 @@ class ThemeToolApp:
         )
         status.pack(fill="x", padx=12, pady=(0, 10))
 
+    def preview_inputs(self):
+        """Everything a live (traced) change can alter in the preview; unchanged inputs skip the refresh."""
+        return (
+            self.name_var.get(),
+            self.app_bg_type_var.get(),
+            self.app_bg_value_var.get(),
+            *(var.get() for var in self.lyric_vars.values()),
+            self.preview_canvas.winfo_width(),
+            self.preview_canvas.winfo_height(),
+        )
+
     def resolve_asset_path(self, value):
         if not value:
             return None
@@ -825,25 +798,38 @@ class ThemeToolApp:
         return os.path.join(self.project_dir, value)
 
     def load_preview_image(self, path, width, height):
+        """Return ``(image, pending)``; a pending image is decoded on a worker and redrawn when ready."""
         if not path:
-            return None
+            return None, False
         if not os.path.exists(path):
-            return None
+            return None, False
+        # The cache hands back the same PhotoImage while the file and canvas size are unchanged,
+        # so the scene diff sees no change.
+        try:
+            image = self.preview_thumbs.cached(path, width, height)
+            if image is not None:
+                return image, False
+            key = self.preview_loader.request(path, width, height, self.refresh_preview)
+            return None, self.preview_loader.pending(key)
+        except RuntimeError:
+            pass  # no NumPy: integer subsampling of PNGs, on this thread
+        except (OSError, tk.TclError):
+            return None, False
         if not path.lower().endswith(".png"):
-            return None
+            return None, False
         try:
             image = tk.PhotoImage(file=path)
         except Exception:
-            return None
+            return None, False
         iw, ih = image.width(), image.height()
         if iw <= 0 or ih <= 0:
-            return None
+            return None, False
         scale = max(iw / width, ih / height)
         if scale > 1:
             factor = int(scale)
             if factor > 1:
                 image = image.subsample(factor, factor)
-        return image
+        return image, False
 
     def refresh_preview(self):
         if not hasattr(self, "preview_canvas"):
@@ -851,175 +837,33 @@ class ThemeToolApp:
         self.apply_ui_to_theme()
         data = self.theme_data
         canvas = self.preview_canvas
-        canvas.delete("all")
-        self.preview_tags = []
 
         width = max(canvas.winfo_width(), int(canvas["width"]))
         height = max(canvas.winfo_height(), int(canvas["height"]))
 
-        colors = data.get("colors", {})
-        backgrounds = data.get("backgrounds", {})
-        bg_color = parse_color(colors.get("background"), "#f0f0f0")
-        bg = backgrounds.get("app", {})
-        bg_value = bg.get("value") or bg_color
-        self.add_preview_tag(0, 0, width, height, "backgrounds.app", bg_value)
-
-        drew_image = False
+        image, pending = None, False
+        bg = data.get("backgrounds", {}).get("app", {})
         if bg.get("type") == "image":
             image_path = self.resolve_asset_path(bg.get("value"))
-            image = self.load_preview_image(image_path, width, height)
-            if image:
-                self.preview_image = image
-                canvas.create_image(0, 0, anchor="nw", image=image)
-                drew_image = True
-        if not drew_image:
-            if bg.get("type") == "color":
-                bg_color = parse_color(bg.get("value"), bg_color)
-            canvas.create_rectangle(0, 0, width, height, fill=bg_color, outline="")
-            self.preview_image = None
-
-        theme_color = parse_color(colors.get("theme"), "#00E5FF")
-        text_primary = parse_color(colors.get("text_primary"), "#000000")
-        text_secondary = parse_color(colors.get("text_secondary"), "#666666")
-
-        text_cfg = data.get("text", {})
-        title_color = parse_color(text_cfg.get("title"), text_primary)
-        body_color = parse_color(text_cfg.get("body"), text_primary)
-        caption_color = parse_color(text_cfg.get("caption"), text_secondary)
-
-        header_h = 36
-        canvas.create_rectangle(0, 0, width, header_h, fill=theme_color, outline="")
-        self.add_preview_tag(0, 0, width, header_h, "colors.theme", colors.get("theme", theme_color))
-        title = data.get("name") or "主题预览"
-        canvas.create_text(10, header_h / 2, text=title, anchor="w", fill=text_primary)
-        self.add_preview_tag(10, 0, 10 + 160, header_h, "colors.text_primary", colors.get("text_primary", text_primary))
-
-        card = backgrounds.get("card", {})
-        card_color = parse_color(colors.get("background"), "#ffffff")
-        if card.get("type") == "color":
-            card_color = parse_color(card.get("value"), card_color)
-
-        card_x = 14
-        card_y = header_h + 12
-        card_w = width - 28
-        card_h = 90
-        canvas.create_rectangle(card_x, card_y, card_x + card_w, card_y + card_h, fill=card_color, outline="")
-        self.add_preview_tag(
-            card_x,
-            card_y,
-            card_x + card_w,
-            card_y + card_h,
-            "backgrounds.card",
-            card.get("value", card_color),
-        )
-        canvas.create_text(card_x + 10, card_y + 12, text="标题", anchor="nw", fill=title_color)
-        canvas.create_text(card_x + 10, card_y + 36, text="正文文本", anchor="nw", fill=body_color)
-        canvas.create_text(card_x + 10, card_y + 60, text="说明文本", anchor="nw", fill=caption_color)
-        self.add_preview_tag(card_x + 10, card_y + 8, card_x + 120, card_y + 26, "text.title", text_cfg.get("title"))
-        self.add_preview_tag(card_x + 10, card_y + 32, card_x + 140, card_y + 50, "text.body", text_cfg.get("body"))
-        self.add_preview_tag(
-            card_x + 10, card_y + 56, card_x + 140, card_y + 74, "text.caption", text_cfg.get("caption")
-        )
-
-        btn_y = card_y + card_h + 16
-        btn_h = 28
-        btn_w = (width - 36) // 2
-        primary = data.get("buttons", {}).get("primary", {})
-        danger = data.get("buttons", {}).get("danger", {})
-        primary_bg = parse_color(primary.get("bg"), theme_color)
-        primary_text = parse_color(primary.get("text"), text_primary)
-        danger_bg = parse_color(danger.get("bg"), "#FF3B30")
-        danger_text = parse_color(danger.get("text"), "#FF3B30")
-
-        canvas.create_rectangle(card_x, btn_y, card_x + btn_w, btn_y + btn_h, fill=primary_bg, outline="")
-        canvas.create_text(card_x + btn_w / 2, btn_y + btn_h / 2, text="主按钮", fill=primary_text)
-        self.add_preview_tag(
-            card_x, btn_y, card_x + btn_w, btn_y + btn_h, "buttons.primary.bg", primary.get("bg")
-        )
-        self.add_preview_tag(
-            card_x,
-            btn_y,
-            card_x + btn_w,
-            btn_y + btn_h,
-            "buttons.primary.text",
-            primary.get("text"),
-        )
-        canvas.create_rectangle(
-            card_x + btn_w + 8,
-            btn_y,
-            card_x + btn_w + 8 + btn_w,
-            btn_y + btn_h,
-            fill=danger_bg,
-            outline="",
-        )
-        canvas.create_text(
-            card_x + btn_w + 8 + btn_w / 2,
-            btn_y + btn_h / 2,
-            text="危险",
-            fill=danger_text,
-        )
-        self.add_preview_tag(
-            card_x + btn_w + 8,
-            btn_y,
-            card_x + btn_w + 8 + btn_w,
-            btn_y + btn_h,
-            "buttons.danger.bg",
-            danger.get("bg"),
-        )
-        self.add_preview_tag(
-            card_x + btn_w + 8,
-            btn_y,
-            card_x + btn_w + 8 + btn_w,
-            btn_y + btn_h,
-            "buttons.danger.text",
-            danger.get("text"),
-        )
-
-        slider_y = btn_y + btn_h + 18
-        slider_x1 = card_x
-        slider_x2 = width - card_x
-        slider_un = parse_color(colors.get("slider_unselected"), "#cccccc")
-        slider_sel = parse_color(colors.get("slider_selected"), theme_color)
-        canvas.create_rectangle(slider_x1, slider_y, slider_x2, slider_y + 6, fill=slider_un, outline="")
-        canvas.create_rectangle(
-            slider_x1,
-            slider_y,
-            slider_x1 + int((slider_x2 - slider_x1) * 0.6),
-            slider_y + 6,
-            fill=slider_sel,
-            outline="",
-        )
-        self.add_preview_tag(
-            slider_x1, slider_y, slider_x2, slider_y + 6, "colors.slider_unselected", colors.get("slider_unselected")
-        )
-        self.add_preview_tag(
-            slider_x1,
-            slider_y,
-            slider_x1 + int((slider_x2 - slider_x1) * 0.6),
-            slider_y + 6,
-            "colors.slider_selected",
-            colors.get("slider_selected"),
-        )
-
-        lyric_cfg = data.get("lyric", {})
-        lyric_active = parse_color(lyric_cfg.get("active"), theme_color)
-        lyric_normal = parse_color(lyric_cfg.get("normal"), text_secondary)
-        lyric_y = slider_y + 18
-        canvas.create_text(card_x, lyric_y, text="歌词高亮", anchor="nw", fill=lyric_active)
-        canvas.create_text(card_x, lyric_y + 20, text="歌词普通", anchor="nw", fill=lyric_normal)
-        self.add_preview_tag(card_x, lyric_y, card_x + 120, lyric_y + 16, "lyric.active", lyric_cfg.get("active"))
-        self.add_preview_tag(
-            card_x, lyric_y + 20, card_x + 120, lyric_y + 36, "lyric.normal", lyric_cfg.get("normal")
-        )
-
-    def add_preview_tag(self, x1, y1, x2, y2, field, value):
-        self.preview_tags.append((x1, y1, x2, y2, field, value))
+            image, pending = self.load_preview_image(image_path, width, height)
+        self.preview_image = image
+
+        # Effective colors are resolved once per edit; Tk has no alpha, so they arrive composited.
+        # The layout is shared with the headless preview.png renderer (tools/theme_preview.py).
+        palette = self.palette_cache.get(data)
+        layout = preview_layout(data, palette, width, height, image=image, loading=pending)
+        self.preview_tags = layout.regions
+
+        stats = self.preview_scene.update(layout.items)
+        self.preview_index.rebuild(self.preview_tags)
+        self.preview_scheduler.mark_rendered()
+        self.preview_stats = stats
+        if self.preview_hover_key is None:
+            self.preview_status_var.set(f"预览已刷新：更新 {stats.touched} 个图元，耗时 {stats.elapsed * 1000:.1f} ms")
 
     def get_preview_tag_at(self, x, y):
-        for x1, y1, x2, y2, field, value in reversed(self.preview_tags):
-            if x1 <= x <= x2 and y1 <= y <= y2:
-                return field, value
-        return None
+        region = self.preview_index.hit(x, y)
+        return region[4:] if region else None
 
     def on_preview_hover(self, event):
         tag = self.get_preview_tag_at(event.x, event.y)
@@ -1029,13 +873,12 @@ class ThemeToolApp:
                 self.preview_canvas.configure(cursor="")
                 self.preview_hover_key = None
             return
-        field, value = tag
-        key = f"{field}:{value}"
-        if key != self.preview_hover_key:
+        if tag != self.preview_hover_key:
+            field, value = tag
             display = value if value not in (None, "") else "-"
             self.preview_status_var.set(f"{field}: {display} (点击编辑)")
             self.preview_canvas.configure(cursor="hand2")
-            self.preview_hover_key = key
+            self.preview_hover_key = tag
 
     def on_preview_leave(self, _event):
         self.preview_status_var.set("")
@@ -1210,6 +1053,43 @@ class ThemeToolApp:
         rel = copy_into_project(self.project_dir, src, "images")
         self.app_bg_value_var.set(rel)
         self.app_bg_type_var.set("image")
+        self.suggest_palette()
+
+    def suggest_palette(self):
+        if self.app_bg_type_var.get() != "image":
+            messagebox.showerror("无法推荐配色", "请先为应用背景选择一张图片。")
+            return
+        image_path = self.resolve_asset_path(self.app_bg_value_var.get().strip())
+        if not image_path or not os.path.isfile(image_path):
+            messagebox.showerror("无法推荐配色", "找不到应用背景图片。")
+            return
+        self.apply_ui_to_theme()
+        self.palette_worker.request(image_path, self.theme_data, self.on_palette_suggested)
+        self.preview_status_var.set("正在根据背景图生成配色…")
+
+    def on_palette_suggested(self, image_path, suggestion, error):
+        self.preview_status_var.set("")
+        current = self.resolve_asset_path(self.app_bg_value_var.get().strip())
+        if self.app_bg_type_var.get() != "image" or current != image_path:
+            return  # the background changed while the image was being analysed
+        if error is not None:
+            if not isinstance(error, (OSError, ValueError, RuntimeError)):
+                raise error
+            messagebox.showerror("无法推荐配色", f"读取背景图片失败：{error}")
+            return
+        colors = suggestion.palette["colors"]
+        summary = "\n".join(f"{key}: {colors[key]}" for key in REQUIRED_COLOR_KEYS if key in colors)
+        note = "" if not suggestion.failures else "\n\n以下对比度仍未达标：\n" + "\n".join(suggestion.failures)
+        if not messagebox.askyesno(
+            "推荐配色",
+            f"已根据背景图生成配色（文字对比度满足 WCAG AA）：\n\n{summary}{note}\n\n"
+            "应用到颜色、文字、歌词和按钮吗？",
+        ):
+            return
+        # Pick up edits made while the suggestion was being computed.
+        self.apply_ui_to_theme()
+        self.theme_data = apply_suggestion(self.theme_data, suggestion.palette)
+        self.load_theme_into_ui()
 
     def sync_app_background_to_tree(self):
         if not hasattr(self, "backgrounds_tree"):
@@ -1327,21 +1207,53 @@ class ThemeToolApp:
         if not validate_id(theme_id):
             messagebox.showerror("ID 无效", "主题 ID 只能包含小写字母、数字和下划线。")
             return
-        warnings = validate_paths(self.theme_data)
-        if warnings:
-            messagebox.showwarning("路径警告", "\n".join(warnings))
-        theme_path = os.path.join(self.project_dir, "theme.json")
         output = build_theme_output(self.theme_data)
+        report = validate_theme(output)
+        if report.errors:
+            issues = "\n".join(str(issue) for issue in report.errors[:20])
+            more = f"\n……共 {len(report.errors)} 项" if len(report.errors) > 20 else ""
+            if not messagebox.askyesno("校验未通过", f"theme.json 存在以下问题：\n{issues}{more}\n\n仍然保存吗？"):
+                return
+        elif report.warnings:
+            messagebox.showwarning("校验警告", "\n".join(str(issue) for issue in report.warnings))
+        theme_path = os.path.join(self.project_dir, "theme.json")
         write_json(theme_path, output)
         self.update_icon_status()
         self.refresh_preview()
         messagebox.showinfo("已保存", "主题保存成功。")
 
+    def run_integrity_check(self):
+        snapshot = TreeSnapshot.from_directory(Path(self.project_dir))
+        return check_integrity(build_theme_output(self.theme_data), snapshot)
+
+    def check_assets(self):
+        if not self.project_dir:
+            messagebox.showerror("未打开主题", "请先新建或打开主题。")
+            return
+        self.apply_ui_to_theme()
+        report = self.run_integrity_check()
+        lines = [str(issue) for issue in report.errors]
+        lines += [str(issue) for issue in report.warnings if not issue.message.startswith("unreferenced file")]
+        if report.unreferenced:
+            lines.append(f"未被引用的文件 {len(report.unreferenced)} 个（{report.unreferenced_bytes} 字节）：")
+            lines += [f"  {rel}" for rel in report.unreferenced[:20]]
+        if report.errors:
+            messagebox.showwarning("资源缺失", "\n".join(lines))
+        elif lines:
+            messagebox.showinfo("资源检查", "引用的资源均存在。\n" + "\n".join(lines))
+        else:
+            messagebox.showinfo("资源检查", f"引用的资源均存在（{len(report.referenced)} 项），没有多余文件。")
+
     def export_zip(self):
         if not self.project_dir:
             messagebox.showerror("未打开主题", "请先新建或打开主题。")
             return
         self.save_project()
+        report = self.run_integrity_check()
+        if report.errors:
+            issues = "\n".join(str(issue) for issue in report.errors[:20])
+            if not messagebox.askyesno("资源缺失", f"以下引用的资源不存在：\n{issues}\n\n仍然导出吗？"):
+                return
         theme_id = self.theme_data.get("id", "theme")
         default_name = f"{theme_id}.zip"
         output = filedialog.asksaveasfilename(
@@ -1349,22 +1261,26 @@ class ThemeToolApp:
         )
         if not output:
             return
-        root_name = theme_id
-        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
-            for root, _dirs, files in os.walk(self.project_dir):
-                rel_root = os.path.relpath(root, self.project_dir)
-                for filename in files:
-                    if filename == "image_map.json":
-                        continue
-                    if filename.startswith("."):
-                        continue
-                    src = os.path.join(root, filename)
-                    if rel_root == ".":
-                        arcname = os.path.join(root_name, filename)
-                    else:
-                        arcname = os.path.join(root_name, rel_root, filename)
-                    zf.write(src, arcname)
-        messagebox.showinfo("已导出", f"压缩包已导出：{output}")
+        try:
+            sources, scan = collect_theme(Path(self.project_dir), theme_id)
+            result = pack_files(sources, Path(output), deterministic=True)
+            write_manifest(sidecar_path(Path(output)), result.manifest)
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("导出失败", f"导出压缩包出错：{exc}")
+            return
+        methods = {}
+        for entry in result.report:
+            name = METHOD_NAMES[entry.method]
+            methods[name] = methods.get(name, 0) + 1
+        summary = "，".join(f"{name} {count}" for name, count in sorted(methods.items()))
+        messagebox.showinfo(
+            "已导出",
+            f"压缩包已导出：{output}\n{result.entries} 个文件（{summary}），"
+            f"{result.bytes_in} → {result.bytes_out} 字节，耗时 {result.elapsed * 1000:.0f} ms\n"
+            f"已按 .themeignore 忽略 {len(scan.skipped_files)} 个文件（{scan.skipped_bytes} 字节）、"
+            f"{len(scan.pruned_dirs)} 个目录\n"
+            f"SHA-256：{result.sha256}",
+        )
 
     def add_color(self):
         dlg = KeyValueDialog(self.root, "添加颜色")
@@ -1648,6 +1564,8 @@ def main():
     apply_modern_theme(root)
     app = ThemeToolApp(root)
     root.mainloop()
+    app.preview_loader.shutdown()
+    app.palette_worker.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the theme tooling.
+
+Usage examples:
+  python tools/benchmark.py pack
+  python tools/benchmark.py pack --workers 1 2 4 8 --image-mb 8
+  python tools/benchmark.py validate --docs 50000
+  python tools/benchmark.py colors
+  python tools/benchmark.py thumbs --size 3840 2160
+  python tools/benchmark.py suggest --size 3840 2160
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import json
+import random
+import sys
+import struct
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import theme_color
+import theme_raster
+from theme_builder_reference import default_theme
+from theme_color import RGBA, parse_color, parse_palette
+from theme_pack import collect_directory, pack_files
+from theme_png import PNG_SIGNATURE, chunk
+from theme_schema import validate_theme
+from theme_suggest import SAMPLE_SIDE, PaletteSuggester, SuggestionWorker
+from theme_thumbs import ThumbnailCache
+
+
+ICON_NAMES = [f"icon_{index:02d}.png" for index in range(23)]
+
+
+def _noisy_bytes(rng: random.Random, size: int) -> bytes:
+    """Partly compressible payload, roughly like exported PNG art."""
+    out = bytearray()
+    while len(out) < size:
+        run = rng.randbytes(rng.randint(64, 512))
+        out += run
+        out += run[: rng.randint(0, len(run))] * rng.randint(1, 4)
+    return bytes(out[:size])
+
+
+def make_synthetic_theme(root: Path, image_mb: float, seed: int = 0) -> Path:
+    rng = random.Random(seed)
+    theme_dir = root / "synthetic"
+    (theme_dir / "icons").mkdir(parents=True, exist_ok=True)
+    (theme_dir / "images").mkdir(parents=True, exist_ok=True)
+    (theme_dir / "buttons").mkdir(parents=True, exist_ok=True)
+    data = default_theme("synthetic", "Synthetic", "bench", "benchmark fixture")
+    (theme_dir / "theme.json").write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    for name in ICON_NAMES:
+        (theme_dir / "icons" / name).write_bytes(_noisy_bytes(rng, 8 * 1024))
+    for name in ("primary.png", "danger.png"):
+        (theme_dir / "buttons" / name).write_bytes(_noisy_bytes(rng, 256 * 1024))
+    for name in ("bg_app.png", "bg_player.png", "bg_home.png", "cd.png"):
+        (theme_dir / "images" / name).write_bytes(_noisy_bytes(rng, int(image_mb * 1024 * 1024)))
+    (theme_dir / "preview.png").write_bytes(_noisy_bytes(rng, 512 * 1024))
+    return theme_dir
+
+
+def bench_pack(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        theme_dir = make_synthetic_theme(root, args.image_mb)
+        sources = collect_directory(theme_dir)
+        total = sum(item.path.stat().st_size for item in sources)
+        print(f"synthetic theme: {len(sources)} files, {total / 1e6:.1f} MB")
+
+        digests = set()
+        baseline = None
+        for workers in args.workers:
+            output = root / f"out_{workers}.zip"
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                pack_files(sources, output, workers=workers, deterministic=True)
+                best = min(best, time.perf_counter() - started)
+            digests.add(hashlib.sha256(output.read_bytes()).hexdigest())
+            baseline = baseline or best
+            print(
+                f"workers={workers:<3} best={best * 1000:8.1f} ms  "
+                f"{total / best / 1e6:7.1f} MB/s  speedup x{baseline / best:.2f}"
+            )
+
+    if len(digests) != 1:
+        print("error: archives differ between worker counts", file=sys.stderr)
+        return 1
+    print("archives are byte-identical across worker counts")
+    return 0
+
+
+def make_theme_documents(count: int, seed: int = 0) -> list[dict]:
+    """Default themes with varied colors; every tenth one carries a few schema errors."""
+    rng = random.Random(seed)
+    base = default_theme("bench", "Bench", "bench", "benchmark fixture")
+    docs = []
+    for index in range(count):
+        doc = copy.deepcopy(base)
+        doc["id"] = f"theme_{index}"
+        for key in doc["colors"]:
+            doc["colors"][key] = f"#{rng.randrange(1 << 24):06x}"
+        doc["backgrounds"]["app"] = {"type": "image", "value": "images/bg_app.png", "objectFit": "cover"}
+        if index % 10 == 0:
+            doc["colors"]["theme"] = "rgba(300,0,0,1)"
+            doc["assets"]["images"] = "../images"
+            del doc["version"]
+        docs.append(doc)
+    return docs
+
+
+# (background override, expected error paths) checked before every validate run.
+SCHEMA_CORPUS = [
+    ({"type": "image", "value": "images/bg_app.png"}, []),
+    ({"type": "color", "value": "#102030"}, []),
+    ({"type": "color", "value": "nope"}, ["$.backgrounds.app.value"]),
+    ({"type": "image", "value": "../bg.png"}, ["$.backgrounds.app.value"]),
+    ({"type": "video", "value": "bg.mp4"}, ["$.backgrounds.app.type"]),
+    ({"type": {"kind": "image"}, "value": "bg.png"}, ["$.backgrounds.app.type"]),
+    ({"type": ["image"], "value": "bg.png"}, ["$.backgrounds.app.type"]),
+    ({"type": 1, "value": "bg.png"}, ["$.backgrounds.app.type"]),
+    ({"type": None, "value": "bg.png"}, ["$.backgrounds.app.type"]),
+]
+
+
+def check_schema_corpus() -> list[str]:
+    base = default_theme("bench", "Bench", "bench", "benchmark fixture")
+    failures = []
+    for background, expected in SCHEMA_CORPUS:
+        doc = copy.deepcopy(base)
+        doc["backgrounds"]["app"] = background
+        try:
+            got = sorted(issue.path for issue in validate_theme(doc).errors)
+        except Exception as exc:
+            failures.append(f"{background!r}: raised {exc!r}")
+            continue
+        if got != expected:
+            failures.append(f"{background!r}: expected errors at {expected}, got {got}")
+    return failures
+
+
+def bench_validate(args: argparse.Namespace) -> int:
+    failures = check_schema_corpus()
+    for failure in failures:
+        print(f"error: {failure}", file=sys.stderr)
+    if failures:
+        return 1
+    print(f"schema corpus: {len(SCHEMA_CORPUS)} cases ok")
+
+    docs = make_theme_documents(args.docs)
+    best = float("inf")
+    failed = 0
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        failed = sum(not validate_theme(doc).ok for doc in docs)
+        best = min(best, time.perf_counter() - started)
+    print(
+        f"validated {len(docs)} documents in {best * 1000:.1f} ms "
+        f"({len(docs) / best:,.0f} docs/s, {failed} with errors)"
+    )
+    expected = (len(docs) + 9) // 10
+    if failed != expected:
+        print(f"error: expected {expected} invalid documents, got {failed}", file=sys.stderr)
+        return 1
+    return 0
+
+
+# (input, expected) pairs checked before every colors run; None means rejected.
+COLOR_CORPUS = [
+    ("#fff", RGBA(255, 255, 255)),
+    ("#FFF", RGBA(255, 255, 255)),
+    ("#0f08", RGBA(0, 255, 0, 136 / 255)),
+    ("#00E5FF", RGBA(0, 229, 255)),
+    ("  #00e5ff  ", RGBA(0, 229, 255)),
+    ("#00e5ff80", RGBA(0, 229, 255, 128 / 255)),
+    ("#00e5ff00", RGBA(0, 229, 255, 0.0)),
+    ("rgb(255,0,0)", RGBA(255, 0, 0)),
+    ("rgb( 255 , 0 , 0 )", RGBA(255, 0, 0)),
+    ("RGB(255,0,0)", RGBA(255, 0, 0)),
+    ("rgba(0,0,0,0.35)", RGBA(0, 0, 0, 0.35)),
+    ("rgba(255, 255, 255, .5)", RGBA(255, 255, 255, 0.5)),
+    ("rgba(255,255,255,1)", RGBA(255, 255, 255)),
+    ("rgba(10,20,30)", RGBA(10, 20, 30)),
+    ("rgb(10,20,30,0.5)", RGBA(10, 20, 30, 0.5)),
+    ("rgb(100% 0% 50%)", RGBA(255, 0, 128)),
+    ("rgb(0 128 255 / 25%)", RGBA(0, 128, 255, 0.25)),
+    ("hsl(0, 100%, 50%)", RGBA(255, 0, 0)),
+    ("hsl(120,100%,25%)", RGBA(0, 128, 0)),
+    ("hsl(240deg 100% 50%)", RGBA(0, 0, 255)),
+    ("hsl(-120, 100%, 50%)", RGBA(0, 0, 255)),
+    ("hsl(0, 0%, 100%)", RGBA(255, 255, 255)),
+    ("hsla(187, 100%, 50%, 0.5)", RGBA(0, 225, 255, 0.5)),
+    ("transparent", RGBA(0, 0, 0, 0.0)),
+    ("#ff", None),
+    ("#fffff", None),
+    ("#ggg", None),
+    ("#+fff", None),
+    ("#f_ff", None),
+    ("#0x0fff", None),
+    ("#\u0663\u0663\u0663", None),
+    ("rgba(300,0,0,1)", None),
+    ("rgba(-1,0,0,1)", None),
+    ("rgba(0,0,0,1.5)", None),
+    ("rgba(0,0,0", None),
+    ("rgb(0,0)", None),
+    ("rgb(0,,0)", None),
+    ("hsl(0, 100, 50)", None),
+    ("hsl(0, 120%, 50%)", None),
+    ("cmyk(0,0,0,0)", None),
+    ("red", None),
+    ("", None),
+    (None, None),
+    (123, None),
+]
+
+
+def check_color_corpus() -> list[str]:
+    failures = []
+    for text, expected in COLOR_CORPUS:
+        got = parse_color(text)
+        if expected is None or got is None:
+            ok = got is expected
+        else:
+            ok = got[:3] == expected[:3] and abs(got.a - expected.a) < 1e-9
+        if not ok:
+            failures.append(f"{text!r}: expected {expected}, got {got}")
+    return failures
+
+
+def make_color_strings(count: int, distinct: int, seed: int = 0) -> list[str]:
+    """``count`` color strings drawn from ``distinct`` values in every supported syntax."""
+    rng = random.Random(seed)
+    pool = []
+    for index in range(distinct):
+        r, g, b = rng.randrange(256), rng.randrange(256), rng.randrange(256)
+        pool.append(
+            [
+                f"#{r:02x}{g:02x}{b:02x}",
+                f"#{r:02X}{g:02X}{b:02X}{rng.randrange(256):02X}",
+                f"rgb({r},{g},{b})",
+                f"rgba({r}, {g}, {b}, {rng.random():.2f})",
+                f"hsl({rng.randrange(360)}, {rng.randrange(101)}%, {rng.randrange(101)}%)",
+            ][index % 5]
+        )
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def bench_colors(args: argparse.Namespace) -> int:
+    failures = check_color_corpus()
+    for failure in failures:
+        print(f"error: {failure}", file=sys.stderr)
+    if failures:
+        return 1
+    print(f"color corpus: {len(COLOR_CORPUS)} cases ok")
+
+    values = make_color_strings(args.colors, args.distinct)
+    uncached = theme_color._parse_text.__wrapped__
+    timings = {}
+    for label, parse in (("uncached", uncached), ("cached", parse_color)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for value in values:
+                parse(value)
+            best = min(best, time.perf_counter() - started)
+        timings[label] = best
+        print(f"{label:<9} {len(values)} colors in {best * 1000:7.1f} ms  ({len(values) / best:,.0f} colors/s)")
+    print(f"cache speedup x{timings['uncached'] / timings['cached']:.1f}  {theme_color.cache_info()}")
+
+    docs = make_theme_documents(args.colors // 20)
+    best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        for doc in docs:
+            parse_palette(doc)
+        best = min(best, time.perf_counter() - started)
+    print(f"palette   {len(docs)} themes in {best * 1000:7.1f} ms  ({len(docs) / best:,.0f} themes/s)")
+    return 0
+
+
+def make_background_png(width: int, height: int, seed: int = 0) -> bytes:
+    """An opaque gradient with noise: photo-like enough that it does not compress to nothing."""
+    np = theme_raster.np
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width]
+    pixels = np.empty((height, width, 4), np.uint8)
+    pixels[..., 0] = xs * 255 // max(1, width - 1)
+    pixels[..., 1] = ys * 255 // max(1, height - 1)
+    pixels[..., 2] = rng.integers(0, 64, (height, width))
+    pixels[..., 3] = 255
+    return theme_raster.encode_png(pixels)
+
+
+def bench_thumbs(args: argparse.Namespace) -> int:
+    try:
+        theme_raster.require_numpy()
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    width, height = args.size
+    target_w, target_h = args.target
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "bg.png"
+        source.write_bytes(make_background_png(width, height))
+        print(f"source {width}x{height} PNG, {source.stat().st_size / 1e6:.1f} MB -> fit {target_w}x{target_h}")
+        timings = {"decode": float("inf"), "disk": float("inf"), "memory": float("inf")}
+        for run in range(args.repeat):
+            cache_dir = Path(tmp) / f"cache{run}"
+            for label in ("decode", "disk", "memory"):
+                if label != "memory":
+                    cache = ThumbnailCache(cache_dir)
+                started = time.perf_counter()
+                cache.get(source, target_w, target_h)
+                timings[label] = min(timings[label], time.perf_counter() - started)
+        for label, best in timings.items():
+            print(f"{label:<7} {best * 1000:9.2f} ms")
+    return 0
+
+
+def make_paeth_png(width: int, height: int, seed: int = 0) -> bytes:
+    """The ``make_background_png`` image with every scanline Paeth-filtered, the slowest one to decode."""
+    np = theme_raster.np
+    pixels = theme_raster.decode_png(make_background_png(width, height, seed)).astype(np.int16)
+    a = np.zeros_like(pixels)
+    a[:, 1:] = pixels[:, :-1]
+    b = np.zeros_like(pixels)
+    b[1:] = pixels[:-1]
+    c = np.zeros_like(pixels)
+    c[1:, 1:] = pixels[:-1, :-1]
+    pa, pb, pc = np.abs(b - c), np.abs(a - c), np.abs(a + b - 2 * c)
+    predicted = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    scanlines = np.empty((height, width * 4 + 1), np.uint8)
+    scanlines[:, 0] = 4
+    scanlines[:, 1:] = ((pixels - predicted) & 0xFF).reshape(height, width * 4)
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"".join(
+        (
+            PNG_SIGNATURE,
+            chunk(b"IHDR", header),
+            chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+            chunk(b"IEND", b""),
+        )
+    )
+
+
+def run_suggestion(worker: SuggestionWorker, pending: list, source: Path) -> dict:
+    """Drive ``worker`` like the Tk loop does and time what runs on the calling (UI) thread."""
+    delivered = []
+    started = time.perf_counter()
+    worker.request(source, {}, lambda *result: delivered.append(result))
+    timings = {"request": time.perf_counter() - started, "longest poll": 0.0, "longest gap": 0.0}
+    last = time.perf_counter()
+    while not delivered:
+        time.sleep(0.005)  # an idle event loop iteration
+        now = time.perf_counter()
+        timings["longest gap"] = max(timings["longest gap"], now - last)
+        for callback in pending[:]:
+            pending.remove(callback)
+            poll_started = time.perf_counter()
+            callback()
+            timings["longest poll"] = max(timings["longest poll"], time.perf_counter() - poll_started)
+        last = time.perf_counter()
+    timings["delivered"] = time.perf_counter() - started
+    _path, _suggestion, error = delivered[0]
+    if error is not None:
+        raise error
+    return timings
+
+
+def bench_suggest(args: argparse.Namespace) -> int:
+    try:
+        theme_raster.require_numpy()
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    width, height = args.size
+    pending: list = []
+    after = lambda _ms, callback: pending.append(callback)  # noqa: E731
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "bg.png"
+        source.write_bytes(make_paeth_png(width, height))
+        print(f"source {width}x{height} Paeth PNG, {source.stat().st_size / 1e6:.1f} MB")
+        results = {}
+        worker = SuggestionWorker(PaletteSuggester(Path(tmp) / "palette"), after)
+        try:
+            results["decode"] = run_suggestion(worker, pending, source)
+            results["memory"] = run_suggestion(worker, pending, source)
+        finally:
+            worker.shutdown()
+        worker = SuggestionWorker(PaletteSuggester(Path(tmp) / "palette"), after)
+        try:
+            results["disk"] = run_suggestion(worker, pending, source)
+        finally:
+            worker.shutdown()
+    print(f"{'':<7} {'request':>9} {'poll':>9} {'gap':>9} {'ready':>9}  (ms; all but ready run on the UI thread)")
+    worst = 0.0
+    for label, timings in results.items():
+        print(
+            f"{label:<7} {timings['request'] * 1000:9.2f} {timings['longest poll'] * 1000:9.2f} "
+            f"{timings['longest gap'] * 1000:9.2f} {timings['delivered'] * 1000:9.1f}"
+        )
+        worst = max(worst, timings["request"], timings["longest poll"], timings["longest gap"])
+    cold = results["decode"]["delivered"] * 1000
+    if cold > args.target_ms:
+        # Not a failure: the UI stays responsive, but the result is late and the report should say so.
+        decoder = "Pillow" if theme_raster.Image is not None else "the NumPy PNG decoder (Pillow not installed)"
+        print(
+            f"note: a cold suggestion is ready after {cold:.0f} ms, over the {args.target_ms:g} ms target; "
+            f"{decoder} has to reconstruct every scanline before the {SAMPLE_SIDE}px sample can be taken. "
+            "Repeats are served from the swatch cache."
+        )
+    if worst * 1000 > args.budget_ms:
+        print(f"error: the UI thread was blocked for {worst * 1000:.1f} ms (budget {args.budget_ms} ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks for the theme tooling")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = sub.add_parser("pack", help="serial vs parallel pack throughput")
+    pack_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to compare")
+    pack_parser.add_argument("--image-mb", type=float, default=4.0, help="size of each synthetic background")
+    pack_parser.add_argument("--repeat", type=int, default=3, help="runs per worker count (best is reported)")
+    pack_parser.set_defaults(func=bench_pack)
+
+    validate_parser = sub.add_parser("validate", help="schema regression corpus and validator throughput")
+    validate_parser.add_argument("--docs", type=int, default=20000, help="number of theme.json documents")
+    validate_parser.add_argument("--repeat", type=int, default=3, help="runs (best is reported)")
+    validate_parser.set_defaults(func=bench_validate)
+
+    colors_parser = sub.add_parser("colors", help="color parser correctness corpus and throughput")
+    colors_parser.add_argument("--colors", type=int, default=200000, help="color strings to parse per run")
+    colors_parser.add_argument("--distinct", type=int, default=500, help="distinct values among them")
+    colors_parser.add_argument("--repeat", type=int, default=3, help="runs (best is reported)")
+    colors_parser.set_defaults(func=bench_colors)
+
+    thumbs_parser = sub.add_parser("thumbs", help="preview thumbnail decode vs disk vs memory cache")
+    thumbs_parser.add_argument("--size", type=int, nargs=2, default=[3840, 2160], help="source image width height")
+    thumbs_parser.add_argument("--target", type=int, nargs=2, default=[280, 420], help="preview box width height")
+    thumbs_parser.add_argument("--repeat", type=int, default=3, help="runs (best is reported)")
+    thumbs_parser.set_defaults(func=bench_thumbs)
+
+    suggest_parser = sub.add_parser("suggest", help="palette suggestion latency seen by the editor's UI thread")
+    suggest_parser.add_argument("--size", type=int, nargs=2, default=[3840, 2160], help="source image width height")
+    suggest_parser.add_argument("--budget-ms", type=float, default=100.0, help="longest allowed UI-thread stall")
+    suggest_parser.add_argument(
+        "--target-ms", type=float, default=100.0, help="time to a cold suggestion; a miss is reported, not failed"
+    )
+    suggest_parser.set_defaults(func=bench_suggest)
+
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
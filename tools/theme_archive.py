@@ -0,0 +1,211 @@
+"""Reading side of theme packages: root detection, manifests and verification.
+
+``manifest.json`` lists the size and SHA-256 of every file in a package,
+keyed by its path relative to the theme root. The packer embeds it as the
+last archive entry and can also write it next to the ZIP.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+
+def normalize_path(raw: str) -> str:
+    return str(raw or "").replace("\\", "/").lstrip("/")
+
+
+def detect_single_root(names: Iterable[str]) -> str | None:
+    """Same rule as the catalog builder: the common first segment if there is exactly one."""
+    roots = set()
+    for name in names:
+        first = normalize_path(name).split("/")[0]
+        if not first:
+            continue
+        roots.add(first)
+        if len(roots) > 1:
+            return None
+    return roots.pop() if len(roots) == 1 else None
+
+
+def strip_root(name: str, root: str | None) -> str:
+    name = normalize_path(name)
+    if root and name.startswith(f"{root}/"):
+        return name[len(root) + 1 :]
+    return name
+
+
+def member_name(info: zipfile.ZipInfo) -> str:
+    """Entry name with legacy encodings repaired.
+
+    Names without the UTF-8 flag are decoded as CP437 by ``zipfile``; many
+    tools still write UTF-8 (Info-ZIP) or GBK (Windows) bytes there, and
+    icon file names are Chinese, so both are tried before CP437.
+    """
+    name = info.filename
+    if not info.flag_bits & 0x800:
+        try:
+            raw = name.encode("cp437")
+        except UnicodeEncodeError:
+            return normalize_path(name)
+        for encoding in ("utf-8", "gbk"):
+            try:
+                name = raw.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+    return normalize_path(name)
+
+
+def find_theme_json(names: Iterable[str]) -> str | None:
+    """Pick theme.json the way the catalog builder does: under the single root, at the top, then anywhere."""
+    names = [normalize_path(name) for name in names if not name.endswith("/")]
+    root = detect_single_root(names)
+    candidates = [f"{root}/theme.json"] if root else []
+    candidates.append("theme.json")
+    candidates += [name for name in names if name.lower().endswith("/theme.json")]
+    present = set(names)
+    return next((name for name in candidates if name in present), None)
+
+
+@dataclass
+class PackageListing:
+    """A package's theme.json and file list, read from the central directory only."""
+
+    theme_json: str
+    data: dict
+    files: dict[str, zipfile.ZipInfo]
+
+
+def read_package(zf: zipfile.ZipFile) -> PackageListing:
+    """Parse theme.json from memory and list members relative to its directory."""
+    infos = {member_name(info): info for info in zf.infolist() if not info.is_dir()}
+    member = find_theme_json(infos)
+    if member is None:
+        raise ValueError("package has no theme.json")
+    data = json.loads(zf.read(infos[member]).decode("utf-8-sig"))
+    if not isinstance(data, dict):
+        raise ValueError("theme.json must be a JSON object")
+    base = member[: -len("theme.json")]
+    files = {name[len(base) :]: info for name, info in infos.items() if name.startswith(base)}
+    return PackageListing(member, data, files)
+
+
+def build_manifest(files: Iterable[tuple[str, int, str]]) -> dict:
+    """``files`` yields ``(relative path, size, sha256 hex)``."""
+    return {
+        "version": MANIFEST_VERSION,
+        "algorithm": "sha256",
+        "files": {path: {"size": size, "sha256": digest} for path, size, digest in sorted(files)},
+    }
+
+
+def manifest_bytes(manifest: dict) -> bytes:
+    return (json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n").encode("utf-8")
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(manifest_bytes(manifest))
+
+
+def load_manifest(raw: bytes) -> dict:
+    data = json.loads(raw.decode("utf-8"))
+    if not isinstance(data, dict) or not isinstance(data.get("files"), dict):
+        raise ValueError("manifest.json must be an object with a files map")
+    return data
+
+
+def sidecar_path(archive: Path) -> Path:
+    return archive.with_name(f"{archive.stem}.{MANIFEST_NAME}")
+
+
+def hash_stream(fh: BinaryIO) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = fh.read(HASH_CHUNK)
+        if not chunk:
+            return size, digest.hexdigest()
+        size += len(chunk)
+        digest.update(chunk)
+
+
+@dataclass
+class VerifyResult:
+    checked: int = 0
+    missing: list[str] = field(default_factory=list)
+    mismatched: list[str] = field(default_factory=list)
+    unexpected: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.mismatched
+
+
+def _compare(result: VerifyResult, expected: dict, path: str, size: int, digest: str) -> None:
+    record = expected.get(path)
+    if record is None:
+        result.unexpected.append(path)
+        return
+    result.checked += 1
+    if record.get("size") != size or record.get("sha256") != digest:
+        result.mismatched.append(path)
+
+
+def verify_zip(archive: Path, manifest: dict | None = None) -> VerifyResult:
+    """Hash every member once, straight from the archive, and compare with the manifest."""
+    with zipfile.ZipFile(archive) as zf:
+        members = [info for info in zf.infolist() if not info.is_dir()]
+        root = detect_single_root(info.filename for info in members)
+        if manifest is None:
+            name = f"{root}/{MANIFEST_NAME}" if root else MANIFEST_NAME
+            try:
+                manifest = load_manifest(zf.read(name))
+            except KeyError:
+                raise ValueError(f"{archive} has no embedded {MANIFEST_NAME}") from None
+        expected = manifest["files"]
+        result = VerifyResult()
+        seen = set()
+        for info in members:
+            path = strip_root(info.filename, root)
+            if path == MANIFEST_NAME:
+                continue
+            seen.add(path)
+            with zf.open(info) as fh:
+                size, digest = hash_stream(fh)
+            _compare(result, expected, path, size, digest)
+    result.missing = sorted(set(expected) - seen)
+    return result
+
+
+def verify_directory(theme_dir: Path, manifest: dict | None = None) -> VerifyResult:
+    """Hash every file below an installed theme directory and compare with the manifest."""
+    if manifest is None:
+        manifest = load_manifest((theme_dir / MANIFEST_NAME).read_bytes())
+    expected = manifest["files"]
+    result = VerifyResult()
+    seen = set()
+    for current, dirs, files in os.walk(theme_dir):
+        dirs.sort()
+        for name in sorted(files):
+            full = Path(current) / name
+            path = full.relative_to(theme_dir).as_posix()
+            if path == MANIFEST_NAME:
+                continue
+            seen.add(path)
+            with full.open("rb") as fh:
+                size, digest = hash_stream(fh)
+            _compare(result, expected, path, size, digest)
+    result.missing = sorted(set(expected) - seen)
+    return result
@@ -4,30 +4,50 @@
 Usage examples:
   python tools/theme_builder_reference.py init --id aurora --name 极光 --author Mindrift
   python tools/theme_builder_reference.py validate --file ./aurora/theme.json
+  python tools/theme_builder_reference.py validate ./themes 'submissions/*.zip' --jobs 8 > report.jsonl
+  python tools/theme_builder_reference.py check-assets ./aurora ./packages/aurora.zip
+  python tools/theme_builder_reference.py lint-images ./themes 'submissions/*.zip' --jobs 8
+  python tools/theme_builder_reference.py contrast ./themes 'submissions/*.zip' --level AA > contrast.jsonl
+  python tools/theme_builder_reference.py render-preview ./themes --jobs 8
   python tools/theme_builder_reference.py pack --dir ./aurora --out ./packages/aurora.zip
+  python tools/theme_builder_reference.py pack --dir ./aurora --out ./packages/aurora.zip --incremental
+  python tools/theme_builder_reference.py pack --dir ./aurora --out - | sha256sum
+  python tools/theme_builder_reference.py pack --dir ./aurora --out ./packages/aurora.zip --optimize
+  python tools/theme_builder_reference.py pack-all --root ./themes --out-dir ./packages --jobs 8
+  python tools/theme_builder_reference.py verify --path ./packages/aurora.zip
+  python tools/theme_builder_reference.py delta --old ./aurora-1.0.0.zip --new ./aurora-1.0.1.zip --out ./patch.zip
+  python tools/theme_builder_reference.py apply-delta --base ./aurora-1.0.0.zip --delta ./patch.zip --out ./aurora.zip
 """
 
 from __future__ import annotations
 
 import argparse
+import glob
 import json
-import re
+import os
 import sys
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-
-
-SCHEMA_VERSION = "1.0"
-ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
-REQUIRED_COLOR_KEYS = [
-    "theme",
-    "background",
-    "text_primary",
-    "text_secondary",
-    "slider_selected",
-    "slider_block",
-    "slider_unselected",
-]
+from typing import Callable, Iterator
+
+import theme_raster
+from theme_archive import load_manifest, read_package, sidecar_path, verify_directory, verify_zip, write_manifest
+from theme_contrast import LEVELS, find_failures, require_numpy
+from theme_delta import apply_delta, build_delta
+from theme_ignore import scan_tree
+from theme_images import DEFAULT_MAX_SCALE, DEFAULT_SCREEN, lint_images
+from theme_integrity import TreeSnapshot, check_integrity, format_integrity
+from theme_pack import TEXT_THRESHOLD, CompressionPolicy, collect_theme, format_report, pack_files, pack_to_stream
+from theme_palette import ResolvedPalette
+from theme_png import PngOptimizer
+from theme_preview import PREVIEW_SIZE, write_preview
+from theme_schema import ID_PATTERN, SCHEMA_VERSION, validate_theme
+
+
+PACK_METHODS = {"deflate": zipfile.ZIP_DEFLATED, "bzip2": zipfile.ZIP_BZIP2, "lzma": zipfile.ZIP_LZMA}
 DEFAULT_COLORS = {
     "theme": "#00E5FF",
     "background": "#0D1221",
@@ -97,29 +117,6 @@ def read_json(path: Path) -> dict:
     return data
 
 
-def validate_theme_data(data: dict) -> list[str]:
-    errors: list[str] = []
-    if str(data.get("schemaVersion", "")) != SCHEMA_VERSION:
-        errors.append(f"schemaVersion must be {SCHEMA_VERSION}")
-
-    theme_id = str(data.get("id", ""))
-    if not ID_PATTERN.match(theme_id):
-        errors.append("id must match ^[a-z0-9_]+$")
-
-    if not str(data.get("name", "")).strip():
-        errors.append("name is required")
-
-    colors = data.get("colors")
-    if not isinstance(colors, dict):
-        errors.append("colors must be object")
-    else:
-        for key in REQUIRED_COLOR_KEYS:
-            if key not in colors or not str(colors.get(key, "")).strip():
-                errors.append(f"colors.{key} is required")
-
-    return errors
-
-
 def cmd_init(args: argparse.Namespace) -> int:
     theme_id = args.id.strip().lower()
     if not ID_PATTERN.match(theme_id):
@@ -140,8 +137,12 @@ def cmd_init(args: argparse.Namespace) -> int:
     for child in ("icons", "images", "buttons"):
         (theme_dir / child).mkdir(parents=True, exist_ok=True)
 
-    if not preview.exists():
-        preview.write_bytes(b"")
+    try:
+        write_preview(theme_dir)
+    except RuntimeError:
+        # No NumPy: leave an empty placeholder for render-preview to fill in later.
+        if not preview.exists():
+            preview.write_bytes(b"")
 
     print(f"created theme template: {theme_dir}")
     print(f"- {theme_json}")
@@ -152,8 +153,302 @@ def cmd_init(args: argparse.Namespace) -> int:
     return 0
 
 
+def load_theme_source(path: Path) -> tuple[str, dict, TreeSnapshot | None]:
+    """Read theme.json plus a snapshot of the shipped files from a theme directory or a package ZIP.
+
+    ZIPs are read in memory from the central directory; directories are
+    listed with the packer's ignore rules. A bare theme.json has no snapshot.
+    """
+    if path.is_dir():
+        return "dir", read_json(path / "theme.json"), TreeSnapshot.from_directory(path)
+    if path.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            package = read_package(zf)
+        listing = {rel: info.file_size for rel, info in package.files.items()}
+        return "zip", package.data, TreeSnapshot.from_listing(listing)
+    return "json", read_json(path), None
+
+
+def read_theme_data(path: Path) -> dict:
+    """Only the parsed theme.json of a theme directory, package ZIP or theme.json file."""
+    if path.is_dir():
+        return read_json(path / "theme.json")
+    if path.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            return read_package(zf).data
+    return read_json(path)
+
+
+def target_record(path: str) -> dict:
+    """The fields every validate JSONL record carries, before the target is read."""
+    return {"path": path, "kind": None, "id": None, "ok": False, "errors": [], "warnings": []}
+
+
+def validate_target(path: str) -> dict:
+    """Validate one theme directory, theme.json or ZIP; runs inside a validate worker process."""
+    started = time.perf_counter()
+    record = target_record(path)
+    try:
+        record["kind"], data, snapshot = load_theme_source(Path(path))
+        record["id"] = data.get("id")
+        report = validate_theme(data)
+        if snapshot is not None:
+            integrity = check_integrity(data, snapshot)
+            report.errors += integrity.errors
+            report.warnings += integrity.warnings
+        record["errors"] = [str(issue) for issue in report.errors]
+        record["warnings"] = [str(issue) for issue in report.warnings]
+        record["ok"] = not record["errors"]
+    except Exception as exc:  # pylint: disable=broad-except
+        record["errors"] = [f"{type(exc).__name__}: {exc}"]
+    record["elapsed"] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def run_batch(func: Callable[[str], dict], paths: list[str]) -> list[dict]:
+    return [func(path) for path in paths]
+
+
+def map_in_batches(func: Callable[[str], dict], targets: list[str], jobs: int) -> Iterator[dict]:
+    """Yield ``func(target)`` records as they finish, batching targets over a process pool.
+
+    Closing the generator early (``--fail-fast``) cancels the batches not yet started.
+    """
+    if jobs == 1 or len(targets) <= 1:
+        for path in targets:
+            yield func(path)
+        return
+    batch = max(1, min(64, len(targets) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(run_batch, func, targets[index : index + batch]) for index in range(0, len(targets), batch)
+        ]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for pending in futures:
+                pending.cancel()
+
+
+def expand_validate_targets(patterns: list[str], unmatched: list[str] | None = None) -> list[Path]:
+    """Expand globs; directories without a theme.json are searched for theme directories and ZIPs.
+
+    Patterns that yield no target are appended to ``unmatched``.
+    """
+    targets: list[Path] = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        matched = False
+        for match in matches:
+            path = Path(match).resolve()
+            if path.is_dir():
+                found = [path] if (path / "theme.json").is_file() else discover_theme_dirs(path, packages=True)
+            elif path.is_file() and path.suffix.lower() in (".json", ".zip"):
+                found = [path]
+            else:
+                found = []
+            matched = matched or bool(found)
+            for item in found:
+                if item not in seen:
+                    seen.add(item)
+                    targets.append(item)
+        if not matched and unmatched is not None:
+            unmatched.append(pattern)
+    return targets
+
+
 def cmd_validate(args: argparse.Namespace) -> int:
-    path = Path(args.file).resolve()
+    if args.file and not args.paths:
+        return validate_single_file(Path(args.file).resolve())
+
+    patterns = list(args.paths) + ([args.file] if args.file else [])
+    if not patterns:
+        print("error: give theme directories, theme.json files, ZIPs or globs", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    unmatched: list[str] = []
+    targets = [str(path) for path in expand_validate_targets(patterns, unmatched)]
+    failed = 0
+    done = 0
+
+    def emit(record: dict) -> None:
+        nonlocal failed, done
+        done += 1
+        failed += not record["ok"]
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    # A pattern that checks nothing fails, so CI cannot pass on an empty or mistyped path.
+    for pattern in unmatched:
+        record = target_record(pattern)
+        if glob.has_magic(pattern) or Path(pattern).exists():
+            record["errors"] = ["no theme directories, theme.json files or ZIPs found"]
+        else:
+            record["errors"] = ["path not found"]
+        record["elapsed"] = 0.0
+        emit(record)
+
+    records = map_in_batches(validate_target, targets, args.jobs or os.cpu_count() or 1)
+    for record in records:
+        emit(record)
+        if args.fail_fast and failed:
+            records.close()
+            break
+
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    print(
+        f"validated {done} themes in {elapsed:.2f}s ({rate:.0f} themes/s, {failed} failed)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def lint_target(path: str, screen: tuple[int, int], max_scale: float) -> dict:
+    """Header-only image lint of one theme directory or ZIP; runs inside a lint worker process."""
+    started = time.perf_counter()
+    record: dict = {"path": path, "kind": None, "id": None, "ok": False, "images": 0, "errors": [], "warnings": []}
+    try:
+        target = Path(path)
+        if target.is_dir():
+            record["kind"] = "dir"
+            data = read_json(target / "theme.json")
+            files = [item.rel for item in scan_tree(target).files]
+            result = lint_images(data, files, lambda rel: (target / rel).open("rb"), screen, max_scale)
+        else:
+            record["kind"] = "zip"
+            with zipfile.ZipFile(target) as zf:
+                package = read_package(zf)
+                data = package.data
+                result = lint_images(
+                    data, package.files, lambda rel: zf.open(package.files[rel]), screen, max_scale
+                )
+        record.update(
+            id=data.get("id"), images=result.images, errors=result.errors, warnings=result.warnings
+        )
+        record["ok"] = not result.errors
+    except Exception as exc:  # pylint: disable=broad-except
+        record["errors"] = [f"{type(exc).__name__}: {exc}"]
+    record["elapsed"] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def parse_screen(value: str) -> tuple[int, int]:
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, e.g. 432x514") from None
+    return width, height
+
+
+def cmd_lint_images(args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    targets = [str(path) for path in expand_validate_targets(args.paths) if path.suffix.lower() != ".json"]
+    func = partial(lint_target, screen=args.screen, max_scale=args.max_scale)
+    failed = images = warned = 0
+    for record in map_in_batches(func, targets, args.jobs or os.cpu_count() or 1):
+        failed += not record["ok"]
+        warned += bool(record["warnings"])
+        images += record["images"]
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+    elapsed = time.perf_counter() - started
+    rate = len(targets) / elapsed if elapsed else 0.0
+    print(
+        f"linted {len(targets)} themes ({images} images) in {elapsed:.2f}s "
+        f"({rate:.0f} themes/s, {failed} with errors, {warned} with warnings)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def cmd_contrast(args: argparse.Namespace) -> int:
+    try:
+        require_numpy()
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    records = []
+    palettes = []
+    broken = 0
+    for path in expand_validate_targets(args.paths):
+        record: dict = {"path": str(path), "id": None, "ok": False}
+        try:
+            data = read_theme_data(path)
+            record["id"] = data.get("id")
+            palette = ResolvedPalette.from_theme(data)
+        except Exception as exc:  # pylint: disable=broad-except
+            record["errors"] = [f"{type(exc).__name__}: {exc}"]
+            broken += 1
+            print(json.dumps(record, ensure_ascii=False))
+            continue
+        record["image_background"] = palette.app_image is not None
+        records.append(record)
+        palettes.append(palette)
+
+    results = find_failures(palettes, args.level)
+    for record, failures in zip(records, results):
+        record["ok"] = not failures
+        record["worst"] = round(failures[0].ratio, 2) if failures else None
+        record["failures"] = [failure.as_dict() for failure in failures]
+    # Worst themes first: lowest failing ratio, then the most failing pairs.
+    ranked = sorted(
+        (item for item in records if args.all or not item["ok"]),
+        key=lambda item: (item["ok"], item["worst"] or 0.0, -len(item["failures"]), item["path"]),
+    )
+    for record in ranked:
+        print(json.dumps(record, ensure_ascii=False))
+    failed = sum(not item["ok"] for item in records)
+    elapsed = time.perf_counter() - started
+    print(
+        f"checked {len(records)} themes against WCAG {args.level} in {elapsed:.2f}s "
+        f"({failed} with failing pairs, {broken} unreadable)",
+        file=sys.stderr,
+    )
+    return 1 if failed or broken else 0
+
+
+def render_target(path: str, size: tuple[int, int], force: bool) -> dict:
+    """Render one theme directory's preview.png; runs inside a render-preview worker process."""
+    started = time.perf_counter()
+    record: dict = {"path": path, "id": None, "ok": False, "status": None, "errors": []}
+    try:
+        record["id"] = read_json(Path(path) / "theme.json").get("id")
+        result = write_preview(Path(path), size, force)
+        record.update(status=result.status, hash=result.digest, ok=True)
+    except Exception as exc:  # pylint: disable=broad-except
+        record["errors"] = [f"{type(exc).__name__}: {exc}"]
+    record["elapsed"] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def cmd_render_preview(args: argparse.Namespace) -> int:
+    try:
+        theme_raster.require_numpy("render-preview")
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    targets = [str(path) for path in expand_validate_targets(args.paths) if path.is_dir()]
+    func = partial(render_target, size=args.size, force=args.force)
+    counts = {"rendered": 0, "up-to-date": 0, "kept": 0}
+    failed = 0
+    for record in map_in_batches(func, targets, args.jobs or os.cpu_count() or 1):
+        if record["ok"]:
+            counts[record["status"]] += 1
+        failed += not record["ok"]
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+    elapsed = time.perf_counter() - started
+    print(
+        f"previews for {len(targets)} themes in {elapsed:.2f}s ({counts['rendered']} rendered, "
+        f"{counts['up-to-date']} up to date, {counts['kept']} hand-made kept, {failed} failed)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def validate_single_file(path: Path) -> int:
     if not path.exists():
         print(f"error: file not found: {path}", file=sys.stderr)
         return 1
@@ -164,20 +459,46 @@ def cmd_validate(args: argparse.Namespace) -> int:
         print(f"error: invalid json: {exc}", file=sys.stderr)
         return 1
 
-    errors = validate_theme_data(data)
-    if errors:
+    report = validate_theme(data)
+    for issue in report.warnings:
+        print(f"warning: {issue}")
+    if report.errors:
         print("validation failed:")
-        for item in errors:
-            print(f"- {item}")
+        for issue in report.errors:
+            print(f"- {issue}")
         return 1
 
     print("validation passed")
     return 0
 
 
+def cmd_check_assets(args: argparse.Namespace) -> int:
+    failed = 0
+    for raw in args.paths:
+        path = Path(raw).resolve()
+        try:
+            _kind, data, snapshot = load_theme_source(path)
+        except (OSError, ValueError, zipfile.BadZipFile) as exc:
+            print(f"{path}: error: {exc}")
+            failed += 1
+            continue
+        if snapshot is None:
+            print(f"{path}: error: give a theme directory or a .zip package")
+            failed += 1
+            continue
+        report = check_integrity(data, snapshot)
+        failed += not report.ok
+        print(f"{path}: {'ok' if report.ok else 'broken'} ({len(report.referenced)} references)")
+        for line in format_integrity(report):
+            print(f"  {line}")
+    return 1 if failed else 0
+
+
 def cmd_pack(args: argparse.Namespace) -> int:
     source_dir = Path(args.dir).resolve()
-    output = Path(args.out).resolve()
+    to_stdout = args.out == "-"
+    output = None if to_stdout else Path(args.out).resolve()
+    log = sys.stderr if to_stdout else sys.stdout
 
     if not source_dir.exists() or not source_dir.is_dir():
         print(f"error: invalid --dir: {source_dir}", file=sys.stderr)
@@ -190,30 +511,302 @@ def cmd_pack(args: argparse.Namespace) -> int:
 
     try:
         data = read_json(theme_json)
-        errors = validate_theme_data(data)
+        report = validate_theme(data)
     except Exception as exc:  # pylint: disable=broad-except
         print(f"error: cannot validate theme.json: {exc}", file=sys.stderr)
         return 1
 
-    if errors:
-        print("validation failed:")
-        for item in errors:
-            print(f"- {item}")
+    if report.errors:
+        print("validation failed:", file=log)
+        for issue in report.errors:
+            print(f"- {issue}", file=log)
         return 1
 
-    output.parent.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
-        root_name = source_dir.name
-        for file_path in source_dir.rglob("*"):
-            if file_path.is_dir():
-                continue
-            arcname = f"{root_name}/{file_path.relative_to(source_dir).as_posix()}"
-            zip_file.write(file_path, arcname)
+    previous = None
+    if args.incremental is not None:
+        if not args.incremental and to_stdout:
+            print("error: --incremental needs PREV_ZIP when --out is -", file=sys.stderr)
+            return 1
+        previous = Path(args.incremental).resolve() if args.incremental else output
+        if not previous.is_file():
+            print(f"note: no previous archive at {previous}, packing from scratch", file=log)
+            previous = None
+
+    options = {
+        "workers": args.workers,
+        "policy": make_policy(args),
+        "previous": previous,
+        "deterministic": args.deterministic,
+        "manifest": not args.no_manifest,
+        "optimizer": make_optimizer(args),
+    }
+    try:
+        sources, scan = collect_theme(source_dir)
+        if to_stdout:
+            result = pack_to_stream(sources, sys.stdout.buffer, **options)
+        else:
+            result = pack_files(sources, output, **options)
+    except (OSError, ValueError, zipfile.BadZipFile) as exc:
+        print(f"error: cannot pack: {exc}", file=sys.stderr)
+        return 1
+
+    manifest_out = Path(args.manifest_out).resolve() if args.manifest_out else None
+    if manifest_out is None and output is not None:
+        manifest_out = sidecar_path(output)
+    if result.manifest is not None and manifest_out is not None:
+        write_manifest(manifest_out, result.manifest)
+
+    for line in format_report(result):
+        print(line, file=log)
+    print(f"packed: {output or '<stdout>'}", file=log)
+    if scan.skipped_files or scan.pruned_dirs:
+        print(scan.summary(), file=log)
+    if result.manifest is not None and manifest_out is not None:
+        print(f"manifest: {manifest_out}", file=log)
+    if previous is not None:
+        print(
+            f"reused {result.reused}/{result.entries} entries from {previous} in {result.elapsed * 1000:.1f} ms",
+            file=log,
+        )
+    return 0
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    target = Path(args.path).resolve()
+    try:
+        manifest = load_manifest(Path(args.manifest).read_bytes()) if args.manifest else None
+        if target.is_dir():
+            result = verify_directory(target, manifest)
+        elif target.is_file():
+            result = verify_zip(target, manifest)
+        else:
+            print(f"error: not found: {target}", file=sys.stderr)
+            return 1
+    except (OSError, ValueError, zipfile.BadZipFile) as exc:
+        print(f"error: cannot verify: {exc}", file=sys.stderr)
+        return 1
+
+    for path in result.missing:
+        print(f"missing: {path}")
+    for path in result.mismatched:
+        print(f"mismatch: {path}")
+    for path in result.unexpected:
+        print(f"unexpected: {path}")
+    if not result.ok:
+        print(f"verification failed ({result.checked} files checked)")
+        return 1
+    print(f"verification passed ({result.checked} files)")
+    return 0
+
+
+def cmd_delta(args: argparse.Namespace) -> int:
+    old, new, output = Path(args.old).resolve(), Path(args.new).resolve(), Path(args.out).resolve()
+    for path in (old, new):
+        if not path.exists():
+            print(f"error: not found: {path}", file=sys.stderr)
+            return 1
+    try:
+        result = build_delta(old, new, output)
+    except (OSError, ValueError, zipfile.BadZipFile) as exc:
+        print(f"error: cannot build delta: {exc}", file=sys.stderr)
+        return 1
 
-    print(f"packed: {output}")
+    for label, paths in (("added", result.added), ("changed", result.changed), ("removed", result.removed)):
+        for path in paths:
+            print(f"{label}: {path}")
+    print(
+        f"delta: {output} ({len(result.added)} added, {len(result.changed)} changed, "
+        f"{len(result.removed)} removed, {result.unchanged} unchanged, {result.bytes_out} bytes)"
+    )
+    print(f"sha256: {result.sha256}")
     return 0
 
 
+def cmd_apply_delta(args: argparse.Namespace) -> int:
+    base, delta, output = Path(args.base).resolve(), Path(args.delta).resolve(), Path(args.out).resolve()
+    for path in (base, delta):
+        if not path.exists():
+            print(f"error: not found: {path}", file=sys.stderr)
+            return 1
+    try:
+        result = apply_delta(base, delta, output)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+        print(f"error: cannot apply delta: {exc}", file=sys.stderr)
+        return 1
+
+    for path in result.mismatched:
+        print(f"mismatch: {path}")
+    if not result.ok:
+        print(f"verification failed: {output}")
+        return 1
+    print(f"rebuilt: {output} ({result.files} files, {result.from_delta} from delta, hashes verified)")
+    return 0
+
+
+def discover_theme_dirs(root: Path, packages: bool = False) -> list[Path]:
+    """Every directory below ``root`` holding a theme.json; theme dirs are not descended into.
+
+    With ``packages``, ``*.zip`` files outside theme directories are listed too.
+    """
+    found = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+        if "theme.json" in files:
+            found.append(Path(current))
+            dirs[:] = []
+        elif packages:
+            found.extend(Path(current) / name for name in sorted(files) if name.lower().endswith(".zip"))
+    return found
+
+
+def pack_theme_job(
+    source_dir: str,
+    output: str,
+    policy: CompressionPolicy,
+    threads: int,
+    incremental: bool,
+    deterministic: bool,
+    manifest: bool,
+    optimizer: PngOptimizer | None = None,
+) -> dict:
+    """Validate and pack one theme directory; runs inside a pack-all worker process."""
+    started = time.perf_counter()
+    record: dict = {"dir": source_dir, "output": output, "ok": False}
+    try:
+        data = read_json(Path(source_dir) / "theme.json")
+        record["id"] = data.get("id")
+        report = validate_theme(data)
+        if report.errors:
+            record["errors"] = [str(issue) for issue in report.errors]
+        else:
+            out_path = Path(output)
+            previous = out_path if incremental and out_path.is_file() else None
+            sources, scan = collect_theme(Path(source_dir))
+            result = pack_files(
+                sources,
+                out_path,
+                workers=threads,
+                policy=policy,
+                previous=previous,
+                deterministic=deterministic,
+                manifest=manifest,
+                optimizer=optimizer,
+            )
+            if result.manifest is not None:
+                write_manifest(sidecar_path(out_path), result.manifest)
+            record.update(
+                ok=True,
+                entries=result.entries,
+                bytes_in=result.bytes_in,
+                bytes_out=result.bytes_out,
+                reused=result.reused,
+                png_saved=sum(entry.saved for entry in result.report),
+                skipped_bytes=scan.skipped_bytes,
+                pruned_dirs=len(scan.pruned_dirs),
+                sha256=result.sha256,
+            )
+    except Exception as exc:  # pylint: disable=broad-except
+        record["errors"] = [f"{type(exc).__name__}: {exc}"]
+    record["elapsed"] = round(time.perf_counter() - started, 4)
+    return record
+
+
+def cmd_pack_all(args: argparse.Namespace) -> int:
+    root = Path(args.root).resolve()
+    out_dir = Path(args.out_dir).resolve()
+    if not root.is_dir():
+        print(f"error: invalid --root: {root}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    theme_dirs = discover_theme_dirs(root)
+    failed = 0
+    jobs = {}
+    claimed: dict[str, Path] = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for theme_dir in theme_dirs:
+            output = out_dir / f"{theme_dir.name}.zip"
+            if output.name in claimed:
+                failed += 1
+                record = {
+                    "dir": str(theme_dir),
+                    "output": str(output),
+                    "ok": False,
+                    "errors": [f"output name already used by {claimed[output.name]}"],
+                }
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+                continue
+            claimed[output.name] = theme_dir
+            future = pool.submit(
+                pack_theme_job,
+                str(theme_dir),
+                str(output),
+                make_policy(args),
+                args.threads,
+                args.incremental,
+                args.deterministic,
+                not args.no_manifest,
+                make_optimizer(args),
+            )
+            jobs[future] = (theme_dir, output)
+
+        for future in as_completed(jobs):
+            try:
+                record = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                theme_dir, output = jobs[future]
+                record = {"dir": str(theme_dir), "output": str(output), "ok": False, "errors": [str(exc)]}
+            failed += not record["ok"]
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"packed {len(theme_dirs) - failed}/{len(theme_dirs)} themes in {elapsed:.2f}s ({failed} failed)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def make_policy(args: argparse.Namespace) -> CompressionPolicy:
+    text_method = PACK_METHODS[args.text_method] if args.text_method else None
+    return CompressionPolicy(method=PACK_METHODS[args.method], level=args.level, text_method=text_method)
+
+
+def make_optimizer(args: argparse.Namespace) -> PngOptimizer | None:
+    return PngOptimizer(Path(args.png_cache) if args.png_cache else None) if args.optimize else None
+
+
+def add_compression_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--method", choices=sorted(PACK_METHODS), default="deflate", help="method for compressible entries"
+    )
+    parser.add_argument(
+        "--text-method",
+        choices=sorted(PACK_METHODS),
+        help=f"method for text entries of {TEXT_THRESHOLD // 1024} KiB or more, e.g. lzma for large JSON/SVG "
+        "(default: same as --method; the unzipper must support it)",
+    )
+    parser.add_argument(
+        "--level", type=int, choices=range(10), default=6, metavar="0-9", help="deflate and bzip2 (1-9) level"
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="fixed timestamps (SOURCE_DATE_EPOCH or 1980-01-01) and 0644 permissions for reproducible archives",
+    )
+    parser.add_argument(
+        "--no-manifest", action="store_true", help="do not embed or write the per-file SHA-256 manifest.json"
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="losslessly shrink PNGs (drop text/time/EXIF chunks, re-deflate IDAT at level 9)",
+    )
+    parser.add_argument(
+        "--png-cache", default="", metavar="DIR", help="cache for optimised PNGs (default: ~/.cache/themeshop/png)"
+    )
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Reference CLI for theme package workflow")
     sub = parser.add_subparsers(dest="command", required=True)
@@ -227,15 +820,108 @@ def build_parser() -> argparse.ArgumentParser:
     init_parser.add_argument("--force", action="store_true", help="overwrite existing theme.json")
     init_parser.set_defaults(func=cmd_init)
 
-    validate_parser = sub.add_parser("validate", help="validate a theme.json file")
-    validate_parser.add_argument("--file", required=True, help="path to theme.json")
+    validate_parser = sub.add_parser(
+        "validate", help="validate theme.json files, theme directories or ZIP packages (JSONL report)"
+    )
+    validate_parser.add_argument(
+        "paths", nargs="*", help="theme dirs, theme.json files, .zip packages or globs (quote them)"
+    )
+    validate_parser.add_argument("--file", default="", help="single theme.json; alone, prints the plain-text result")
+    validate_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    validate_parser.add_argument("--fail-fast", action="store_true", help="stop after the first failing theme")
     validate_parser.set_defaults(func=cmd_validate)
 
     pack_parser = sub.add_parser("pack", help="zip a theme directory")
     pack_parser.add_argument("--dir", required=True, help="theme directory containing theme.json")
-    pack_parser.add_argument("--out", required=True, help="zip output path")
+    pack_parser.add_argument("--out", required=True, help="zip output path, or - to stream to stdout")
+    pack_parser.add_argument(
+        "--workers", type=int, default=None, help="compression threads (default: CPU count, 1 = serial)"
+    )
+    add_compression_arguments(pack_parser)
+    pack_parser.add_argument(
+        "--incremental",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PREV_ZIP",
+        help="reuse unchanged entries from a previous archive (default: the existing --out)",
+    )
+    pack_parser.add_argument(
+        "--manifest-out", default="", help="where to write the manifest (default: <out stem>.manifest.json)"
+    )
     pack_parser.set_defaults(func=cmd_pack)
 
+    check_parser = sub.add_parser(
+        "check-assets", help="check that every path theme.json references exists (directory or ZIP)"
+    )
+    check_parser.add_argument("paths", nargs="+", help="theme directories or .zip packages")
+    check_parser.set_defaults(func=cmd_check_assets)
+
+    lint_parser = sub.add_parser(
+        "lint-images", help="read image headers only and flag icon, background and format problems (JSONL)"
+    )
+    lint_parser.add_argument("paths", nargs="+", help="theme dirs, .zip packages, catalog roots or globs")
+    lint_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    lint_parser.add_argument(
+        "--screen", type=parse_screen, default=DEFAULT_SCREEN, metavar="WxH", help="target screen (default 432x514)"
+    )
+    lint_parser.add_argument(
+        "--max-scale",
+        type=float,
+        default=DEFAULT_MAX_SCALE,
+        help="warn when a background exceeds the screen by this factor (default 2)",
+    )
+    lint_parser.set_defaults(func=cmd_lint_images)
+
+    contrast_parser = sub.add_parser(
+        "contrast", help="WCAG contrast of every text/background pair, worst themes first (JSONL, needs numpy)"
+    )
+    contrast_parser.add_argument("paths", nargs="+", help="theme dirs, theme.json files, .zip packages or globs")
+    contrast_parser.add_argument("--level", choices=LEVELS, default="AA", help="WCAG level (default AA)")
+    contrast_parser.add_argument("--all", action="store_true", help="also list themes without failing pairs")
+    contrast_parser.set_defaults(func=cmd_contrast)
+
+    render_parser = sub.add_parser(
+        "render-preview", help="render preview.png for theme directories without a display (needs numpy)"
+    )
+    render_parser.add_argument("paths", nargs="+", help="theme dirs or roots searched for theme.json (globs ok)")
+    render_parser.add_argument(
+        "--size", type=parse_screen, default=PREVIEW_SIZE, metavar="WxH", help="preview size (default 280x420)"
+    )
+    render_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    render_parser.add_argument(
+        "--force", action="store_true", help="re-render up-to-date previews and replace hand-made preview.png files"
+    )
+    render_parser.set_defaults(func=cmd_render_preview)
+
+    pack_all_parser = sub.add_parser("pack-all", help="validate and zip every theme directory under a root")
+    pack_all_parser.add_argument("--root", required=True, help="directory searched for theme.json files")
+    pack_all_parser.add_argument("--out-dir", required=True, help="directory receiving <theme dir>.zip")
+    pack_all_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    pack_all_parser.add_argument("--threads", type=int, default=1, help="compression threads per worker process")
+    add_compression_arguments(pack_all_parser)
+    pack_all_parser.add_argument(
+        "--incremental", action="store_true", help="reuse unchanged entries from existing output archives"
+    )
+    pack_all_parser.set_defaults(func=cmd_pack_all)
+
+    delta_parser = sub.add_parser("delta", help="build a patch package between two theme versions")
+    delta_parser.add_argument("--old", required=True, help="previous version (zip or directory)")
+    delta_parser.add_argument("--new", required=True, help="new version (zip or directory)")
+    delta_parser.add_argument("--out", required=True, help="delta zip output path")
+    delta_parser.set_defaults(func=cmd_delta)
+
+    apply_parser = sub.add_parser("apply-delta", help="rebuild a theme version from a base and a delta")
+    apply_parser.add_argument("--base", required=True, help="version the delta was built from (zip or directory)")
+    apply_parser.add_argument("--delta", required=True, help="delta zip")
+    apply_parser.add_argument("--out", required=True, help="output .zip path or new directory")
+    apply_parser.set_defaults(func=cmd_apply_delta)
+
+    verify_parser = sub.add_parser("verify", help="check a theme directory or zip against its manifest.json")
+    verify_parser.add_argument("--path", required=True, help="installed theme directory or theme zip")
+    verify_parser.add_argument("--manifest", default="", help="manifest to check against (default: the embedded one)")
+    verify_parser.set_defaults(func=cmd_verify)
+
     return parser
 
 
@@ -0,0 +1,187 @@
+"""CSS color parsing shared by the GUI preview, the validator and the linters.
+
+``parse_color`` understands ``#rgb``, ``#rgba``, ``#rrggbb``, ``#rrggbbaa``,
+``rgb()``/``rgba()`` and ``hsl()``/``hsla()`` (comma or space separated,
+with an optional ``/ alpha``, channels as numbers or percentages) and
+``transparent``. Out-of-range channels are rejected rather than clamped, so
+typos such as ``rgba(300,0,0,1)`` are caught.
+
+Results are immutable ``RGBA`` tuples memoised in a bounded LRU keyed by the
+raw string: a theme uses a few dozen distinct colors, so redraws and bulk
+validation hit the cache almost every time.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, NamedTuple
+
+
+COLOR_CACHE_SIZE = 4096
+_ARG = r"\s*([^\s,/()]+)\s*"
+_FUNCTION = re.compile(
+    rf"(rgba?|hsla?)\({_ARG}(?:,{_ARG},{_ARG}(?:,{_ARG})?|\s{_ARG}\s{_ARG}(?:/{_ARG})?)\)"
+)
+_new_tuple = tuple.__new__
+
+
+class RGBA(NamedTuple):
+    """8-bit channels plus alpha in [0, 1]."""
+
+    r: int
+    g: int
+    b: int
+    a: float = 1.0
+
+    @property
+    def hex(self) -> str:
+        """``#rrggbb``, alpha dropped (what Tk accepts)."""
+        return f"#{self.r:02x}{self.g:02x}{self.b:02x}"
+
+    @property
+    def opaque(self) -> bool:
+        return self.a >= 1.0
+
+    def over(self, background: RGBA) -> RGBA:
+        """Source-over compositing onto ``background``."""
+        if self.a >= 1.0:
+            return self
+        alpha = self.a + background.a * (1.0 - self.a)
+        if alpha <= 0.0:
+            return RGBA(0, 0, 0, 0.0)
+        weight = background.a * (1.0 - self.a)
+
+        def channel(top: int, bottom: int) -> int:
+            return round((top * self.a + bottom * weight) / alpha)
+
+        return RGBA(channel(self.r, background.r), channel(self.g, background.g), channel(self.b, background.b), alpha)
+
+    def css(self) -> str:
+        if self.a >= 1.0:
+            return self.hex
+        return f"rgba({self.r},{self.g},{self.b},{round(self.a, 3):g})"
+
+
+TRANSPARENT = RGBA(0, 0, 0, 0.0)
+
+
+def _rgba(r: int, g: int, b: int, a: float = 1.0) -> RGBA:
+    # tuple.__new__ skips the generated NamedTuple constructor on the parse path.
+    return _new_tuple(RGBA, (r, g, b, a))
+
+
+def _parse_hex(digits: str) -> RGBA | None:
+    # ASCII alphanumerics rule out signs, "_" and non-ASCII digits that int() would accept; "x" rules out "0x".
+    if len(digits) not in (3, 4, 6, 8) or not (digits.isascii() and digits.isalnum()) or "x" in digits:
+        return None
+    if len(digits) <= 4:
+        digits = "".join(char * 2 for char in digits)
+    try:
+        value = int(digits, 16)
+    except ValueError:
+        return None
+    if len(digits) == 8:
+        return _rgba(value >> 24, (value >> 16) & 0xFF, (value >> 8) & 0xFF, (value & 0xFF) / 255.0)
+    return _rgba(value >> 16, (value >> 8) & 0xFF, value & 0xFF)
+
+
+def _number(text: str, percent_scale: float) -> float:
+    """A bare number, or a percentage of ``percent_scale``; raises ``ValueError`` if malformed."""
+    if text[-1] == "%":
+        return float(text[:-1]) * percent_scale / 100.0
+    return float(text)
+
+
+def _hsl_to_rgb(hue: float, saturation: float, lightness: float) -> tuple[int, int, int]:
+    chroma = (1.0 - abs(2.0 * lightness - 1.0)) * saturation
+
+    def channel(n: int) -> int:
+        k = (n + hue / 30.0) % 12.0
+        return round(255.0 * (lightness - chroma / 2.0 * max(-1.0, min(k - 3.0, 9.0 - k, 1.0))))
+
+    return channel(0), channel(8), channel(4)
+
+
+def _parse_function(match: re.Match[str]) -> RGBA | None:
+    name, first, *rest = match.groups()
+    second, third, alpha_text = rest[:3] if rest[0] is not None else rest[3:]
+    try:
+        alpha = 1.0 if alpha_text is None else _number(alpha_text, 1.0)
+        if not 0.0 <= alpha <= 1.0:
+            return None
+        if name[0] == "r":
+            r, g, b = _number(first, 255.0), _number(second, 255.0), _number(third, 255.0)
+            if not (0.0 <= r <= 255.0 and 0.0 <= g <= 255.0 and 0.0 <= b <= 255.0):
+                return None
+            return _rgba(round(r), round(g), round(b), alpha)
+        if second[-1] != "%" or third[-1] != "%":
+            return None
+        hue = _number(first[:-3] if first.endswith("deg") else first, 360.0)
+        saturation, lightness = _number(second, 1.0), _number(third, 1.0)
+    except ValueError:
+        return None
+    if not (0.0 <= saturation <= 1.0 and 0.0 <= lightness <= 1.0):
+        return None
+    return _rgba(*_hsl_to_rgb(hue % 360.0, saturation, lightness), alpha)
+
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _parse_text(text: str) -> RGBA | None:
+    text = text.strip().lower()
+    if text.startswith("#"):
+        return _parse_hex(text[1:])
+    if text == "transparent":
+        return TRANSPARENT
+    match = _FUNCTION.fullmatch(text)
+    return _parse_function(match) if match is not None else None
+
+
+def parse_color(value: Any) -> RGBA | None:
+    """Parse one CSS color; ``None`` for anything that is not a supported color string."""
+    if not isinstance(value, str):
+        return None
+    return _parse_text(value)
+
+
+def parse_colors(values: Iterable[Any]) -> list[RGBA | None]:
+    """Batch form of ``parse_color``; one result per input, in order."""
+    parse = _parse_text
+    return [parse(value) if isinstance(value, str) else None for value in values]
+
+
+PALETTE_SECTIONS = ("colors", "text", "lyric")
+
+
+def parse_palette(theme: Mapping[str, Any]) -> dict[str, RGBA]:
+    """Every color a theme.json defines, keyed by dotted path (``colors.theme``, ``buttons.primary.bg``, ...).
+
+    Entries that are missing or unparsable are left out, so callers apply
+    their own fallbacks.
+    """
+    keys: list[str] = []
+    values: list[Any] = []
+    for section in PALETTE_SECTIONS:
+        entries = theme.get(section)
+        if isinstance(entries, Mapping):
+            for name, value in entries.items():
+                keys.append(f"{section}.{name}")
+                values.append(value)
+    buttons = theme.get("buttons")
+    if isinstance(buttons, Mapping):
+        for name, button in buttons.items():
+            if isinstance(button, Mapping):
+                for part in ("bg", "text", "border"):
+                    keys.append(f"buttons.{name}.{part}")
+                    values.append(button.get(part))
+    backgrounds = theme.get("backgrounds")
+    if isinstance(backgrounds, Mapping):
+        for name, background in backgrounds.items():
+            if isinstance(background, Mapping) and background.get("type") == "color":
+                keys.append(f"backgrounds.{name}")
+                values.append(background.get("value"))
+    return {key: color for key, color in zip(keys, parse_colors(values)) if color is not None}
+
+
+def cache_info():
+    return _parse_text.cache_info()
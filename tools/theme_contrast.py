@@ -0,0 +1,146 @@
+"""WCAG contrast check over a whole catalog in one vectorised pass.
+
+Each theme is reduced to its ``ResolvedPalette`` (colors already composited
+over the surface they are drawn on), the palettes are stacked into one
+``(themes, roles, 3)`` array, and relative luminance and contrast ratios for
+every pair in ``CONTRAST_PAIRS`` are computed with NumPy at once.
+
+NumPy is optional for the rest of the tooling; only this module needs it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from theme_color import RGBA
+from theme_palette import ResolvedPalette
+
+
+LEVELS = ("AA", "AAA")
+
+
+@dataclass(frozen=True)
+class ContrastPair:
+    foreground: str
+    background: str
+    field: str
+    # Minimum ratios for AA and AAA: 4.5/7 for text, 3/4.5 for large text, 3 for UI parts.
+    aa: float
+    aaa: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.foreground} on {self.background}"
+
+
+CONTRAST_PAIRS = (
+    ContrastPair("header_text", "header", "colors.text_primary", 4.5, 7.0),
+    ContrastPair("title", "card", "text.title", 3.0, 4.5),
+    ContrastPair("body", "card", "text.body", 4.5, 7.0),
+    ContrastPair("caption", "card", "text.caption", 4.5, 7.0),
+    ContrastPair("primary_text", "primary_bg", "buttons.primary.text", 4.5, 7.0),
+    ContrastPair("danger_text", "danger_bg", "buttons.danger.text", 4.5, 7.0),
+    ContrastPair("lyric_active", "lyric_active_bg", "lyric.active", 3.0, 4.5),
+    ContrastPair("lyric_normal", "app_background", "lyric.normal", 3.0, 4.5),
+    ContrastPair("slider_selected", "slider_unselected", "colors.slider_selected", 3.0, 3.0),
+)
+
+ROLES = tuple(item.name for item in fields(ResolvedPalette) if item.type in (RGBA, "RGBA"))
+_ROLE_INDEX = {role: index for index, role in enumerate(ROLES)}
+
+
+@dataclass(frozen=True)
+class ContrastFailure:
+    pair: ContrastPair
+    foreground: str
+    background: str
+    ratio: float
+    required: float
+
+    def as_dict(self) -> dict:
+        return {
+            "pair": self.pair.name,
+            "field": self.pair.field,
+            "foreground": self.foreground,
+            "background": self.background,
+            "ratio": round(self.ratio, 2),
+            "required": self.required,
+        }
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("the contrast check needs NumPy (pip install numpy)")
+
+
+def palette_array(palettes: Sequence[ResolvedPalette]):
+    """``(themes, len(ROLES), 3)`` uint8 array of every role's RGB."""
+    require_numpy()
+    rows = [[getattr(palette, role)[:3] for role in ROLES] for palette in palettes]
+    return np.asarray(rows, dtype=np.uint8).reshape(len(palettes), len(ROLES), 3)
+
+
+def relative_luminance(rgb):
+    """WCAG 2.x relative luminance of an ``(..., 3)`` array of 8-bit channels."""
+    channels = rgb.astype(np.float64) / 255.0
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def _linear(value: int) -> float:
+    channel = value / 255.0
+    return channel / 12.92 if channel <= 0.04045 else ((channel + 0.055) / 1.055) ** 2.4
+
+
+def luminance(color: RGBA) -> float:
+    """Scalar relative luminance; works without NumPy."""
+    return 0.2126 * _linear(color.r) + 0.7152 * _linear(color.g) + 0.0722 * _linear(color.b)
+
+
+def contrast_ratio(foreground: RGBA, background: RGBA) -> float:
+    """Scalar WCAG ratio of two opaque colors, for checking a single palette."""
+    fg, bg = luminance(foreground), luminance(background)
+    return (max(fg, bg) + 0.05) / (min(fg, bg) + 0.05)
+
+
+def contrast_ratios(palettes: Sequence[ResolvedPalette], pairs: Sequence[ContrastPair] = CONTRAST_PAIRS):
+    """``(themes, pairs)`` array of contrast ratios, from 1 to 21."""
+    lum = relative_luminance(palette_array(palettes))
+    fg = lum[:, [_ROLE_INDEX[pair.foreground] for pair in pairs]]
+    bg = lum[:, [_ROLE_INDEX[pair.background] for pair in pairs]]
+    return (np.maximum(fg, bg) + 0.05) / (np.minimum(fg, bg) + 0.05)
+
+
+def find_failures(
+    palettes: Sequence[ResolvedPalette], level: str = "AA", pairs: Sequence[ContrastPair] = CONTRAST_PAIRS
+) -> list[list[ContrastFailure]]:
+    """Failing pairs per palette, worst (lowest ratio) first."""
+    if level not in LEVELS:
+        raise ValueError(f"unknown WCAG level {level!r}")
+    if not palettes:
+        return []
+    ratios = contrast_ratios(palettes, pairs)
+    required = np.array([pair.aa if level == "AA" else pair.aaa for pair in pairs])
+    failing = ratios < required
+    results: list[list[ContrastFailure]] = [[] for _ in palettes]
+    for theme_index, pair_index in zip(*np.nonzero(failing)):
+        pair = pairs[pair_index]
+        palette = palettes[theme_index]
+        results[theme_index].append(
+            ContrastFailure(
+                pair,
+                getattr(palette, pair.foreground).hex,
+                getattr(palette, pair.background).hex,
+                float(ratios[theme_index, pair_index]),
+                float(required[pair_index]),
+            )
+        )
+    for failures in results:
+        failures.sort(key=lambda item: item.ratio)
+    return results
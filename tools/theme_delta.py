@@ -0,0 +1,318 @@
+"""Delta packages between two versions of a theme.
+
+A delta is a ZIP holding ``delta.json`` and, under ``files/``, only the
+members that were added or changed. Members are compared by size and CRC-32:
+for ZIP inputs both come from the central directory, and payload members are
+copied as raw compressed bytes, so unchanged members are never inflated.
+
+``delta.json`` records the removal list and the full target listing (size,
+CRC-32 and, where known, SHA-256), which ``apply_delta`` uses to check the
+base before rebuilding and to verify the result.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from theme_archive import MANIFEST_NAME, build_manifest, detect_single_root, manifest_bytes, strip_root
+from theme_pack import (
+    DEFAULT_POLICY,
+    DETERMINISTIC_ATTR,
+    METHOD_NAMES,
+    CompressionPolicy,
+    PreviousArchive,
+    SourceFile,
+    ZipWriter,
+    collect_directory,
+    file_digests,
+    pack_bytes,
+    pack_entry,
+    reproducible_date_time,
+)
+
+
+DELTA_NAME = "delta.json"
+DELTA_FORMAT = "theme-delta"
+DELTA_VERSION = 1
+PAYLOAD_PREFIX = "files/"
+HASH_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True)
+class Member:
+    path: str
+    size: int
+    crc: int
+    sha256: str | None
+
+
+class ThemeVersion:
+    """One version of a theme, read from a ZIP package or a directory."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.members: dict[str, Member] = {}
+        self._archive: PreviousArchive | None = None
+        self._zip: zipfile.ZipFile | None = None
+        self._infos: dict[str, zipfile.ZipInfo] = {}
+        self._files: dict[str, Path] = {}
+        if self.path.is_dir():
+            self.root = self.path.name
+            for source in collect_directory(self.path, self.root):
+                rel = strip_root(source.arcname, self.root)
+                if rel == MANIFEST_NAME:
+                    continue
+                crc, digest = file_digests(source.path)
+                self.members[rel] = Member(rel, source.path.stat().st_size, crc, digest)
+                self._files[rel] = source.path
+        else:
+            self._archive = PreviousArchive(self.path)
+            try:
+                self._zip = zipfile.ZipFile(self.path)
+                self.root = detect_single_root(self._archive.members)
+                for arcname, info in self._archive.members.items():
+                    rel = strip_root(arcname, self.root)
+                    if rel == MANIFEST_NAME:
+                        continue
+                    if info.compress_type not in METHOD_NAMES or info.flag_bits & 0x1:
+                        raise ValueError(f"{self.path}: unsupported member {arcname}")
+                    self.members[rel] = Member(rel, info.file_size, info.CRC, self._archive.digest(arcname))
+                    self._infos[rel] = info
+            except BaseException:
+                self.close()
+                raise
+
+    def __enter__(self) -> "ThemeVersion":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+        if self._zip is not None:
+            self._zip.close()
+
+    def entry(self, rel: str, arcname: str, policy: CompressionPolicy):
+        """A writer entry for ``rel``: raw copy from a ZIP, or freshly compressed from a directory."""
+        if self._archive is not None:
+            entry = self._archive.raw_entry(self._infos[rel], arcname)
+        else:
+            entry = pack_entry(SourceFile(self._files[rel], arcname), policy)
+        entry.date_time = reproducible_date_time()
+        entry.external_attr = DETERMINISTIC_ATTR
+        return entry
+
+    def open(self, rel: str):
+        if self._zip is not None:
+            return self._zip.open(self._infos[rel])
+        return self._files[rel].open("rb")
+
+    def digest(self, rel: str) -> str:
+        """SHA-256 of one member, inflating it only when no manifest recorded it."""
+        member = self.members[rel]
+        if member.sha256:
+            return member.sha256
+        with self.open(rel) as fh:
+            return _hash_stream(fh)[1]
+
+
+def _hash_stream(fh) -> tuple[int, str]:
+    crc = 0
+    sha = hashlib.sha256()
+    while True:
+        chunk = fh.read(HASH_CHUNK)
+        if not chunk:
+            return crc, sha.hexdigest()
+        crc = zlib.crc32(chunk, crc)
+        sha.update(chunk)
+
+
+def _safe_rel(path: str) -> str:
+    parts = path.split("/")
+    if not path or path.startswith("/") or any(part in ("", ".", "..") for part in parts) or "\\" in path:
+        raise ValueError(f"unsafe path in delta: {path!r}")
+    return path
+
+
+@dataclass
+class DeltaResult:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    bytes_out: int = 0
+    sha256: str = ""
+
+
+def build_delta(
+    old_path: Path, new_path: Path, output: Path, policy: CompressionPolicy = DEFAULT_POLICY
+) -> DeltaResult:
+    """Write a delta package turning ``old_path`` into ``new_path``."""
+    result = DeltaResult()
+    with ThemeVersion(old_path) as old, ThemeVersion(new_path) as new:
+        for rel, member in sorted(new.members.items()):
+            before = old.members.get(rel)
+            if before is None:
+                result.added.append(rel)
+            elif before.size != member.size or before.crc != member.crc:
+                result.changed.append(rel)
+            else:
+                result.unchanged += 1
+        result.removed = sorted(set(old.members) - set(new.members))
+
+        payload = result.added + result.changed
+        target = {}
+        for rel, member in sorted(new.members.items()):
+            record = {"size": member.size, "crc": member.crc}
+            digest = new.digest(rel) if rel in payload else member.sha256
+            if digest:
+                record["sha256"] = digest
+            target[rel] = record
+        base = {
+            rel: {"size": member.size, "crc": member.crc}
+            for rel, member in sorted(old.members.items())
+            if rel in new.members and rel not in payload
+        }
+        document = {
+            "format": DELTA_FORMAT,
+            "version": DELTA_VERSION,
+            "root": new.root,
+            "added": result.added,
+            "changed": result.changed,
+            "removed": result.removed,
+            "base": base,
+            "target": target,
+        }
+
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = output.with_name(output.name + ".part")
+        try:
+            with partial_path.open("wb") as fh:
+                writer = ZipWriter(fh)
+                raw = json.dumps(document, ensure_ascii=False, indent=2).encode("utf-8")
+                writer.add(pack_bytes(DELTA_NAME, raw, policy, reproducible_date_time(), DETERMINISTIC_ATTR))
+                for rel in sorted(payload):
+                    writer.add(new.entry(rel, PAYLOAD_PREFIX + rel, policy))
+                writer.close()
+            os.replace(partial_path, output)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+    result.bytes_out = writer.offset
+    result.sha256 = writer.sha256
+    return result
+
+
+def load_delta(path: Path) -> dict:
+    with zipfile.ZipFile(path) as zf:
+        document = json.loads(zf.read(DELTA_NAME).decode("utf-8"))
+    if not isinstance(document, dict) or document.get("format") != DELTA_FORMAT:
+        raise ValueError(f"{path} is not a theme delta package")
+    if document.get("version") != DELTA_VERSION:
+        raise ValueError(f"unsupported delta version: {document.get('version')}")
+    return document
+
+
+@dataclass
+class ApplyResult:
+    files: int = 0
+    from_delta: int = 0
+    mismatched: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatched
+
+
+def _check(result: ApplyResult, rel: str, record: dict, crc: int, digest: str, size: int) -> None:
+    result.files += 1
+    expected = record.get("sha256")
+    if size != record["size"] or crc != record["crc"] or (expected and expected != digest):
+        result.mismatched.append(rel)
+
+
+def _target_manifest(target: dict[str, dict]) -> dict | None:
+    if not all("sha256" in record for record in target.values()):
+        return None
+    return build_manifest((rel, record["size"], record["sha256"]) for rel, record in target.items())
+
+
+def apply_delta(base_path: Path, delta_path: Path, output: Path) -> ApplyResult:
+    """Rebuild the target version into ``output`` (a ``.zip`` path or a new directory) and verify it."""
+    document = load_delta(delta_path)
+    target: dict[str, dict] = document["target"]
+    payload = set(document["added"]) | set(document["changed"])
+    for rel in target:
+        _safe_rel(rel)
+
+    output = Path(output)
+    result = ApplyResult()
+    with ThemeVersion(base_path) as base, ThemeVersion(delta_path) as delta:
+        for rel, record in document["base"].items():
+            member = base.members.get(rel)
+            if member is None or member.size != record["size"] or member.crc != record["crc"]:
+                raise ValueError(f"base does not match the delta: {rel}")
+
+        def source_of(rel: str) -> tuple[ThemeVersion, str]:
+            return (delta, PAYLOAD_PREFIX + rel) if rel in payload else (base, rel)
+
+        if output.suffix.lower() == ".zip":
+            root = document.get("root")
+            prefix = f"{root}/" if root else ""
+            output.parent.mkdir(parents=True, exist_ok=True)
+            partial_path = output.with_name(output.name + ".part")
+            try:
+                with partial_path.open("wb") as fh:
+                    writer = ZipWriter(fh)
+                    for rel in sorted(target):
+                        version, name = source_of(rel)
+                        writer.add(version.entry(name, prefix + rel, DEFAULT_POLICY))
+                    manifest = _target_manifest(target)
+                    if manifest is not None:
+                        writer.add(
+                            pack_bytes(
+                                prefix + MANIFEST_NAME,
+                                manifest_bytes(manifest),
+                                DEFAULT_POLICY,
+                                reproducible_date_time(),
+                                DETERMINISTIC_ATTR,
+                            )
+                        )
+                    writer.close()
+                os.replace(partial_path, output)
+            except BaseException:
+                partial_path.unlink(missing_ok=True)
+                raise
+            with zipfile.ZipFile(output) as zf:
+                for rel, record in sorted(target.items()):
+                    with zf.open(prefix + rel) as fh:
+                        crc, digest = _hash_stream(fh)
+                    _check(result, rel, record, crc, digest, zf.getinfo(prefix + rel).file_size)
+        else:
+            if output.exists() and any(output.iterdir()):
+                raise ValueError(f"output directory is not empty: {output}")
+            for rel in sorted(target):
+                version, name = source_of(rel)
+                dest = output / rel
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with version.open(name) as src, dest.open("wb") as dst:
+                    shutil.copyfileobj(src, dst, HASH_CHUNK)
+            for rel, record in sorted(target.items()):
+                with (output / rel).open("rb") as fh:
+                    crc, digest = _hash_stream(fh)
+                _check(result, rel, record, crc, digest, (output / rel).stat().st_size)
+            manifest = _target_manifest(target)
+            if manifest is not None:
+                (output / MANIFEST_NAME).write_bytes(manifest_bytes(manifest))
+    result.from_delta = len(payload)
+    return result
@@ -0,0 +1,195 @@
+"""Tree walker and ``.themeignore`` rules shared by every packer.
+
+``.themeignore`` sits in the theme root and uses gitignore syntax: ``#``
+comments, ``!`` to re-include, a trailing ``/`` for directories only, a
+leading or inner ``/`` to anchor a pattern to the theme root, and ``*``,
+``?``, ``[...]`` and ``**`` wildcards. The last matching rule wins.
+
+Built-in rules run first, so a ``.themeignore`` can re-include anything
+they drop. Ignored directories are pruned without being listed.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+
+IGNORE_FILE = ".themeignore"
+DEFAULT_RULES = (
+    ".*",
+    "*~",
+    "*.swp",
+    "*.swo",
+    "*.tmp",
+    "*.part",
+    "Thumbs.db",
+    "desktop.ini",
+    "__pycache__/",
+    "image_map.json",
+)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    pattern: str
+    regex: re.Pattern[str]
+    negated: bool
+    dir_only: bool
+    anchored: bool
+
+
+def _translate(pattern: str) -> str:
+    out = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            out.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            out.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[index + 1 : end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            out.append(re.escape(pattern[index]))
+        else:
+            out.append(re.escape(char))
+        index += 1
+    return "".join(out)
+
+
+def parse_rule(line: str) -> IgnoreRule | None:
+    """Compile one gitignore-style line; blank lines and comments give ``None``."""
+    line = line.rstrip("\r\n")
+    if not line.endswith("\\ "):
+        line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    body = line.rstrip("/")
+    if not body:
+        return None
+    anchored = "/" in body
+    body = body.lstrip("/")
+    return IgnoreRule(
+        pattern=line,
+        regex=re.compile(_translate(body) + r"\Z", re.DOTALL),
+        negated=negated,
+        dir_only=dir_only,
+        anchored=anchored,
+    )
+
+
+class IgnoreRules:
+    """An ordered rule list; ``ignored(rel, is_dir)`` applies the last match."""
+
+    def __init__(self, lines: Iterable[str] = ()) -> None:
+        self.rules = [rule for rule in map(parse_rule, lines) if rule is not None]
+
+    @classmethod
+    def for_directory(cls, source_dir: Path, defaults: Iterable[str] = DEFAULT_RULES) -> "IgnoreRules":
+        lines = list(defaults)
+        ignore_path = Path(source_dir) / IGNORE_FILE
+        if ignore_path.is_file():
+            lines += ignore_path.read_text(encoding="utf-8-sig").splitlines()
+        return cls(lines)
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        name = rel.rsplit("/", 1)[-1]
+        result = False
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(rel if rule.anchored else name):
+                result = not rule.negated
+        return result
+
+
+@dataclass(frozen=True)
+class TreeFile:
+    path: Path
+    rel: str
+    size: int
+
+
+@dataclass
+class TreeScan:
+    files: list[TreeFile] = field(default_factory=list)
+    skipped_files: list[str] = field(default_factory=list)
+    skipped_bytes: int = 0
+    pruned_dirs: list[str] = field(default_factory=list)
+    dirs: list[str] = field(default_factory=list)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(item.size for item in self.files)
+
+    def summary(self) -> str:
+        return (
+            f"ignored {len(self.skipped_files)} files ({self.skipped_bytes} bytes)"
+            f" and {len(self.pruned_dirs)} directories"
+        )
+
+
+def scan_tree(source_dir: Path, rules: IgnoreRules | None = None) -> TreeScan:
+    """Walk ``source_dir`` with ``os.scandir``, sorted by relative path.
+
+    Sizes come from the directory entries, and an ignored directory is
+    recorded in ``pruned_dirs`` without being opened. Symlinked files are
+    followed; symlinked directories are not.
+    """
+    source_dir = Path(source_dir)
+    rules = IgnoreRules.for_directory(source_dir) if rules is None else rules
+    scan = TreeScan()
+    pending = [(str(source_dir), "")]
+    while pending:
+        current, prefix = pending.pop()
+        with os.scandir(current) as iterator:
+            entries = list(iterator)
+        subdirs = []
+        for entry in entries:
+            rel = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if rules.ignored(rel, True):
+                    scan.pruned_dirs.append(rel + "/")
+                else:
+                    scan.dirs.append(rel)
+                    subdirs.append((entry.path, rel + "/"))
+            elif entry.is_file():
+                size = entry.stat().st_size
+                if rules.ignored(rel, False):
+                    scan.skipped_files.append(rel)
+                    scan.skipped_bytes += size
+                else:
+                    scan.files.append(TreeFile(Path(entry.path), rel, size))
+        pending.extend(sorted(subdirs, reverse=True))
+    scan.files.sort(key=lambda item: item.rel)
+    scan.skipped_files.sort()
+    scan.pruned_dirs.sort()
+    scan.dirs.sort()
+    return scan
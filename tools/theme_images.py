@@ -0,0 +1,210 @@
+"""Header-only image metadata and the asset lint built on it.
+
+``probe_image`` reads the PNG IHDR (plus chunk headers up to the first IDAT,
+to spot ``tRNS``), the JPEG SOF segment or the WebP VP8/VP8L/VP8X header.
+No pixels are decoded, so a theme costs a few small reads per image and a
+whole catalog lints in seconds.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import struct
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterable
+
+from theme_integrity import REQUIRED_ICON_NAMES, asset_references, folder_references
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+HEAD_SIZE = 64
+SKIP_CHUNK = 1 << 16
+# Backgrounds in the bundled themes are drawn for a 432x514 screen.
+DEFAULT_SCREEN = (432, 514)
+DEFAULT_MAX_SCALE = 2.0
+IMAGE_EXTENSIONS = {".png": "png", ".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp", ".gif": "gif"}
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE = {0x01, 0xD8, *range(0xD0, 0xD8)}
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    format: str
+    width: int
+    height: int
+    bit_depth: int
+    has_alpha: bool
+
+
+class _HeadReader:
+    """Reads through a small prefetched head, then the file, skipping without seeking back."""
+
+    def __init__(self, fh: BinaryIO, head: bytes) -> None:
+        self.fh = fh
+        self.head = head
+        self.pos = 0
+
+    def read(self, size: int) -> bytes:
+        out = self.head[self.pos : self.pos + size]
+        self.pos += len(out)
+        if len(out) < size:
+            out += self.fh.read(size - len(out))
+        if len(out) < size:
+            raise ValueError("truncated image header")
+        return out
+
+    def skip(self, size: int) -> None:
+        from_head = min(size, len(self.head) - self.pos)
+        self.pos += from_head
+        size -= from_head
+        while size > 0:
+            chunk = self.fh.read(min(size, SKIP_CHUNK))
+            if not chunk:
+                raise ValueError("truncated image header")
+            size -= len(chunk)
+
+
+def _probe_png(reader: _HeadReader) -> ImageInfo:
+    reader.skip(8)
+    length, kind = struct.unpack(">I4s", reader.read(8))
+    if kind != b"IHDR" or length != 13:
+        raise ValueError("PNG does not start with IHDR")
+    width, height, depth, color_type = struct.unpack(">IIBB", reader.read(10))
+    reader.skip(3 + 4)
+    has_alpha = color_type in (4, 6)
+    while not has_alpha:
+        length, kind = struct.unpack(">I4s", reader.read(8))
+        if kind in (b"IDAT", b"IEND"):
+            break
+        has_alpha = kind == b"tRNS"
+        reader.skip(length + 4)
+    return ImageInfo("png", width, height, depth, has_alpha)
+
+
+def _probe_jpeg(reader: _HeadReader) -> ImageInfo:
+    reader.skip(2)
+    while True:
+        byte = reader.read(1)
+        if byte != b"\xff":
+            raise ValueError("corrupt JPEG marker")
+        marker = reader.read(1)[0]
+        while marker == 0xFF:
+            marker = reader.read(1)[0]
+        if marker in _JPEG_STANDALONE:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise ValueError("JPEG has no SOF before the scan data")
+        (length,) = struct.unpack(">H", reader.read(2))
+        if marker in _JPEG_SOF:
+            precision, height, width, _components = struct.unpack(">BHHB", reader.read(6))
+            return ImageInfo("jpeg", width, height, precision, False)
+        reader.skip(length - 2)
+
+
+def _probe_webp(head: bytes) -> ImageInfo:
+    kind = head[12:16]
+    if kind == b"VP8 ":
+        if head[23:26] != b"\x9d\x01\x2a":
+            raise ValueError("bad VP8 start code")
+        width, height = struct.unpack("<HH", head[26:30])
+        return ImageInfo("webp", width & 0x3FFF, height & 0x3FFF, 8, False)
+    if kind == b"VP8L":
+        if head[20] != 0x2F:
+            raise ValueError("bad VP8L signature")
+        bits = int.from_bytes(head[21:25], "little")
+        return ImageInfo("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 8, bool(bits >> 28 & 1))
+    if kind == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return ImageInfo("webp", width, height, 8, bool(head[20] & 0x10))
+    raise ValueError(f"unknown WebP chunk {kind!r}")
+
+
+def probe_image(fh: BinaryIO) -> ImageInfo | None:
+    """Dimensions, bit depth and alpha from the header; ``None`` if the format is not recognised."""
+    head = fh.read(HEAD_SIZE)
+    if head.startswith(PNG_SIGNATURE):
+        return _probe_png(_HeadReader(fh, head))
+    if head.startswith(b"\xff\xd8\xff"):
+        return _probe_jpeg(_HeadReader(fh, head))
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        return _probe_webp(head)
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 11:
+        width, height, flags = struct.unpack("<HHB", head[6:11])
+        return ImageInfo("gif", width, height, (flags & 0x07) + 1, False)
+    return None
+
+
+@dataclass
+class LintResult:
+    images: int = 0
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+
+def lint_images(
+    data: dict,
+    files: Iterable[str],
+    opener: Callable[[str], BinaryIO],
+    screen: tuple[int, int] = DEFAULT_SCREEN,
+    max_scale: float = DEFAULT_MAX_SCALE,
+) -> LintResult:
+    """Probe every image among ``files`` (paths relative to the theme root) and apply the lint rules.
+
+    Errors: unreadable images and extensions that do not match the real
+    format. Warnings: required icons whose size differs from the most common
+    icon size, icons without alpha, and backgrounds more than ``max_scale``
+    times the target ``screen`` in either dimension.
+    """
+    result = LintResult()
+    infos: dict[str, ImageInfo] = {}
+    for rel in sorted(files):
+        expected = IMAGE_EXTENSIONS.get(posixpath.splitext(rel)[1].lower())
+        if expected is None:
+            continue
+        result.images += 1
+        try:
+            with opener(rel) as fh:
+                info = probe_image(fh)
+        except (OSError, ValueError, struct.error) as exc:
+            result.errors.append(f"{rel}: unreadable {expected} header ({exc})")
+            continue
+        if info is None:
+            result.errors.append(f"{rel}: not a recognised image")
+            continue
+        if info.format != expected:
+            result.errors.append(f"{rel}: extension says {expected} but the file is {info.format}")
+        infos[rel] = info
+
+    icon_folder = next((folder for path, folder in folder_references(data) if path == "$.icons.path"), None)
+    if icon_folder is not None:
+        icons = {
+            rel: infos[rel]
+            for rel in (posixpath.join(icon_folder, name) for name in REQUIRED_ICON_NAMES)
+            if rel in infos
+        }
+        sizes = Counter((info.width, info.height) for info in icons.values())
+        if len(sizes) > 1:
+            (common_w, common_h), _count = sizes.most_common(1)[0]
+            for rel, info in icons.items():
+                if (info.width, info.height) != (common_w, common_h):
+                    result.warnings.append(
+                        f"{rel}: icon is {info.width}x{info.height}, most icons are {common_w}x{common_h}"
+                    )
+        for rel, info in icons.items():
+            if not info.has_alpha:
+                result.warnings.append(f"{rel}: icon has no alpha channel")
+
+    limit_w, limit_h = screen[0] * max_scale, screen[1] * max_scale
+    for path, rel in asset_references(data):
+        info = infos.get(rel)
+        if info is None or not path.startswith("$.backgrounds"):
+            continue
+        if info.width > limit_w or info.height > limit_h:
+            result.warnings.append(
+                f"{rel}: background is {info.width}x{info.height}, "
+                f"over {max_scale:g}x the {screen[0]}x{screen[1]} screen"
+            )
+    return result
@@ -0,0 +1,230 @@
+"""Asset reference integrity: does every path theme.json names exist?
+
+A ``TreeSnapshot`` is one listing of a theme (a single ``os.scandir`` walk of
+a directory, or a ZIP's central directory); every reference is then resolved
+against it in memory. Problems come back as schema ``Issue``s:
+
+* errors: referenced images and required icons that are missing, or that
+  exist only with different letter case (fine on Windows and macOS, broken
+  on the watch's case-sensitive file system);
+* warnings: ``assets``/``icons`` folders that do not exist, and files that
+  nothing references and only make the package bigger. Files in the
+  ``assets.images`` and ``assets.buttons`` folders are never reported:
+  theme.md puts decorations and button states (``primary_pressed.png``)
+  there by convention, without naming them in theme.json.
+"""
+
+from __future__ import annotations
+
+import posixpath
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from theme_archive import MANIFEST_NAME
+from theme_ignore import IgnoreRules, scan_tree
+from theme_schema import Issue, ValidationReport, child_path, is_relative_path
+
+
+REQUIRED_ICON_NAMES = [
+    "首页.png",
+    "音量.png",
+    "音乐.png",
+    "闹钟.png",
+    "返回.png",
+    "订阅.png",
+    "警告.png",
+    "菜单.png",
+    "暂停.png",
+    "播放.png",
+    "搜索.png",
+    "喜欢.png",
+    "加载.png",
+    "加.png",
+    "删除.png",
+    "减.png",
+    "关于.png",
+    "光盘.png",
+    "不喜欢.png",
+    "下载.png",
+    "下一曲.png",
+    "上一曲.png",
+    "logo.png",
+]
+
+KNOWN_FILES = {"theme.json", "preview.png", "checksums.json", MANIFEST_NAME}
+# theme.md section 2 layout, used when theme.json has no ``assets`` entry for them.
+CONVENTION_FOLDERS = {"images": "images", "buttons": "buttons"}
+
+
+@dataclass
+class TreeSnapshot:
+    """Files (relative path -> size) and folders of one theme."""
+
+    files: dict[str, int]
+    dirs: set[str]
+    lower: dict[str, str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.lower = {path.lower(): path for path in (*self.files, *self.dirs)}
+
+    @classmethod
+    def from_directory(cls, theme_dir: Path, rules: IgnoreRules | None = None) -> "TreeSnapshot":
+        """One scandir walk, honouring ``.themeignore`` so the snapshot matches what gets packed."""
+        scan = scan_tree(Path(theme_dir), rules)
+        return cls({item.rel: item.size for item in scan.files}, set(scan.dirs))
+
+    @classmethod
+    def from_listing(cls, files: dict[str, int]) -> "TreeSnapshot":
+        """From archive member sizes; folders are implied by the file paths."""
+        dirs = set()
+        for path in files:
+            parent = posixpath.dirname(path)
+            while parent and parent not in dirs:
+                dirs.add(parent)
+                parent = posixpath.dirname(parent)
+        return cls(dict(files), dirs)
+
+
+def _asset_base(data: dict) -> str:
+    assets = data.get("assets")
+    base = assets.get("base", ".") if isinstance(assets, dict) else "."
+    return base if isinstance(base, str) and is_relative_path(base) else "."
+
+
+def _resolve(base: str, value: str) -> str:
+    return posixpath.normpath(posixpath.join(base, value))
+
+
+def asset_references(data: Any) -> list[tuple[str, str]]:
+    """``(json path, file path relative to the theme root)`` for every image theme.json points at.
+
+    Values that break the schema's path rule are skipped; ``validate_theme``
+    already reports them.
+    """
+    if not isinstance(data, dict):
+        return []
+    base = _asset_base(data)
+    refs = []
+    for section, field_name in (("backgrounds", "value"), ("buttons", "image")):
+        entries = data.get(section)
+        if not isinstance(entries, dict):
+            continue
+        for name, entry in entries.items():
+            if not isinstance(entry, dict):
+                continue
+            if section == "backgrounds" and entry.get("type") != "image":
+                continue
+            value = entry.get(field_name)
+            if isinstance(value, str) and is_relative_path(value):
+                refs.append((f"{child_path(f'$.{section}', name)}.{field_name}", _resolve(base, value)))
+    return refs
+
+
+def folder_references(data: Any) -> list[tuple[str, str]]:
+    """``(json path, folder)`` for ``assets.*`` and ``icons.path``."""
+    if not isinstance(data, dict):
+        return []
+    base = _asset_base(data)
+    refs = []
+    assets = data.get("assets")
+    if isinstance(assets, dict):
+        for key, value in assets.items():
+            if isinstance(value, str) and is_relative_path(value):
+                refs.append((child_path("$.assets", key), value if key == "base" else _resolve(base, value)))
+    icons = data.get("icons")
+    if isinstance(icons, dict):
+        value = icons.get("path", "icons")
+        if isinstance(value, str) and is_relative_path(value):
+            refs.append(("$.icons.path", _resolve(base, value)))
+    return refs
+
+
+def required_icon_paths(data: Any) -> list[str]:
+    """Paths of the required icons; none when theme.json has no ``icons`` section (the app's own are used)."""
+    for path, folder in folder_references(data):
+        if path == "$.icons.path":
+            return [posixpath.join(folder, name) for name in REQUIRED_ICON_NAMES]
+    return []
+
+
+def convention_folders(data: Any) -> list[str]:
+    """The image and button folders, whose files may be used without being named in theme.json."""
+    if not isinstance(data, dict):
+        return []
+    base = _asset_base(data)
+    assets = data.get("assets") if isinstance(data.get("assets"), dict) else {}
+    folders = []
+    for key, default in CONVENTION_FOLDERS.items():
+        value = assets.get(key, default)
+        if isinstance(value, str) and is_relative_path(value):
+            folders.append(_normalize_folder(_resolve(base, value)))
+    return folders
+
+
+@dataclass
+class IntegrityReport(ValidationReport):
+    referenced: set[str] = field(default_factory=set)
+    unreferenced: list[str] = field(default_factory=list)
+    unreferenced_bytes: int = 0
+
+
+def _normalize_folder(folder: str) -> str:
+    folder = posixpath.normpath(folder)
+    return "" if folder == "." else folder
+
+
+def check_integrity(data: Any, snapshot: TreeSnapshot) -> IntegrityReport:
+    """Resolve every reference in ``data`` against ``snapshot`` without touching the file system."""
+    report = IntegrityReport()
+
+    def find(rel: str, path: str) -> bool:
+        report.referenced.add(rel)
+        if rel in snapshot.files:
+            return True
+        actual = snapshot.lower.get(rel.lower())
+        if actual is not None:
+            report.referenced.add(actual)
+            report.errors.append(Issue(path, f"case mismatch: {rel} is stored as {actual}"))
+        return False
+
+    for path, rel in asset_references(data):
+        if not find(rel, path) and rel.lower() not in snapshot.lower:
+            report.errors.append(Issue(path, f"file not found: {rel}"))
+
+    icons = required_icon_paths(data)
+    missing = [rel for rel in icons if not find(rel, "$.icons.path") and rel.lower() not in snapshot.lower]
+    if missing:
+        names = ", ".join(posixpath.basename(rel) for rel in missing)
+        folder = posixpath.dirname(missing[0])
+        report.errors.append(Issue("$.icons.path", f"{len(missing)} required icons missing in {folder}/: {names}"))
+
+    for path, folder in folder_references(data):
+        folder = _normalize_folder(folder)
+        if not folder or folder in snapshot.dirs:
+            continue
+        actual = snapshot.lower.get(folder.lower())
+        if actual is not None:
+            report.errors.append(Issue(path, f"case mismatch: {folder}/ is stored as {actual}/"))
+        else:
+            report.warnings.append(Issue(path, f"folder not found: {folder}/"))
+
+    # A folder at the theme root would exempt everything, so only real subfolders count.
+    conventional = tuple(f"{folder}/" for folder in convention_folders(data) if folder)
+    for rel, size in sorted(snapshot.files.items()):
+        if rel in report.referenced or rel in KNOWN_FILES or rel.startswith(conventional):
+            continue
+        report.unreferenced.append(rel)
+        report.unreferenced_bytes += size
+    for rel in report.unreferenced:
+        report.warnings.append(Issue("$", f"unreferenced file: {rel} ({snapshot.files[rel]} bytes)"))
+    return report
+
+
+def format_integrity(report: IntegrityReport) -> Iterable[str]:
+    for issue in report.errors:
+        yield f"error: {issue}"
+    for issue in report.warnings:
+        yield f"warning: {issue}"
+    if report.unreferenced:
+        yield f"{len(report.unreferenced)} unreferenced files, {report.unreferenced_bytes} bytes"
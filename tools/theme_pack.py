@@ -0,0 +1,811 @@
+"""Theme package writer shared by the reference CLI and the GUI tool.
+
+Entries are compressed on a thread pool (zlib releases the GIL while it
+deflates) and a single writer appends them to the archive in arcname order,
+so the bytes of the resulting ZIP never depend on the worker count.
+
+Each entry's method comes from a ``CompressionPolicy`` (already-compressed
+assets are stored), and incremental packs copy the raw compressed bytes and
+CRC of unchanged members out of the previous archive instead of compressing
+them again. Archives can also be written to a non-seekable stream, in which
+case large files are compressed straight into it behind a data descriptor.
+"""
+
+from __future__ import annotations
+
+import bz2
+import hashlib
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, TypeVar
+
+from theme_archive import (
+    MANIFEST_NAME,
+    build_manifest,
+    detect_single_root,
+    load_manifest,
+    manifest_bytes,
+    strip_root,
+)
+from theme_ignore import IgnoreRules, TreeScan, scan_tree
+from theme_png import PngOptimizer
+
+
+DEFAULT_LEVEL = 6
+CHUNK_SIZE = 1 << 20
+STREAM_THRESHOLD = 4 << 20
+TEXT_THRESHOLD = 64 * 1024
+MAX_ZIP32 = 0xFFFFFFFF
+DETERMINISTIC_ATTR = 0o100644 << 16
+
+TEXT_EXTENSIONS = {".json", ".txt", ".md", ".svg", ".xml", ".css", ".js", ".html"}
+METHOD_NAMES = {
+    zipfile.ZIP_STORED: "stored",
+    zipfile.ZIP_DEFLATED: "deflated",
+    zipfile.ZIP_BZIP2: "bzip2",
+    zipfile.ZIP_LZMA: "lzma",
+}
+# Methods whose output depends on ``CompressionPolicy.level``.
+LEVELLED_METHODS = {zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2}
+# Packs record their level in the archive comment; ZIP entries have nowhere to keep it.
+PACK_COMMENT_PREFIX = b"themeshop-pack level="
+_METHOD_VERSIONS = {zipfile.ZIP_STORED: 10, zipfile.ZIP_DEFLATED: 20, zipfile.ZIP_BZIP2: 46, zipfile.ZIP_LZMA: 63}
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+@dataclass(frozen=True)
+class SourceFile:
+    path: Path
+    arcname: str
+
+
+@dataclass
+class PackedEntry:
+    arcname: str
+    method: int
+    crc: int
+    file_size: int
+    data: bytes
+    date_time: tuple[int, int, int, int, int, int]
+    external_attr: int
+    reused: bool = False
+    deferred: bool = False
+    sha256: str = ""
+    elapsed: float = 0.0
+    saved: int = 0
+    compress_size: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.compress_size = len(self.data)
+
+
+@dataclass
+class PackResult:
+    output: Path | None
+    entries: int
+    bytes_in: int
+    bytes_out: int
+    elapsed: float
+    sha256: str
+    reused: int = 0
+    report: list[PackedEntry] = field(default_factory=list)
+    manifest: dict | None = None
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def collect_theme(
+    source_dir: Path, root_name: str | None = None, rules: IgnoreRules | None = None
+) -> tuple[list[SourceFile], TreeScan]:
+    """Files below ``source_dir`` that survive ``.themeignore``, as ``root_name/<relative path>``."""
+    source_dir = Path(source_dir)
+    root_name = root_name or source_dir.name
+    scan = scan_tree(source_dir, rules)
+    return [SourceFile(item.path, f"{root_name}/{item.rel}") for item in scan.files], scan
+
+
+def collect_directory(source_dir: Path, root_name: str | None = None) -> list[SourceFile]:
+    return collect_theme(source_dir, root_name)[0]
+
+
+def _dos_date_time(date_time: tuple[int, ...]) -> tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+def reproducible_date_time() -> tuple[int, int, int, int, int, int]:
+    """Timestamp for deterministic packs: ``SOURCE_DATE_EPOCH`` (UTC) if set, else 1980-01-01."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH", "").strip()
+    if epoch.isdigit():
+        stamp = time.gmtime(int(epoch))[:6]
+        if stamp[0] >= 1980:
+            return stamp
+    return (1980, 1, 1, 0, 0, 0)
+
+
+def _file_date_time(mtime: float) -> tuple[int, int, int, int, int, int]:
+    stamp = time.localtime(mtime)[:6]
+    if stamp[0] < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    return stamp
+
+
+def _same_dos_time(left: tuple[int, ...], right: tuple[int, ...]) -> bool:
+    return left[:5] == right[:5] and left[5] // 2 == right[5] // 2
+
+
+def _digest_from(fh: BinaryIO, head: bytes) -> tuple[int, str]:
+    """CRC-32 and SHA-256 of ``head`` followed by the rest of ``fh``."""
+    crc = zlib.crc32(head)
+    sha = hashlib.sha256(head)
+    while True:
+        chunk = fh.read(CHUNK_SIZE)
+        if not chunk:
+            return crc, sha.hexdigest()
+        crc = zlib.crc32(chunk, crc)
+        sha.update(chunk)
+
+
+def file_digests(path: Path) -> tuple[int, str]:
+    """CRC-32 and SHA-256 of a file in a single read."""
+    with path.open("rb") as fh:
+        return _digest_from(fh, b"")
+
+
+@dataclass(frozen=True)
+class CompressionPolicy:
+    """Chooses the ZIP method for each entry.
+
+    Known text formats go straight to ``method``, or to ``text_method`` once
+    they reach ``text_threshold`` bytes (large JSON/SVG is where LZMA beats
+    deflate). ``text_method`` is off by default: the package is unzipped on
+    the user's phone or computer, and not every unzipper reads LZMA or bzip2.
+    Everything else (PNG/JPG/WebP and unknown extensions) gets a level-1
+    deflate trial on its first ``sample_size`` bytes and is stored when that
+    saves less than ``min_saving``.
+    """
+
+    method: int = zipfile.ZIP_DEFLATED
+    level: int = DEFAULT_LEVEL
+    sample_size: int = 16 * 1024
+    min_saving: float = 0.05
+    text_method: int | None = None
+    text_threshold: int = TEXT_THRESHOLD
+
+    def choose(self, arcname: str, head: bytes, size: int | None = None) -> int:
+        if not head:
+            return zipfile.ZIP_STORED
+        if Path(arcname).suffix.lower() in TEXT_EXTENSIONS:
+            if self.text_method is not None and (len(head) if size is None else size) >= self.text_threshold:
+                return self.text_method
+            return self.method
+        trial = zlib.compressobj(1, zlib.DEFLATED, -15)
+        sample = trial.compress(head) + trial.flush()
+        if len(sample) > len(head) * (1 - self.min_saving):
+            return zipfile.ZIP_STORED
+        return self.method
+
+
+DEFAULT_POLICY = CompressionPolicy()
+
+
+def pack_comment(level: int) -> bytes:
+    return PACK_COMMENT_PREFIX + str(level).encode("ascii")
+
+
+def _comment_level(comment: bytes) -> int | None:
+    if not comment.startswith(PACK_COMMENT_PREFIX):
+        return None
+    try:
+        return int(comment[len(PACK_COMMENT_PREFIX) :])
+    except ValueError:
+        return None
+
+
+def _new_compressor(method: int, level: int):
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(min(max(level, 1), 9))
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMACompressor()
+    return None
+
+
+class PreviousArchive:
+    """Raw member access to an earlier build of the same package.
+
+    A member is reused when its size and method match (and, for deflate and
+    bzip2, the level recorded in the archive comment) and either its
+    timestamp or its CRC-32 matches the file on disk; the compressed bytes
+    are copied as-is. SHA-256 digests come from the embedded manifest when
+    the previous build has one.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._fp = Path(path).open("rb")
+        self._lock = threading.Lock()
+        self._digests: dict[str, str] = {}
+        try:
+            with zipfile.ZipFile(self._fp) as archive:
+                self.level = _comment_level(archive.comment)
+                self._members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+                root = detect_single_root(self._members)
+                manifest_name = f"{root}/{MANIFEST_NAME}" if root else MANIFEST_NAME
+                if manifest_name in self._members:
+                    try:
+                        files = load_manifest(archive.read(manifest_name))["files"]
+                    except ValueError:
+                        files = {}
+                    prefix = f"{root}/" if root else ""
+                    for path, record in files.items():
+                        if isinstance(record, dict) and isinstance(record.get("sha256"), str):
+                            self._digests[prefix + path] = record["sha256"]
+        except BaseException:
+            self._fp.close()
+            raise
+
+    def __enter__(self) -> "PreviousArchive":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._fp.close()
+
+    def lookup(self, arcname: str, size: int, method: int, level: int) -> zipfile.ZipInfo | None:
+        info = self._members.get(arcname)
+        if info is None or info.file_size != size or info.compress_type != method or info.flag_bits & 0x1:
+            return None
+        if method in LEVELLED_METHODS and self.level != level:
+            return None
+        return info
+
+    @property
+    def members(self) -> dict[str, zipfile.ZipInfo]:
+        return self._members
+
+    def digest(self, arcname: str) -> str | None:
+        return self._digests.get(arcname)
+
+    def raw_entry(self, info: zipfile.ZipInfo, arcname: str) -> PackedEntry:
+        """The member as an entry for ``ZipWriter.add`` under a new name, without inflating it."""
+        return PackedEntry(
+            arcname=arcname,
+            method=info.compress_type,
+            crc=info.CRC,
+            file_size=info.file_size,
+            data=self.read_raw(info),
+            date_time=info.date_time,
+            external_attr=info.external_attr,
+            reused=True,
+            sha256=self.digest(info.filename) or "",
+        )
+
+    def read_raw(self, info: zipfile.ZipInfo) -> bytes:
+        with self._lock:
+            self._fp.seek(info.header_offset)
+            header = self._fp.read(_LOCAL_HEADER.size)
+            fields = _LOCAL_HEADER.unpack(header)
+            if fields[0] != 0x04034B50:
+                raise zipfile.BadZipFile(f"{info.filename}: bad local header")
+            self._fp.seek(fields[9] + fields[10], os.SEEK_CUR)
+            data = self._fp.read(info.compress_size)
+        if len(data) != info.compress_size:
+            raise zipfile.BadZipFile(f"{info.filename}: truncated member")
+        return data
+
+
+def pack_entry(
+    source: SourceFile,
+    policy: CompressionPolicy = DEFAULT_POLICY,
+    previous: PreviousArchive | None = None,
+    deterministic: bool = False,
+    defer_above: int | None = None,
+    optimizer: PngOptimizer | None = None,
+) -> PackedEntry:
+    """Read and compress one file; safe to call from worker threads.
+
+    Files larger than ``defer_above`` are only classified, not read: the
+    returned entry is marked ``deferred`` for ``ZipWriter.add_stream``.
+    Files the ``optimizer`` accepts are read whole and rewritten first.
+    """
+    started = time.perf_counter()
+    st = source.path.stat()
+    date_time = _file_date_time(st.st_mtime)
+    external_attr = (st.st_mode & 0xFFFF) << 16
+    file_date_time = date_time
+    if deterministic:
+        date_time = reproducible_date_time()
+        external_attr = DETERMINISTIC_ATTR
+    if optimizer is not None and optimizer.accepts(source.arcname):
+        optimized = optimizer.optimize(source.path.read_bytes())
+        entry = pack_bytes(source.arcname, optimized.data, policy, date_time, external_attr, previous)
+        entry.saved = optimized.saved
+        entry.elapsed = time.perf_counter() - started
+        return entry
+    with source.path.open("rb") as fh:
+        head = fh.read(policy.sample_size)
+        method = policy.choose(source.arcname, head, st.st_size)
+
+        if previous is not None:
+            info = previous.lookup(source.arcname, st.st_size, method, policy.level)
+            digest = None
+            if info is not None:
+                if _same_dos_time(info.date_time, file_date_time):
+                    digest = previous.digest(source.arcname)
+                else:
+                    crc, digest = _digest_from(fh, head)
+                    if crc != info.CRC:
+                        info = None
+            if info is not None:
+                if digest is None:
+                    fh.seek(0)
+                    _crc, digest = _digest_from(fh, b"")
+                return PackedEntry(
+                    arcname=source.arcname,
+                    method=method,
+                    crc=info.CRC,
+                    file_size=info.file_size,
+                    data=previous.read_raw(info),
+                    date_time=date_time,
+                    external_attr=external_attr,
+                    reused=True,
+                    sha256=digest,
+                    elapsed=time.perf_counter() - started,
+                )
+            fh.seek(len(head))
+
+        if defer_above is not None and st.st_size > defer_above:
+            return PackedEntry(
+                arcname=source.arcname,
+                method=method,
+                crc=0,
+                file_size=st.st_size,
+                data=b"",
+                date_time=date_time,
+                external_attr=external_attr,
+                deferred=True,
+            )
+
+        compressor = _new_compressor(method, policy.level)
+        parts = []
+        crc = 0
+        sha = hashlib.sha256()
+        size = 0
+        chunk = head
+        while chunk:
+            crc = zlib.crc32(chunk, crc)
+            sha.update(chunk)
+            size += len(chunk)
+            parts.append(compressor.compress(chunk) if compressor else chunk)
+            chunk = fh.read(CHUNK_SIZE)
+    if compressor:
+        parts.append(compressor.flush())
+    return PackedEntry(
+        arcname=source.arcname,
+        method=method,
+        crc=crc,
+        file_size=size,
+        data=b"".join(parts),
+        date_time=date_time,
+        external_attr=external_attr,
+        sha256=sha.hexdigest(),
+        elapsed=time.perf_counter() - started,
+    )
+
+
+def pack_bytes(
+    arcname: str,
+    data: bytes,
+    policy: CompressionPolicy,
+    date_time: tuple[int, ...],
+    external_attr: int,
+    previous: PreviousArchive | None = None,
+) -> PackedEntry:
+    """Build an entry for in-memory content such as the manifest or an optimised PNG.
+
+    With ``previous``, a member of the same size, method and CRC is copied
+    raw instead of being compressed again.
+    """
+    method = policy.choose(arcname, data[: policy.sample_size], len(data))
+    crc = zlib.crc32(data)
+    sha256 = hashlib.sha256(data).hexdigest()
+    if previous is not None:
+        info = previous.lookup(arcname, len(data), method, policy.level)
+        if info is not None and info.CRC == crc:
+            return PackedEntry(
+                arcname=arcname,
+                method=method,
+                crc=crc,
+                file_size=len(data),
+                data=previous.read_raw(info),
+                date_time=date_time,
+                external_attr=external_attr,
+                reused=True,
+                sha256=sha256,
+            )
+    compressor = _new_compressor(method, policy.level)
+    return PackedEntry(
+        arcname=arcname,
+        method=method,
+        crc=crc,
+        file_size=len(data),
+        data=compressor.compress(data) + compressor.flush() if compressor else data,
+        date_time=date_time,
+        external_attr=external_attr,
+        sha256=sha256,
+    )
+
+
+class ZipWriter:
+    """Minimal append-only ZIP writer.
+
+    Offsets are tracked locally, so the target only needs ``write`` and may be
+    a pipe. Precompressed entries go through ``add``; ``add_stream`` compresses
+    a file chunk by chunk and, when the sizes are not known up front, follows
+    it with a data descriptor. The SHA-256 of everything written is available
+    from ``sha256`` after close.
+    """
+
+    def __init__(self, fileobj: BinaryIO, comment: bytes = b"") -> None:
+        self._fp = fileobj
+        self._comment = comment
+        self._offset = 0
+        self._central: list[bytes] = []
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def _write(self, data: bytes) -> None:
+        self._fp.write(data)
+        self._hash.update(data)
+        self._offset += len(data)
+
+    def _begin(self, entry: PackedEntry, flags: int) -> int:
+        if self._offset > MAX_ZIP32:
+            raise ValueError(f"{entry.arcname}: theme packages do not support ZIP64 sizes")
+        header_offset = self._offset
+        name = entry.arcname.encode("utf-8")
+        dos_date, dos_time = _dos_date_time(entry.date_time)
+        if flags & 0x08:
+            crc, compress_size, file_size = 0, 0, 0
+        else:
+            crc, compress_size, file_size = entry.crc, entry.compress_size, entry.file_size
+        self._write(
+            _LOCAL_HEADER.pack(
+                0x04034B50,
+                _METHOD_VERSIONS[entry.method],
+                flags,
+                entry.method,
+                dos_time,
+                dos_date,
+                crc,
+                compress_size,
+                file_size,
+                len(name),
+                0,
+            )
+        )
+        self._write(name)
+        return header_offset
+
+    def _finish(self, entry: PackedEntry, flags: int, header_offset: int) -> None:
+        if entry.file_size > MAX_ZIP32 or entry.compress_size > MAX_ZIP32:
+            raise ValueError(f"{entry.arcname}: theme packages do not support ZIP64 sizes")
+        name = entry.arcname.encode("utf-8")
+        version = _METHOD_VERSIONS[entry.method]
+        dos_date, dos_time = _dos_date_time(entry.date_time)
+        self._central.append(
+            _CENTRAL_HEADER.pack(
+                0x02014B50,
+                3 << 8 | max(version, 20),
+                version,
+                flags,
+                entry.method,
+                dos_time,
+                dos_date,
+                entry.crc,
+                entry.compress_size,
+                entry.file_size,
+                len(name),
+                0,
+                0,
+                0,
+                0,
+                entry.external_attr,
+                header_offset,
+            )
+            + name
+        )
+
+    @staticmethod
+    def _flags(entry: PackedEntry) -> int:
+        flags = 0 if entry.arcname.isascii() else 0x800
+        if entry.method == zipfile.ZIP_LZMA:
+            flags |= 0x02
+        return flags
+
+    def add(self, entry: PackedEntry) -> None:
+        if entry.file_size > MAX_ZIP32 or entry.compress_size > MAX_ZIP32:
+            raise ValueError(f"{entry.arcname}: theme packages do not support ZIP64 sizes")
+        flags = self._flags(entry)
+        header_offset = self._begin(entry, flags)
+        self._write(entry.data)
+        self._finish(entry, flags, header_offset)
+
+    def add_stream(self, entry: PackedEntry, path: Path, level: int = DEFAULT_LEVEL) -> None:
+        """Write ``path`` using ``entry``'s name, method and attributes with bounded memory.
+
+        Stored entries get a CRC pre-pass so their header is complete; compressed
+        entries are written with a data descriptor. ``entry`` receives the final
+        CRC, SHA-256 and sizes.
+        """
+        flags = self._flags(entry)
+        compressor = _new_compressor(entry.method, level)
+        if compressor is None:
+            with path.open("rb") as fh:
+                entry.crc, entry.sha256 = _digest_from(fh, b"")
+                entry.file_size = entry.compress_size = fh.tell()
+        else:
+            flags |= 0x08
+        header_offset = self._begin(entry, flags)
+        crc = 0
+        sha = hashlib.sha256()
+        size = 0
+        compress_size = 0
+        with path.open("rb") as fh:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                if compressor is not None:
+                    sha.update(chunk)
+                size += len(chunk)
+                out = compressor.compress(chunk) if compressor else chunk
+                compress_size += len(out)
+                self._write(out)
+        if compressor is None:
+            if crc != entry.crc or size != entry.file_size:
+                raise ValueError(f"{entry.arcname}: file changed while it was being packed")
+        else:
+            tail = compressor.flush()
+            compress_size += len(tail)
+            self._write(tail)
+            entry.crc, entry.file_size, entry.compress_size = crc, size, compress_size
+            entry.sha256 = sha.hexdigest()
+            if size > MAX_ZIP32 or compress_size > MAX_ZIP32:
+                raise ValueError(f"{entry.arcname}: theme packages do not support ZIP64 sizes")
+            self._write(_DATA_DESCRIPTOR.pack(0x08074B50, crc, compress_size, size))
+        self._finish(entry, flags, header_offset)
+
+    def close(self) -> None:
+        if len(self._central) > 0xFFFF:
+            raise ValueError("theme packages do not support more than 65535 entries")
+        start = self._offset
+        for record in self._central:
+            self._write(record)
+        count = len(self._central)
+        self._write(
+            _END_RECORD.pack(0x06054B50, 0, 0, count, count, self._offset - start, start, len(self._comment))
+        )
+        self._write(self._comment)
+        self._fp.flush()
+
+
+def ordered_map(func: Callable[[_T], _R], items: Iterable[_T], workers: int) -> Iterator[_R]:
+    """Like ``map`` but runs on a thread pool, keeping at most ``2 * workers`` results in flight."""
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque()
+        for item in items:
+            window.append(pool.submit(func, item))
+            if len(window) >= workers * 2:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def _write_archive(
+    writer: ZipWriter,
+    sources: list[SourceFile],
+    workers: int,
+    policy: CompressionPolicy,
+    previous: Path | None,
+    deterministic: bool,
+    stream_threshold: int | None,
+    manifest: bool,
+    optimizer: PngOptimizer | None,
+) -> tuple[list[PackedEntry], dict | None]:
+    root = detect_single_root(source.arcname for source in sources)
+    manifest_arcname = f"{root}/{MANIFEST_NAME}" if root else MANIFEST_NAME
+    if manifest:
+        sources = [source for source in sources if source.arcname != manifest_arcname]
+    report = []
+    previous_archive = PreviousArchive(previous) if previous is not None else None
+    try:
+        func = partial(
+            pack_entry,
+            policy=policy,
+            previous=previous_archive,
+            deterministic=deterministic,
+            defer_above=stream_threshold,
+            optimizer=optimizer,
+        )
+        for source, entry in zip(sources, ordered_map(func, sources, workers)):
+            if entry.deferred:
+                started = time.perf_counter()
+                writer.add_stream(entry, source.path, policy.level)
+                entry.elapsed = time.perf_counter() - started
+            else:
+                writer.add(entry)
+                entry.data = b""  # keep only the metadata for the report
+            report.append(entry)
+        manifest_data = None
+        if manifest:
+            manifest_data = build_manifest(
+                (strip_root(entry.arcname, root), entry.file_size, entry.sha256) for entry in report
+            )
+            if deterministic:
+                date_time, external_attr = reproducible_date_time(), DETERMINISTIC_ATTR
+            else:
+                date_time, external_attr = _file_date_time(time.time()), 0o100644 << 16
+            entry = pack_bytes(manifest_arcname, manifest_bytes(manifest_data), policy, date_time, external_attr)
+            writer.add(entry)
+            entry.data = b""
+            report.append(entry)
+        writer.close()
+    finally:
+        if previous_archive is not None:
+            previous_archive.close()
+    return report, manifest_data
+
+
+def pack_files(
+    sources: Iterable[SourceFile],
+    output: Path,
+    *,
+    workers: int | None = None,
+    policy: CompressionPolicy = DEFAULT_POLICY,
+    previous: Path | None = None,
+    deterministic: bool = False,
+    manifest: bool = True,
+    optimizer: PngOptimizer | None = None,
+) -> PackResult:
+    """Write ``sources`` to ``output`` sorted by arcname.
+
+    The archive is built next to ``output`` and moved into place once
+    complete, so a failed run never leaves a truncated package behind.
+    ``previous`` may name an earlier build (including ``output`` itself)
+    whose unchanged members are copied without recompression.
+
+    With ``deterministic`` every entry gets the same timestamp and 0644
+    permissions, so identical inputs and settings give byte-identical archives
+    (for a given zlib build).
+
+    Unless ``manifest`` is false, the SHA-256 and size of every file, taken
+    during the same read that compresses it, are appended as ``manifest.json``
+    under the theme root and returned in ``PackResult.manifest``.
+
+    An ``optimizer`` rewrites PNG files losslessly before compression; the
+    manifest then describes the optimised bytes that were shipped.
+    """
+    started = time.perf_counter()
+    output = Path(output)
+    ordered = sorted(sources, key=lambda item: item.arcname)
+    workers = default_workers() if workers is None else workers
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = output.with_name(output.name + ".part")
+    try:
+        with partial_path.open("wb") as fh:
+            writer = ZipWriter(fh, pack_comment(policy.level))
+            report, manifest_data = _write_archive(
+                writer, ordered, workers, policy, previous, deterministic, None, manifest, optimizer
+            )
+        os.replace(partial_path, output)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    return PackResult(
+        output=output,
+        entries=len(report),
+        bytes_in=sum(entry.file_size for entry in report),
+        bytes_out=writer.offset,
+        elapsed=time.perf_counter() - started,
+        sha256=writer.sha256,
+        reused=sum(entry.reused for entry in report),
+        report=report,
+        manifest=manifest_data,
+    )
+
+
+def pack_to_stream(
+    sources: Iterable[SourceFile],
+    fileobj: BinaryIO,
+    *,
+    workers: int | None = None,
+    policy: CompressionPolicy = DEFAULT_POLICY,
+    previous: Path | None = None,
+    deterministic: bool = False,
+    manifest: bool = True,
+    stream_threshold: int = STREAM_THRESHOLD,
+    optimizer: PngOptimizer | None = None,
+) -> PackResult:
+    """Write the archive to any writable, possibly non-seekable stream.
+
+    Files up to ``stream_threshold`` bytes are compressed on the worker
+    threads as in ``pack_files``; larger ones are compressed chunk by chunk
+    straight into the stream, so memory stays around
+    ``2 * workers * stream_threshold`` regardless of the theme size.
+    """
+    started = time.perf_counter()
+    ordered = sorted(sources, key=lambda item: item.arcname)
+    workers = default_workers() if workers is None else workers
+    writer = ZipWriter(fileobj, pack_comment(policy.level))
+    report, manifest_data = _write_archive(
+        writer, ordered, workers, policy, previous, deterministic, stream_threshold, manifest, optimizer
+    )
+    return PackResult(
+        output=None,
+        entries=len(report),
+        bytes_in=sum(entry.file_size for entry in report),
+        bytes_out=writer.offset,
+        elapsed=time.perf_counter() - started,
+        sha256=writer.sha256,
+        reused=sum(entry.reused for entry in report),
+        report=report,
+        manifest=manifest_data,
+    )
+
+
+def format_report(result: PackResult) -> list[str]:
+    """One line per entry with method, ratio and time, plus a totals line."""
+    lines = []
+    for entry in result.report:
+        ratio = entry.compress_size / entry.file_size if entry.file_size else 1.0
+        source = "reused" if entry.reused else f"{entry.elapsed * 1000:.1f} ms"
+        saved = f"  (png -{entry.saved})" if entry.saved else ""
+        lines.append(
+            f"{METHOD_NAMES[entry.method]:<8} {ratio:6.1%} {entry.file_size:>10} -> "
+            f"{entry.compress_size:>10}  {source:>9}  {entry.arcname}{saved}"
+        )
+    ratio = result.bytes_out / result.bytes_in if result.bytes_in else 1.0
+    lines.append(
+        f"total: {result.entries} entries, {result.bytes_in} -> {result.bytes_out} bytes "
+        f"({ratio:.1%}) in {result.elapsed * 1000:.1f} ms"
+    )
+    optimized = [entry for entry in result.report if entry.saved]
+    if optimized:
+        lines.append(
+            f"png: {len(optimized)} files optimised, {sum(entry.saved for entry in optimized)} bytes saved"
+        )
+    lines.append(f"sha256: {result.sha256}")
+    return lines
@@ -0,0 +1,149 @@
+"""Effective colors of a theme, resolved once per edit.
+
+``ResolvedPalette.from_theme`` applies the fallback chain the player uses
+(``text.title`` -> ``colors.text_primary``, ``buttons.primary.bg`` ->
+``colors.theme``, ...) and composites every translucent color over the
+surface it is drawn on, so each value is an opaque ``RGBA`` ready for Tk or
+a contrast check.
+
+The surfaces, from the bottom up: the app background (``backgrounds.app``
+when it is a color, otherwise ``colors.background``; image backgrounds are
+approximated by ``colors.background``), the card (``backgrounds.card`` or
+``colors.background``) and the header bar (``colors.theme``). Text sits on
+the card, buttons, sliders and lyrics on the app background, and the
+highlighted lyric on ``lyric.active_bg``.
+
+``PaletteCache`` keeps the last palette and rebuilds it only when one of
+``FINGERPRINT_SECTIONS`` changes.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Mapping
+
+from theme_color import RGBA, TRANSPARENT, parse_color
+
+
+# Every section ``ResolvedPalette.from_theme`` reads; ``theme_color.PALETTE_SECTIONS``
+# is narrower (only the sections made entirely of colors).
+FINGERPRINT_SECTIONS = ("colors", "text", "buttons", "lyric", "backgrounds")
+
+DEFAULT_APP_BACKGROUND = RGBA(0xF0, 0xF0, 0xF0)
+DEFAULT_CARD = RGBA(0xFF, 0xFF, 0xFF)
+DEFAULT_THEME = RGBA(0x00, 0xE5, 0xFF)
+DEFAULT_TEXT_PRIMARY = RGBA(0x00, 0x00, 0x00)
+DEFAULT_TEXT_SECONDARY = RGBA(0x66, 0x66, 0x66)
+DEFAULT_DANGER = RGBA(0xFF, 0x3B, 0x30)
+DEFAULT_SLIDER_UNSELECTED = RGBA(0xCC, 0xCC, 0xCC)
+
+
+def _section(data: Mapping[str, Any], name: str) -> Mapping[str, Any]:
+    value = data.get(name)
+    return value if isinstance(value, dict) else {}
+
+
+def _color(value: Any, fallback: RGBA) -> RGBA:
+    color = parse_color(value)
+    return fallback if color is None else color
+
+
+@dataclass(frozen=True)
+class ResolvedPalette:
+    """Opaque, composited colors for every preview role."""
+
+    app_background: RGBA
+    app_image: str | None
+    card: RGBA
+    header: RGBA
+    header_text: RGBA
+    title: RGBA
+    body: RGBA
+    caption: RGBA
+    primary_bg: RGBA
+    primary_text: RGBA
+    danger_bg: RGBA
+    danger_text: RGBA
+    slider_unselected: RGBA
+    slider_selected: RGBA
+    lyric_active_bg: RGBA
+    lyric_active: RGBA
+    lyric_normal: RGBA
+
+    @classmethod
+    def from_theme(cls, data: Mapping[str, Any]) -> "ResolvedPalette":
+        colors = _section(data, "colors")
+        text = _section(data, "text")
+        buttons = _section(data, "buttons")
+        lyric = _section(data, "lyric")
+        backgrounds = _section(data, "backgrounds")
+        primary = buttons.get("primary") if isinstance(buttons.get("primary"), dict) else {}
+        danger = buttons.get("danger") if isinstance(buttons.get("danger"), dict) else {}
+        app = backgrounds.get("app") if isinstance(backgrounds.get("app"), dict) else {}
+        card = backgrounds.get("card") if isinstance(backgrounds.get("card"), dict) else {}
+
+        base = _color(colors.get("background"), DEFAULT_APP_BACKGROUND).over(DEFAULT_APP_BACKGROUND)
+        app_image = None
+        if app.get("type") == "color":
+            base = _color(app.get("value"), base).over(base)
+        elif app.get("type") == "image" and isinstance(app.get("value"), str):
+            app_image = app["value"]
+
+        card_color = _color(colors.get("background"), DEFAULT_CARD)
+        if card.get("type") == "color":
+            card_color = _color(card.get("value"), card_color)
+        card_surface = card_color.over(base)
+
+        theme = _color(colors.get("theme"), DEFAULT_THEME)
+        text_primary = _color(colors.get("text_primary"), DEFAULT_TEXT_PRIMARY)
+        text_secondary = _color(colors.get("text_secondary"), DEFAULT_TEXT_SECONDARY)
+        header = theme.over(base)
+
+        primary_bg = _color(primary.get("bg"), theme).over(base)
+        danger_bg = _color(danger.get("bg"), DEFAULT_DANGER).over(base)
+        active_bg = _color(lyric.get("active_bg"), TRANSPARENT).over(base)
+
+        return cls(
+            app_background=base,
+            app_image=app_image,
+            card=card_surface,
+            header=header,
+            header_text=text_primary.over(header),
+            title=_color(text.get("title"), text_primary).over(card_surface),
+            body=_color(text.get("body"), text_primary).over(card_surface),
+            caption=_color(text.get("caption"), text_secondary).over(card_surface),
+            primary_bg=primary_bg,
+            primary_text=_color(primary.get("text"), text_primary).over(primary_bg),
+            danger_bg=danger_bg,
+            danger_text=_color(danger.get("text"), DEFAULT_DANGER).over(danger_bg),
+            slider_unselected=_color(colors.get("slider_unselected"), DEFAULT_SLIDER_UNSELECTED).over(base),
+            slider_selected=_color(colors.get("slider_selected"), theme).over(base),
+            lyric_active_bg=active_bg,
+            lyric_active=_color(lyric.get("active"), theme).over(active_bg),
+            lyric_normal=_color(lyric.get("normal"), text_secondary).over(base),
+        )
+
+    def hex(self) -> dict[str, str]:
+        """Role -> ``#rrggbb`` for every color field, for drawing with Tk."""
+        return {item.name: value.hex for item in fields(self) if isinstance(value := getattr(self, item.name), RGBA)}
+
+
+def palette_fingerprint(data: Mapping[str, Any]) -> str:
+    """Stable key over the sections a palette depends on."""
+    return json.dumps([data.get(name) for name in FINGERPRINT_SECTIONS], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class PaletteCache:
+    """The most recent ``ResolvedPalette``, rebuilt only when its sections change."""
+
+    def __init__(self) -> None:
+        self._key: str | None = None
+        self._palette: ResolvedPalette | None = None
+
+    def get(self, data: Mapping[str, Any]) -> ResolvedPalette:
+        key = palette_fingerprint(data)
+        if self._palette is None or key != self._key:
+            self._palette = ResolvedPalette.from_theme(data)
+            self._key = key
+        return self._palette
@@ -0,0 +1,164 @@
+"""Lossless PNG optimisation for the pack ``--optimize`` stage.
+
+Only the container changes: metadata chunks (text, modification time,
+EXIF) are dropped and the IDAT stream is inflated and deflated again at
+level 9. Everything that affects how the image looks is kept, including
+``tRNS`` and the color-management chunks (``gAMA``, ``cHRM``, ``sRGB``,
+``iCCP``). The filtered scanlines are byte-for-byte the same, so the
+decoded pixels are identical. Animated PNGs and files that do not parse are
+returned untouched, as is any file the rewrite would not make smaller.
+
+Results are cached on disk by the SHA-256 of the input, so repacking an
+unchanged theme costs one hash per image.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+OPTIMIZER_VERSION = 2
+STRIP_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME", b"eXIf"}
+ANIMATION_CHUNKS = {b"acTL", b"fcTL", b"fdAT"}
+IDAT_CHUNK_SIZE = 1 << 24
+
+_CHUNK_HEADER = struct.Struct(">I4s")
+
+
+@dataclass(frozen=True)
+class PngResult:
+    data: bytes
+    original_size: int
+    cached: bool = False
+
+    @property
+    def saved(self) -> int:
+        return self.original_size - len(self.data)
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "themeshop" / "png"
+
+
+def write_cache_file(path: Path, data: bytes) -> None:
+    """Atomically write one cache entry; failures are ignored (the cache is an optimisation)."""
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def iter_chunks(data: bytes):
+    """Yield ``(kind, body)`` for each chunk up to IEND; ValueError on a bad signature, length or CRC."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            raise ValueError("truncated chunk")
+        length, kind = _CHUNK_HEADER.unpack_from(data, offset)
+        end = offset + 12 + length
+        if end > len(data):
+            raise ValueError("truncated chunk")
+        body = data[offset + 8 : offset + 8 + length]
+        (crc,) = struct.unpack_from(">I", data, end - 4)
+        if zlib.crc32(kind + body) != crc:
+            raise ValueError(f"bad CRC in {kind.decode('latin-1')} chunk")
+        yield kind, body
+        offset = end
+        if kind == b"IEND":
+            return
+    raise ValueError("missing IEND")
+
+
+def chunk(kind: bytes, body: bytes) -> bytes:
+    """One serialized chunk: length, type, body and CRC."""
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def _deflate(raw: bytes, level: int) -> bytes:
+    best = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+        packed = compressor.compress(raw) + compressor.flush()
+        if best is None or len(packed) < len(best):
+            best = packed
+    return best
+
+
+def optimize_png(data: bytes, level: int = 9) -> bytes:
+    """Rewrite one PNG losslessly; returns ``data`` itself when nothing is gained."""
+    try:
+        chunks = list(iter_chunks(data))
+    except ValueError:
+        return data
+    kinds = {kind for kind, _body in chunks}
+    if kinds & ANIMATION_CHUNKS or b"IHDR" not in kinds or b"IDAT" not in kinds:
+        return data
+    try:
+        raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    except zlib.error:
+        return data
+    idat = _deflate(raw, level)
+
+    out = [PNG_SIGNATURE]
+    wrote_idat = False
+    for kind, body in chunks:
+        if kind == b"IDAT":
+            if not wrote_idat:
+                for start in range(0, len(idat), IDAT_CHUNK_SIZE):
+                    out.append(chunk(b"IDAT", idat[start : start + IDAT_CHUNK_SIZE]))
+                wrote_idat = True
+        elif kind not in STRIP_CHUNKS:
+            out.append(chunk(kind, body))
+    result = b"".join(out)
+    return result if len(result) < len(data) else data
+
+
+class PngOptimizer:
+    """``optimize_png`` behind a content-addressed cache; safe across threads and processes."""
+
+    def __init__(self, cache_dir: Path | None = None, level: int = 9) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self.level = level
+
+    @staticmethod
+    def accepts(arcname: str) -> bool:
+        return arcname.lower().endswith(".png")
+
+    def _cache_path(self, data: bytes) -> Path:
+        key = hashlib.sha256(data)
+        key.update(f"v{OPTIMIZER_VERSION}-l{self.level}".encode("ascii"))
+        digest = key.hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.png"
+
+    def optimize(self, data: bytes) -> PngResult:
+        path = self._cache_path(data)
+        try:
+            cached = path.read_bytes()
+        except OSError:
+            pass
+        else:
+            # An empty entry records that the input is already optimal.
+            return PngResult(cached or data, len(data), cached=True)
+
+        result = optimize_png(data, self.level)
+        write_cache_file(path, b"" if result is data else result)
+        return PngResult(result, len(data))
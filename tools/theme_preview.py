@@ -0,0 +1,332 @@
+"""Preview layout shared by the editor canvas and the headless ``preview.png`` renderer.
+
+``preview_layout`` places the header, card, buttons, slider and lyric lines
+of the preview as ``SceneItem`` (plus the hit regions the editor uses for
+hover and click). The editor draws them on its Tk canvas; ``rasterize``
+draws them into a NumPy array, so previews can be produced with no display.
+
+Without a font renderer, text is drawn as one block per character in the
+text color (wider blocks for CJK), which is enough to judge colors and
+contrast in a catalog thumbnail.
+
+``write_preview`` renders ``preview.png`` into a theme directory and stores
+the SHA-256 of its inputs (theme.json, the app background image, the size
+and ``RENDER_VERSION``) in a ``tEXt`` chunk, so an unchanged theme is
+skipped. A preview.png without that chunk was made by hand and is kept
+unless ``force`` is set.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import posixpath
+import stat
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+from theme_color import parse_color
+from theme_palette import ResolvedPalette
+from theme_png import iter_chunks
+from theme_raster import encode_png, load_fitted, np, require_numpy
+from theme_scene import SceneBuilder, SceneItem
+
+
+PREVIEW_SIZE = (280, 420)
+RENDER_VERSION = 1
+PREVIEW_KEYWORD = "themeshop-preview"
+
+HEADER_HEIGHT = 36
+CARD_HEIGHT = 90
+BUTTON_HEIGHT = 28
+# Rough advance widths of Tk's default UI font, for the headless text blocks.
+LINE_HEIGHT = 14
+CJK_ADVANCE = 12
+LATIN_ADVANCE = 7
+
+
+def _section(data: Mapping[str, Any], name: str) -> Mapping[str, Any]:
+    value = data.get(name)
+    return value if isinstance(value, dict) else {}
+
+
+def preview_layout(
+    data: Mapping[str, Any],
+    palette: ResolvedPalette,
+    width: int,
+    height: int,
+    image: Any = None,
+    loading: bool = False,
+) -> SceneBuilder:
+    """Scene items and hit regions of the preview at ``width`` x ``height``.
+
+    ``image`` is the already fitted app background (a Tk ``PhotoImage`` in
+    the editor, an RGBA array for ``rasterize``); without one the app
+    background color is drawn. ``loading`` adds the "still decoding" note.
+    """
+    scene = SceneBuilder()
+    fill = palette.hex()
+    colors = _section(data, "colors")
+    backgrounds = _section(data, "backgrounds")
+    text_cfg = _section(data, "text")
+    lyric_cfg = _section(data, "lyric")
+    buttons = _section(data, "buttons")
+    bg = _section(backgrounds, "app")
+
+    scene.region(0, 0, width, height, "backgrounds.app", bg.get("value") or fill["app_background"])
+    if image is not None:
+        scene.image("backgrounds.app", 0, 0, anchor="nw", image=image)
+    else:
+        # Also the placeholder while a background image is still being decoded.
+        scene.rectangle("backgrounds.app", 0, 0, width, height, fill=fill["app_background"], outline="")
+
+    header_h = HEADER_HEIGHT
+    scene.rectangle("colors.theme", 0, 0, width, header_h, fill=fill["header"], outline="")
+    scene.region(0, 0, width, header_h, "colors.theme", colors.get("theme", fill["header"]))
+    title = data.get("name") or "主题预览"
+    scene.text("colors.text_primary", 10, header_h / 2, text=title, anchor="w", fill=fill["header_text"])
+    scene.region(
+        10, 0, 10 + 160, header_h, "colors.text_primary", colors.get("text_primary", fill["header_text"])
+    )
+
+    card = _section(backgrounds, "card")
+    card_x = 14
+    card_y = header_h + 12
+    card_w = width - 28
+    card_h = CARD_HEIGHT
+    scene.rectangle("backgrounds.card", card_x, card_y, card_x + card_w, card_y + card_h, fill=fill["card"], outline="")
+    scene.region(card_x, card_y, card_x + card_w, card_y + card_h, "backgrounds.card", card.get("value", fill["card"]))
+    scene.text("text.title", card_x + 10, card_y + 12, text="标题", anchor="nw", fill=fill["title"])
+    scene.text("text.body", card_x + 10, card_y + 36, text="正文文本", anchor="nw", fill=fill["body"])
+    scene.text("text.caption", card_x + 10, card_y + 60, text="说明文本", anchor="nw", fill=fill["caption"])
+    scene.region(card_x + 10, card_y + 8, card_x + 120, card_y + 26, "text.title", text_cfg.get("title"))
+    scene.region(card_x + 10, card_y + 32, card_x + 140, card_y + 50, "text.body", text_cfg.get("body"))
+    scene.region(card_x + 10, card_y + 56, card_x + 140, card_y + 74, "text.caption", text_cfg.get("caption"))
+
+    btn_y = card_y + card_h + 16
+    btn_h = BUTTON_HEIGHT
+    btn_w = (width - 36) // 2
+    primary = _section(buttons, "primary")
+    danger = _section(buttons, "danger")
+    danger_x = card_x + btn_w + 8
+
+    scene.rectangle(
+        "buttons.primary.bg", card_x, btn_y, card_x + btn_w, btn_y + btn_h, fill=fill["primary_bg"], outline=""
+    )
+    scene.text(
+        "buttons.primary.text", card_x + btn_w / 2, btn_y + btn_h / 2, text="主按钮", fill=fill["primary_text"]
+    )
+    scene.region(card_x, btn_y, card_x + btn_w, btn_y + btn_h, "buttons.primary.bg", primary.get("bg"))
+    scene.region(card_x, btn_y, card_x + btn_w, btn_y + btn_h, "buttons.primary.text", primary.get("text"))
+    scene.rectangle(
+        "buttons.danger.bg", danger_x, btn_y, danger_x + btn_w, btn_y + btn_h, fill=fill["danger_bg"], outline=""
+    )
+    scene.text("buttons.danger.text", danger_x + btn_w / 2, btn_y + btn_h / 2, text="危险", fill=fill["danger_text"])
+    scene.region(danger_x, btn_y, danger_x + btn_w, btn_y + btn_h, "buttons.danger.bg", danger.get("bg"))
+    scene.region(danger_x, btn_y, danger_x + btn_w, btn_y + btn_h, "buttons.danger.text", danger.get("text"))
+
+    slider_y = btn_y + btn_h + 18
+    slider_x1 = card_x
+    slider_x2 = width - card_x
+    slider_mid = slider_x1 + int((slider_x2 - slider_x1) * 0.6)
+    scene.rectangle(
+        "colors.slider_unselected",
+        slider_x1,
+        slider_y,
+        slider_x2,
+        slider_y + 6,
+        fill=fill["slider_unselected"],
+        outline="",
+    )
+    scene.rectangle(
+        "colors.slider_selected",
+        slider_x1,
+        slider_y,
+        slider_mid,
+        slider_y + 6,
+        fill=fill["slider_selected"],
+        outline="",
+    )
+    scene.region(
+        slider_x1, slider_y, slider_x2, slider_y + 6, "colors.slider_unselected", colors.get("slider_unselected")
+    )
+    scene.region(slider_x1, slider_y, slider_mid, slider_y + 6, "colors.slider_selected", colors.get("slider_selected"))
+
+    lyric_y = slider_y + 18
+    scene.text("lyric.active", card_x, lyric_y, text="歌词高亮", anchor="nw", fill=fill["lyric_active"])
+    scene.text("lyric.normal", card_x, lyric_y + 20, text="歌词普通", anchor="nw", fill=fill["lyric_normal"])
+    scene.region(card_x, lyric_y, card_x + 120, lyric_y + 16, "lyric.active", lyric_cfg.get("active"))
+    scene.region(card_x, lyric_y + 20, card_x + 120, lyric_y + 36, "lyric.normal", lyric_cfg.get("normal"))
+
+    if loading:
+        scene.text(
+            "backgrounds.app.loading",
+            width - 10,
+            height - 10,
+            text="背景图加载中…",
+            anchor="se",
+            fill=fill["lyric_normal"],
+        )
+    return scene
+
+
+def _rgb(value: str):
+    color = parse_color(value)
+    return (0, 0, 0) if color is None else color[:3]
+
+
+def _text_blocks(item: SceneItem):
+    """``(x1, y1, x2, y2)`` of one block per visible character, honouring the Tk anchor."""
+    text = str(item.options.get("text", ""))
+    anchor = item.options.get("anchor", "center")
+    advances = [CJK_ADVANCE if ord(char) >= 0x2E80 else LATIN_ADVANCE for char in text]
+    x, y = item.coords
+    total = sum(advances)
+    left = x if "w" in anchor else x - total if "e" in anchor else x - total / 2
+    top = y if "n" in anchor else y - LINE_HEIGHT if "s" in anchor else y - LINE_HEIGHT / 2
+    for char, advance in zip(text, advances):
+        if not char.isspace():
+            inset = 1 if advance == CJK_ADVANCE else 2
+            yield left + 1, top + inset + 1, left + advance - 1, top + LINE_HEIGHT - inset
+        left += advance
+
+
+def _fill(canvas, box, rgb) -> None:
+    height, width = canvas.shape[:2]
+    x1, y1, x2, y2 = (int(round(value)) for value in box)
+    x1, x2 = max(0, x1), min(width, x2)
+    y1, y2 = max(0, y1), min(height, y2)
+    if x1 < x2 and y1 < y2:
+        canvas[y1:y2, x1:x2] = rgb
+
+
+def _blit(canvas, pixels, x: float, y: float) -> None:
+    """Alpha-composite RGBA ``pixels`` with the top-left corner at (x, y)."""
+    height, width = canvas.shape[:2]
+    x, y = int(round(x)), int(round(y))
+    src = pixels[max(0, -y) : max(0, height - y), max(0, -x) : max(0, width - x)]
+    if not src.size:
+        return
+    region = canvas[max(0, y) : max(0, y) + src.shape[0], max(0, x) : max(0, x) + src.shape[1]]
+    alpha = src[..., 3:4].astype(np.uint16)
+    region[...] = (src[..., :3] * alpha + region * (255 - alpha) + 127) // 255
+
+
+def rasterize(items, width: int, height: int):
+    """Draw scene items (rectangles, text as blocks, RGBA-array images) to ``(height, width, 3)`` uint8."""
+    require_numpy()
+    canvas = np.zeros((height, width, 3), np.uint8)
+    for item in items:
+        if item.kind == "rectangle":
+            _fill(canvas, item.coords, _rgb(item.options.get("fill", "")))
+        elif item.kind == "text":
+            rgb = _rgb(item.options.get("fill", ""))
+            for box in _text_blocks(item):
+                _fill(canvas, box, rgb)
+        elif item.kind == "image" and item.options.get("image") is not None:
+            _blit(canvas, item.options["image"], *item.coords)
+    return canvas
+
+
+def background_path(theme_dir: Path, palette: ResolvedPalette) -> Path | None:
+    """The app background image inside ``theme_dir``, if the theme uses one that exists."""
+    value = palette.app_image
+    if not value or os.path.isabs(value) or ".." in posixpath.normpath(value.replace("\\", "/")).split("/"):
+        return None
+    path = theme_dir / value
+    return path if path.is_file() else None
+
+
+def preview_digest(theme_json: bytes, background: bytes | None, size: tuple[int, int]) -> str:
+    digest = hashlib.sha256(f"v{RENDER_VERSION} {size[0]}x{size[1]}\n".encode("ascii"))
+    for part in (theme_json, background or b""):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def render_preview(data: Mapping[str, Any], background: bytes | None = None, size: tuple[int, int] = PREVIEW_SIZE):
+    """``(height, width, 3)`` pixels of the preview; ``background`` is the app image file's bytes."""
+    require_numpy()
+    width, height = size
+    palette = ResolvedPalette.from_theme(data)
+    image = None
+    if background is not None:
+        try:
+            image = load_fitted(background, width, height)
+        except (OSError, ValueError):
+            image = None  # e.g. a JPEG without Pillow: drawn like the editor, on the background color
+    return rasterize(preview_layout(data, palette, width, height, image=image).items, width, height)
+
+
+def existing_digest(path: Path) -> tuple[bool, str | None]:
+    """``(replaceable, digest)`` of a preview.png: missing, empty or generated files may be replaced."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return True, None
+    if not data:
+        return True, None
+    try:
+        for kind, body in iter_chunks(data):
+            if kind == b"tEXt":
+                keyword, _, value = body.partition(b"\0")
+                if keyword == PREVIEW_KEYWORD.encode("latin-1"):
+                    return True, value.decode("latin-1")
+            elif kind == b"IDAT":
+                break
+    except ValueError:
+        pass
+    return False, None
+
+
+@dataclass
+class PreviewResult:
+    path: Path
+    status: str  # "rendered", "up-to-date" or "kept" (a hand-made preview.png)
+    digest: str
+
+
+def _file_mode(path: Path) -> int:
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mask = os.umask(0)
+        os.umask(mask)
+        return 0o666 & ~mask
+
+
+def write_preview(theme_dir: Path, size: tuple[int, int] = PREVIEW_SIZE, force: bool = False) -> PreviewResult:
+    """Render ``theme_dir/preview.png`` unless it is up to date or made by hand."""
+    theme_dir = Path(theme_dir)
+    raw = (theme_dir / "theme.json").read_bytes()
+    data = json.loads(raw.decode("utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError("theme.json must be a JSON object")
+    bg_path = background_path(theme_dir, ResolvedPalette.from_theme(data))
+    background = bg_path.read_bytes() if bg_path else None
+    digest = preview_digest(raw, background, size)
+    target = theme_dir / "preview.png"
+    replaceable, current = existing_digest(target)
+    if not force and not replaceable:
+        return PreviewResult(target, "kept", digest)
+    if not force and current == digest:
+        return PreviewResult(target, "up-to-date", digest)
+
+    pixels = render_preview(data, background, size)
+    rgba = np.concatenate([pixels, np.full(pixels.shape[:2] + (1,), 255, np.uint8)], axis=-1)
+    png = encode_png(rgba, level=9, text={PREVIEW_KEYWORD: digest})
+    fd, tmp = tempfile.mkstemp(dir=theme_dir, prefix=".preview-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(png)
+        # mkstemp creates 0600; give the preview the mode of the file it replaces, or a plain new file's.
+        os.chmod(tmp, _file_mode(target))
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return PreviewResult(target, "rendered", digest)
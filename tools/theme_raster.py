@@ -0,0 +1,280 @@
+"""Pixels for background images: PNG decoding and area-averaged scaling with NumPy.
+
+``load_rgba`` returns an ``(height, width, 4)`` uint8 array. When Pillow is
+installed it does the decoding (any format, JPEGs decoded straight at a
+reduced scale); otherwise PNGs are decoded here from the zlib stream.
+
+``encode_png`` writes RGBA pixels back out, for cached thumbnails.
+
+Scanlines filtered with None/Sub/Up are reconstructed a row at a time. Avg
+and Paeth depend on the reconstructed left neighbour, so images that use
+them are reconstructed along anti-diagonals instead: every pixel on one
+diagonal depends only on the previous two, which makes each step a single
+vectorised update over all rows. That costs ``width + height`` steps, fine
+for watch-sized art but slow for very large Paeth-filtered photos, which is
+where Pillow helps.
+
+NumPy is optional for the rest of the tooling; only this module needs it.
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+import zlib
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+from theme_png import PNG_SIGNATURE, chunk, iter_chunks
+
+
+# Inflate in bounded steps: a one-shot zlib.decompress of a large image holds the GIL long
+# enough to stall the editor while a background thread decodes.
+INFLATE_STEP = 1 << 16
+
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+_DEPTHS = {0: (1, 2, 4, 8, 16), 2: (8, 16), 3: (1, 2, 4, 8), 4: (8, 16), 6: (8, 16)}
+
+
+def require_numpy(feature: str = "image analysis") -> None:
+    if np is None:
+        raise RuntimeError(f"{feature} needs NumPy (pip install numpy)")
+
+
+def _inflate(bodies, size: int):
+    """Decompress the IDAT stream into a ``size``-byte uint8 array, a slice at a time."""
+    out = np.empty(size, np.uint8)
+    filled = 0
+    inflater = zlib.decompressobj()
+    try:
+        for body in bodies:
+            view = memoryview(body)
+            for start in range(0, len(view), INFLATE_STEP):
+                pending = view[start : start + INFLATE_STEP]
+                while pending and filled < size:
+                    piece = inflater.decompress(pending, min(4 * INFLATE_STEP, size - filled))
+                    out[filled : filled + len(piece)] = np.frombuffer(piece, np.uint8)
+                    filled += len(piece)
+                    pending = inflater.unconsumed_tail
+    except zlib.error as exc:
+        raise ValueError(f"bad PNG image data: {exc}") from None
+    if filled < size:
+        raise ValueError("truncated PNG image data")
+    return out
+
+
+def _unfilter_rows(out, filters, bpp: int) -> None:
+    """In-place reconstruction for images that only use None, Sub and Up."""
+    for y, kind in enumerate(filters.tolist()):
+        if kind == 1:
+            line = out[y].reshape(-1, bpp)
+            np.cumsum(line, axis=0, dtype=np.uint8, out=line)
+        elif kind == 2 and y:
+            out[y] += out[y - 1]
+
+
+def _unfilter_diagonal(out, filters, bpp: int) -> None:
+    """In-place reconstruction of any filter mix, one anti-diagonal per step."""
+    height, stride = out.shape
+    units = stride // bpp
+    # Row i + 1 of the skewed buffers holds scanline i shifted right by i + 2
+    # units, so pixel (i, x) sits in column i + x + 2 and a diagonal is a column.
+    # Row 0 and the untouched cells are the zero padding the filters expect.
+    width = height + units + 1
+    recon = np.zeros((height + 1, width, bpp), np.uint8)
+    filtered = np.zeros((height + 1, width, bpp), np.uint8)
+    for i in range(height):
+        filtered[i + 1, i + 2 : i + 2 + units] = out[i].reshape(units, bpp)
+    kinds = np.zeros((height + 1, 1), np.uint8)
+    kinds[1:, 0] = filters
+    is_sub, is_up, is_avg, is_paeth = (kinds == 1), (kinds == 2), (kinds == 3), (kinds == 4)
+
+    for column in range(2, height + units + 1):
+        first = max(1, column - units)
+        last = min(height, column - 1) + 1
+        a = recon[first:last, column - 1].astype(np.int16)
+        b = recon[first - 1 : last - 1, column - 1].astype(np.int16)
+        c = recon[first - 1 : last - 1, column - 2].astype(np.int16)
+        pa = np.abs(b - c)
+        pb = np.abs(a - c)
+        pc = np.abs(a + b - 2 * c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        rows = slice(first, last)
+        predictor = np.select(
+            [is_paeth[rows], is_avg[rows], is_sub[rows], is_up[rows]], [paeth, (a + b) >> 1, a, b], 0
+        )
+        recon[rows, column] = (filtered[rows, column] + predictor) & 0xFF
+
+    for i in range(height):
+        out[i] = recon[i + 1, i + 2 : i + 2 + units].reshape(stride)
+
+
+def _samples(rows, width: int, depth: int, channels: int):
+    """``(height, width * channels)`` samples at their native depth (uint16 for 16-bit images)."""
+    if depth == 16:
+        return np.ascontiguousarray(rows).view(">u2")[:, : width * channels]
+    if depth == 8:
+        return rows[:, : width * channels]
+    shifts = np.arange(8 - depth, -1, -depth, dtype=np.uint8)
+    values = (rows[:, :, None] >> shifts) & ((1 << depth) - 1)
+    return values.reshape(rows.shape[0], -1)[:, :width]
+
+
+def decode_png(data: bytes):
+    """Decode a non-interlaced PNG to ``(height, width, 4)`` RGBA uint8."""
+    require_numpy()
+    chunks = list(iter_chunks(data))
+    if not chunks or chunks[0][0] != b"IHDR":
+        raise ValueError("PNG does not start with IHDR")
+    width, height, depth, color_type, _method, _filter, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+    if color_type not in _CHANNELS or depth not in _DEPTHS[color_type]:
+        raise ValueError(f"unsupported PNG color type {color_type} at depth {depth}")
+    if interlace:
+        raise ValueError("interlaced PNGs need Pillow")
+    channels = _CHANNELS[color_type]
+    bpp = max(1, channels * depth // 8)
+    stride = (width * channels * depth + 7) // 8
+    raw = _inflate((body for kind, body in chunks if kind == b"IDAT"), height * (stride + 1))
+    scanlines = raw.reshape(height, stride + 1)
+    filters = scanlines[:, 0]
+    if filters.size and filters.max() > 4:
+        raise ValueError("bad PNG filter type")
+    rows = scanlines[:, 1:]  # a view into our own buffer, reconstructed in place
+    if np.isin(filters, (3, 4)).any():
+        _unfilter_diagonal(rows, filters, bpp)
+    else:
+        _unfilter_rows(rows, filters, bpp)
+
+    samples = _samples(rows, width, depth, channels).reshape(height, width, channels)
+    trns = next((body for kind, body in chunks if kind == b"tRNS"), None)
+    if color_type == 3:
+        plte = next((body for kind, body in chunks if kind == b"PLTE"), None)
+        if plte is None:
+            raise ValueError("palette PNG without PLTE")
+        table = np.full((256, 4), 255, np.uint8)
+        colors = np.frombuffer(plte, np.uint8)[: len(plte) // 3 * 3].reshape(-1, 3)
+        table[: len(colors), :3] = colors
+        if trns:
+            table[: len(trns), 3] = np.frombuffer(trns, np.uint8)[:256]
+        return table[samples[..., 0]]
+
+    if depth == 16:
+        scaled = (samples >> 8).astype(np.uint8)
+    elif depth < 8:
+        scaled = samples * np.uint8(255 // ((1 << depth) - 1))
+    else:
+        scaled = samples
+    pixels = np.empty((height, width, 4), np.uint8)
+    pixels[..., :3] = scaled[..., :3] if color_type in (2, 6) else scaled[..., :1]
+    pixels[..., 3] = scaled[..., -1] if color_type in (4, 6) else 255
+    if trns and color_type in (0, 2):
+        key = np.array(struct.unpack(f">{channels}H", trns[: 2 * channels]))
+        pixels[np.all(samples == key, axis=-1), 3] = 0
+    return pixels
+
+
+def encode_png(pixels, level: int = 6, text: dict[str, str] | None = None) -> bytes:
+    """``(height, width, 4)`` uint8 RGBA to an 8-bit RGBA PNG, every scanline with the Sub filter.
+
+    ``text`` entries are stored as Latin-1 ``tEXt`` chunks.
+    """
+    require_numpy()
+    height, width = pixels.shape[:2]
+    rows = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(height, width * 4)
+    scanlines = np.empty((height, width * 4 + 1), np.uint8)
+    scanlines[:, 0] = 1
+    scanlines[:, 1:5] = rows[:, :4]
+    np.subtract(rows[:, 4:], rows[:, :-4], out=scanlines[:, 5:])
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"".join(
+        (
+            PNG_SIGNATURE,
+            chunk(b"IHDR", header),
+            *(chunk(b"tEXt", f"{key}\0{value}".encode("latin-1")) for key, value in (text or {}).items()),
+            chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)),
+            chunk(b"IEND", b""),
+        )
+    )
+
+
+def area_resize(pixels, width: int, height: int):
+    """Box-filter ``pixels`` down to ``width`` x ``height``; each output pixel averages the area it covers.
+
+    Translucent images are averaged premultiplied by alpha, so transparent
+    pixels do not darken the result. Enlarging falls back to nearest neighbour.
+    """
+    require_numpy()
+    src_h, src_w = pixels.shape[:2]
+    width, height = max(1, width), max(1, height)
+    if width >= src_w and height >= src_h:
+        ys = (np.arange(height) * src_h // height)[:, None]
+        xs = np.arange(width) * src_w // width
+        return pixels[ys, xs]
+    ys = np.unique(np.linspace(0, src_h, min(height, src_h) + 1).astype(np.intp))
+    xs = np.unique(np.linspace(0, src_w, min(width, src_w) + 1).astype(np.intp))
+    opaque = bool((pixels[..., 3] == 255).all())
+    if opaque:
+        weighted = pixels
+    else:
+        alpha = pixels[..., 3:4].astype(np.uint32)
+        weighted = np.concatenate([pixels[..., :3] * alpha, alpha], axis=-1)
+    # Per-band sums beat np.add.reduceat with a widening dtype by an order of magnitude.
+    rows = np.stack([weighted[start:end].sum(axis=0, dtype=np.uint64) for start, end in zip(ys[:-1], ys[1:])])
+    sums = np.stack([rows[:, start:end].sum(axis=1) for start, end in zip(xs[:-1], xs[1:])], axis=1)
+    area = (np.diff(ys)[:, None, None] * np.diff(xs)[None, :, None]).astype(np.uint64)
+    if opaque:
+        return ((sums + area // 2) // area).astype(np.uint8)
+    total_alpha = sums[..., 3:4]
+    out = np.empty(sums.shape, np.uint8)
+    out[..., :3] = (sums[..., :3] + total_alpha // 2) // np.maximum(total_alpha, 1)
+    out[..., 3:4] = (total_alpha + area // 2) // area
+    return out
+
+
+def fit_size(width: int, height: int, max_side: int) -> tuple[int, int]:
+    return fit_box(width, height, max_side, max_side)
+
+
+def fit_box(width: int, height: int, max_width: int, max_height: int) -> tuple[int, int]:
+    """Largest size with the same aspect ratio that fits in ``max_width`` x ``max_height``; never enlarges."""
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def load_rgba(source: str | Path | bytes, max_side: int | None = None):
+    """Decode an image file (or its bytes) to RGBA, area-averaged down to ``max_side`` if given."""
+    require_numpy()
+    data = source if isinstance(source, bytes) else Path(source).read_bytes()
+    if Image is not None:
+        with Image.open(io.BytesIO(data)) as image:
+            if max_side is not None:
+                # JPEG decodes at 1/2, 1/4 or 1/8 scale directly.
+                image.draft("RGB", fit_size(image.width, image.height, max_side))
+            image = image.convert("RGBA")
+            if max_side is not None and max(image.size) > max_side:
+                image = image.resize(fit_size(image.width, image.height, max_side), Image.Resampling.BOX)
+            return np.asarray(image, dtype=np.uint8)
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("only PNG images can be read without Pillow (pip install pillow)")
+    pixels = decode_png(data)
+    if max_side is not None and max(pixels.shape[:2]) > max_side:
+        pixels = area_resize(pixels, *fit_size(pixels.shape[1], pixels.shape[0], max_side))
+    return pixels
+
+
+def load_fitted(source: str | Path | bytes, max_width: int, max_height: int):
+    """Decode an image and area-average it to fit ``max_width`` x ``max_height`` (never enlarged)."""
+    pixels = load_rgba(source)
+    target = fit_box(pixels.shape[1], pixels.shape[0], max_width, max_height)
+    if target != (pixels.shape[1], pixels.shape[0]):
+        pixels = area_resize(pixels, *target)
+    return pixels
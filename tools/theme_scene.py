@@ -0,0 +1,220 @@
+"""Retained-mode scene for the editor preview.
+
+The preview is described as an ordered list of ``SceneItem`` (a stable key,
+a canvas item kind, its coordinates and options). ``CanvasScene.update``
+diffs that description against what is already on the canvas and only
+creates, moves, reconfigures or deletes the items that differ, so an edit to
+one color touches one canvas item instead of recreating all of them.
+
+Nothing here imports Tk: the canvas is used through ``create_<kind>``,
+``coords``, ``itemconfigure``, ``delete`` and ``tag_raise`` only.
+
+``RegionIndex`` answers "which field is under the mouse" for hover and
+click from a uniform grid instead of scanning every region.
+
+``RenderScheduler`` turns a burst of change notifications (variable traces,
+resizes) into at most one render per frame, and drops the render when the
+inputs it depends on are back to what was last drawn.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable
+
+
+FRAME_MS = 16
+
+Region = tuple  # (x1, y1, x2, y2, field, value)
+
+
+@dataclass(frozen=True)
+class SceneItem:
+    key: str
+    kind: str  # "rectangle", "text" or "image"
+    coords: tuple[float, ...]
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SceneStats:
+    created: int = 0
+    moved: int = 0
+    configured: int = 0
+    deleted: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def touched(self) -> int:
+        return self.created + self.moved + self.configured + self.deleted
+
+
+class SceneBuilder:
+    """Collects ``SceneItem`` in drawing order, bottom first, and the hit regions that go with them."""
+
+    def __init__(self) -> None:
+        self.items: list[SceneItem] = []
+        self.regions: list[Region] = []
+
+    def region(self, x1: float, y1: float, x2: float, y2: float, field: str, value: Any) -> None:
+        self.regions.append((x1, y1, x2, y2, field, value))
+
+    def add(self, key: str, kind: str, *coords: float, **options: Any) -> None:
+        self.items.append(SceneItem(key, kind, tuple(float(value) for value in coords), options))
+
+    def rectangle(self, key: str, x1: float, y1: float, x2: float, y2: float, **options: Any) -> None:
+        self.add(key, "rectangle", x1, y1, x2, y2, **options)
+
+    def text(self, key: str, x: float, y: float, **options: Any) -> None:
+        self.add(key, "text", x, y, **options)
+
+    def image(self, key: str, x: float, y: float, **options: Any) -> None:
+        self.add(key, "image", x, y, **options)
+
+
+class CanvasScene:
+    """Canvas items keyed by scene key, kept in sync with the latest description."""
+
+    def __init__(self, canvas) -> None:
+        self.canvas = canvas
+        self._items: dict[str, tuple[int, SceneItem]] = {}
+        self._order: list[str] = []
+
+    def item_id(self, key: str) -> int | None:
+        entry = self._items.get(key)
+        return entry[0] if entry else None
+
+    def clear(self) -> None:
+        for item_id, _item in self._items.values():
+            self.canvas.delete(item_id)
+        self._items.clear()
+        self._order = []
+
+    def update(self, items: Iterable[SceneItem]) -> SceneStats:
+        started = time.perf_counter()
+        stats = SceneStats()
+        items = list(items)
+        order = [item.key for item in items]
+        if len(set(order)) != len(order):
+            raise ValueError("scene keys must be unique")
+
+        wanted = set(order)
+        for key in [key for key in self._order if key not in wanted]:
+            self.canvas.delete(self._items.pop(key)[0])
+            stats.deleted += 1
+
+        kept = [key for key in self._order if key in wanted]
+        for item in items:
+            entry = self._items.get(item.key)
+            if entry is None or entry[1].kind != item.kind:
+                if entry is not None:
+                    self.canvas.delete(entry[0])
+                    kept.remove(item.key)
+                    stats.deleted += 1
+                item_id = getattr(self.canvas, f"create_{item.kind}")(*item.coords, **item.options)
+                self._items[item.key] = (item_id, item)
+                stats.created += 1
+                continue
+            item_id, previous = entry
+            if previous.coords != item.coords:
+                self.canvas.coords(item_id, *item.coords)
+                stats.moved += 1
+            changed = {name: value for name, value in item.options.items() if previous.options.get(name) != value}
+            if changed:
+                self.canvas.itemconfigure(item_id, **changed)
+                stats.configured += 1
+            self._items[item.key] = (item_id, item)
+
+        # New items are created on top; restack only when that is not where they belong.
+        if kept + [key for key in order if key not in kept] != order:
+            for key in order:
+                self.canvas.tag_raise(self._items[key][0])
+        self._order = order
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+
+class RegionIndex:
+    """Uniform-grid index over preview hit regions; later regions win, as they are drawn on top.
+
+    ``rebuild`` only re-buckets when a rectangle moved; new field values are
+    swapped in as they are. ``hit`` looks at the few regions in one cell.
+    """
+
+    def __init__(self, cell: int = 32) -> None:
+        self.cell = cell
+        self._regions: list[Region] = []
+        self._boxes: list[tuple[float, float, float, float]] = []
+        self._cells: dict[tuple[int, int], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def rebuild(self, regions: Iterable[Region]) -> bool:
+        """Index ``regions`` in drawing order; returns whether the grid had to be rebuilt."""
+        self._regions = list(regions)
+        boxes = [tuple(region[:4]) for region in self._regions]
+        if boxes == self._boxes:
+            return False
+        self._boxes = boxes
+        cells: dict[tuple[int, int], list[int]] = {}
+        size = self.cell
+        for index in range(len(boxes) - 1, -1, -1):
+            x1, y1, x2, y2 = boxes[index]
+            for cx in range(int(x1 // size), int(x2 // size) + 1):
+                for cy in range(int(y1 // size), int(y2 // size) + 1):
+                    cells.setdefault((cx, cy), []).append(index)
+        self._cells = cells
+        return True
+
+    def hit(self, x: float, y: float) -> Region | None:
+        """Topmost region containing the point, or None."""
+        for index in self._cells.get((int(x // self.cell), int(y // self.cell)), ()):
+            x1, y1, x2, y2 = self._boxes[index]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                return self._regions[index]
+        return None
+
+
+class RenderScheduler:
+    """Coalesces ``request`` calls into one ``render`` per frame, skipped when ``state()`` is unchanged.
+
+    ``render`` must call ``mark_rendered`` (directly or not), so renders
+    triggered outside the scheduler also count as drawn. ``request`` accepts
+    and ignores any arguments, so it can be a Tk trace or event callback.
+    """
+
+    def __init__(
+        self,
+        after: Callable[[int, Callable[[], None]], Any],
+        render: Callable[[], None],
+        state: Callable[[], Hashable] = lambda: None,
+        frame_ms: int = FRAME_MS,
+    ) -> None:
+        self.after = after
+        self.render = render
+        self.state = state
+        self.frame_ms = frame_ms
+        self.renders = 0
+        self.skipped = 0
+        self._pending = False
+        self._rendered: Hashable | None = None
+        self._has_rendered = False
+
+    def request(self, *_args: Any) -> None:
+        if not self._pending:
+            self._pending = True
+            self.after(self.frame_ms, self._flush)
+
+    def _flush(self) -> None:
+        self._pending = False
+        if self._has_rendered and self.state() == self._rendered:
+            self.skipped += 1
+            return
+        self.render()
+
+    def mark_rendered(self) -> None:
+        self._rendered = self.state()
+        self._has_rendered = True
+        self.renders += 1
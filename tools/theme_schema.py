@@ -0,0 +1,230 @@
+"""theme.json schema (theme.md section 3) and its compiled validator.
+
+``THEME_SCHEMA`` is a plain declarative description. ``compile_schema`` turns
+it into nested checker closures once, at import time, so validating a
+document is a single traversal that collects every problem with its JSON
+path instead of stopping at the first one.
+
+Supported node keys: ``type`` (object, string, integer, boolean, color,
+path), ``required``, ``const``, ``enum``, ``pattern``, ``min_length``,
+``minimum``, ``properties``, ``additional`` (schema for unlisted keys;
+without it they only produce a warning) and ``select`` (per-value property
+overrides keyed on a sibling field, used for background ``type``).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from theme_color import parse_color
+
+
+SCHEMA_VERSION = "1.0"
+ID_PATTERN = re.compile(r"^[a-z0-9_]+$")
+SEMVER_PATTERN = r"^\d+\.\d+\.\d+(?:[-+][0-9A-Za-z.-]+)?$"
+REQUIRED_COLOR_KEYS = [
+    "theme",
+    "background",
+    "text_primary",
+    "text_secondary",
+    "slider_selected",
+    "slider_block",
+    "slider_unselected",
+]
+
+_IDENTIFIER = re.compile(r"^\w+$")
+
+COLOR = {"type": "color"}
+ASSET = {"type": "path"}
+
+BACKGROUND_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "enum": ["color", "image"], "required": True},
+        "value": {"type": "string", "required": True},
+        "objectFit": {"type": "string", "enum": ["cover", "contain", "fill", "none", "scale-down"]},
+    },
+    "select": {"key": "type", "cases": {"color": {"value": COLOR}, "image": {"value": ASSET}}},
+}
+
+BUTTON_SCHEMA = {
+    "type": "object",
+    "properties": {"bg": COLOR, "text": COLOR, "border": COLOR, "image": ASSET},
+}
+
+THEME_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "schemaVersion": {"type": "string", "const": SCHEMA_VERSION, "required": True},
+        "id": {"type": "string", "pattern": ID_PATTERN.pattern, "required": True},
+        "name": {"type": "string", "min_length": 1, "required": True},
+        "version": {"type": "string", "pattern": SEMVER_PATTERN, "required": True},
+        "author": {"type": "string"},
+        "description": {"type": "string"},
+        "minAppVersion": {"type": "string", "pattern": SEMVER_PATTERN},
+        "minPlatformVersion": {"type": "integer", "minimum": 0},
+        "colors": {
+            "type": "object",
+            "required": True,
+            "properties": {key: dict(COLOR, required=True) for key in REQUIRED_COLOR_KEYS},
+            "additional": COLOR,
+        },
+        "text": {
+            "type": "object",
+            "properties": {key: COLOR for key in ("title", "body", "caption", "danger")},
+            "additional": COLOR,
+        },
+        "backgrounds": {"type": "object", "additional": BACKGROUND_SCHEMA},
+        "buttons": {"type": "object", "additional": BUTTON_SCHEMA},
+        "lyric": {
+            "type": "object",
+            "properties": {key: COLOR for key in ("active", "normal", "active_bg")},
+            "additional": COLOR,
+        },
+        "icons": {
+            "type": "object",
+            "properties": {"dark_mode": {"type": "boolean"}, "path": ASSET},
+        },
+        "assets": {
+            "type": "object",
+            "properties": {"base": ASSET, "images": ASSET, "buttons": ASSET},
+        },
+    },
+}
+
+
+@dataclass(frozen=True)
+class Issue:
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    errors: list[Issue] = field(default_factory=list)
+    warnings: list[Issue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+Checker = Callable[[Any, str, str, ValidationReport], None]
+
+
+def is_color(value: str) -> bool:
+    """Anything ``theme_color.parse_color`` accepts: hex, ``rgb()``/``rgba()``, ``hsl()``/``hsla()``, ``transparent``."""
+    return parse_color(value) is not None
+
+
+def is_relative_path(value: str) -> bool:
+    if not value or value.startswith("/") or "\\" in value or ":" in value:
+        return False
+    return ".." not in value.split("/")
+
+
+def child_path(parent: str, key: str) -> str:
+    if not parent:
+        return key
+    return f"{parent}.{key}" if _IDENTIFIER.match(key) else f"{parent}[{key!r}]"
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    return {dict: "object", list: "array", str: "string", int: "integer", float: "number"}.get(
+        type(value), type(value).__name__
+    )
+
+
+def _compile_scalar(node: dict) -> Checker:
+    kind = node.get("type", "string")
+    const = node.get("const")
+    enum = node.get("enum")
+    pattern = re.compile(node["pattern"]) if "pattern" in node else None
+    min_length = node.get("min_length", 0)
+    minimum = node.get("minimum")
+    expected = {"color": "string", "path": "string"}.get(kind, kind)
+    python_type = {"string": str, "integer": int, "boolean": bool}[expected]
+    value_test = {"color": is_color, "path": is_relative_path}.get(kind)
+    value_message = {"color": "is not a valid color", "path": "must be a relative path without '..'"}.get(kind)
+
+    def check(value: Any, parent: str, key: str, report: ValidationReport) -> None:
+        # Paths are only formatted once something is wrong.
+        if type(value) is not python_type:
+            report.errors.append(Issue(child_path(parent, key), f"must be {expected}, got {_type_name(value)}"))
+        elif const is not None and value != const:
+            report.errors.append(Issue(child_path(parent, key), f"must be {const!r}"))
+        elif enum is not None and value not in enum:
+            message = f"must be one of {', '.join(map(repr, enum))}, got {value!r}"
+            report.errors.append(Issue(child_path(parent, key), message))
+        elif pattern is not None and not pattern.match(value):
+            report.errors.append(Issue(child_path(parent, key), f"must match {pattern.pattern}, got {value!r}"))
+        elif min_length and len(value.strip()) < min_length:
+            report.errors.append(Issue(child_path(parent, key), "must not be empty"))
+        elif minimum is not None and value < minimum:
+            report.errors.append(Issue(child_path(parent, key), f"must be >= {minimum}"))
+        elif value_test is not None and not value_test(value):
+            report.errors.append(Issue(child_path(parent, key), f"{value_message}: {value!r}"))
+
+    return check
+
+
+def _compile_object(node: dict) -> Checker:
+    properties = {name: compile_schema(child) for name, child in node.get("properties", {}).items()}
+    required = [name for name, child in node.get("properties", {}).items() if child.get("required")]
+    additional = compile_schema(node["additional"]) if "additional" in node else None
+    select = node.get("select")
+    cases = {}
+    if select:
+        cases = {
+            value: {**properties, **{name: compile_schema(child) for name, child in overrides.items()}}
+            for value, overrides in select["cases"].items()
+        }
+
+    def check(value: Any, parent: str, key: str, report: ValidationReport) -> None:
+        path = child_path(parent, key)
+        if type(value) is not dict:
+            report.errors.append(Issue(path, f"must be object, got {_type_name(value)}"))
+            return
+        for name in required:
+            if name not in value:
+                report.errors.append(Issue(child_path(path, name), "is required"))
+        checkers = properties
+        if select:
+            # The discriminator may be any JSON value; only strings name a case, the rest are
+            # left to its own type/enum checker.
+            selector = value.get(select["key"])
+            if isinstance(selector, str):
+                checkers = cases.get(selector, properties)
+        for name, item in value.items():
+            checker = checkers.get(name, additional)
+            if checker is not None:
+                checker(item, path, name, report)
+            else:
+                report.warnings.append(Issue(child_path(path, name), "unknown field"))
+
+    return check
+
+
+def compile_schema(node: dict) -> Checker:
+    if node.get("type") == "object":
+        return _compile_object(node)
+    return _compile_scalar(node)
+
+
+_THEME_CHECKER = compile_schema(THEME_SCHEMA)
+
+
+def validate_theme(data: Any) -> ValidationReport:
+    """Check a parsed theme.json against ``THEME_SCHEMA`` in one pass."""
+    report = ValidationReport()
+    _THEME_CHECKER(data, "", "$", report)
+    return report
@@ -0,0 +1,379 @@
+"""Palette suggestions from a background image.
+
+The image is area-averaged down to at most ``SAMPLE_SIDE`` pixels on its
+longer side and its opaque pixels are clustered with k-means in NumPy. The
+clusters ("swatches") become a ``colors``/``text``/``lyric``/``buttons`` set:
+the dominant swatch is the background, the most colourful one the accent,
+and text is whichever of near-white or near-black reads best on every large
+area of the image.
+
+Every suggestion is checked with ``CONTRAST_PAIRS`` on the palette it would
+resolve to, and failing colors are pushed towards black or white (or made
+opaque) until each pair meets WCAG AA.
+
+Swatches are cached in memory and on disk by the SHA-256 of the image, so
+picking the same background again costs one hash. ``SuggestionWorker`` runs
+all of it off the Tk thread: decoding a large background takes seconds.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from theme_color import RGBA, parse_color
+from theme_contrast import CONTRAST_PAIRS, contrast_ratio
+from theme_palette import ResolvedPalette
+from theme_png import default_cache_dir, write_cache_file
+from theme_raster import load_rgba, np, require_numpy
+
+
+SUGGEST_VERSION = 1
+SAMPLE_SIDE = 96
+POLL_MS = 15
+CLUSTERS = 6
+ITERATIONS = 12
+# Swatches covering at least this share of the image must be readable under text.
+LARGE_AREA = 0.1
+CONTRAST_MARGIN = 0.1
+
+WHITE = RGBA(255, 255, 255)
+BLACK = RGBA(0, 0, 0)
+DANGER = RGBA(0xE3, 0x5A, 0x5A)
+FALLBACK_ACCENT = RGBA(0x00, 0xE5, 0xFF)
+
+# Which field to adjust when a pair fails, and against which palette role.
+# The header pair moves the accent rather than the text, which is shared by
+# every other text role.
+_FIXES = {
+    "header_text on header": ("colors.theme", "header_text"),
+}
+
+
+@dataclass(frozen=True)
+class Swatch:
+    color: RGBA
+    weight: float
+
+
+@dataclass
+class Suggestion:
+    palette: dict
+    swatches: list[Swatch]
+    elapsed: float = 0.0
+    cached: bool = False
+    failures: list[str] = field(default_factory=list)
+
+
+def extract_swatches(pixels, clusters: int = CLUSTERS, iterations: int = ITERATIONS, seed: int = 0) -> list[Swatch]:
+    """k-means over the (already small) image's opaque pixels; heaviest swatch first."""
+    require_numpy()
+    flat = pixels.reshape(-1, pixels.shape[-1])
+    points = flat[flat[:, 3] >= 128, :3].astype(np.float64)
+    if not len(points):
+        return []
+    rng = np.random.default_rng(seed)
+    norms = (points**2).sum(axis=1)
+
+    def distances(centers):
+        # |p - c|^2 expanded, so the work is one small matrix product.
+        return norms[:, None] - 2.0 * points @ centers.T + (centers**2).sum(axis=1)
+
+    # k-means++ seeding keeps small but distinct accents from being swallowed.
+    centers = points[rng.integers(len(points))][None]
+    nearest = distances(centers)[:, 0]
+    for _ in range(1, min(clusters, len(points))):
+        weights = np.maximum(nearest, 0.0)
+        total = weights.sum()
+        if total <= 0:
+            break
+        center = points[rng.choice(len(points), p=weights / total)]
+        centers = np.vstack([centers, center])
+        nearest = np.minimum(nearest, distances(center[None])[:, 0])
+    for _ in range(iterations):
+        labels = distances(centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, points[:, axis], len(centers)) for axis in range(3)], axis=1)
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        converged = np.abs(moved - centers).max() < 0.5
+        centers = moved
+        if converged:
+            break
+    labels = distances(centers).argmin(axis=1)
+    counts = np.bincount(labels, minlength=len(centers))
+    order = np.argsort(-counts, kind="stable")
+    return [
+        Swatch(RGBA(*(int(round(value)) for value in centers[index])), float(counts[index] / len(points)))
+        for index in order
+        if counts[index]
+    ]
+
+
+def _saturation(color: RGBA) -> float:
+    high, low = max(color[:3]), min(color[:3])
+    return 0.0 if high == 0 else (high - low) / high
+
+
+def _mix(color: RGBA, target: RGBA, amount: float) -> RGBA:
+    return RGBA(*(round(c + (t - c) * amount) for c, t in zip(color[:3], target[:3])), color.a)
+
+
+def _with_alpha(color: RGBA, alpha: float) -> RGBA:
+    return RGBA(color.r, color.g, color.b, round(alpha, 2))
+
+
+def ensure_contrast(color: RGBA, surface: RGBA, minimum: float) -> RGBA:
+    """The closest color to ``color`` whose composite on ``surface`` reaches ``minimum``.
+
+    Alpha is raised first, then the color is moved towards black or white,
+    whichever can go further. Opaque black or white reach 4.58 on any
+    surface, so every AA threshold is reachable.
+    """
+    minimum += CONTRAST_MARGIN
+
+    def ratio(candidate: RGBA) -> float:
+        return contrast_ratio(candidate.over(surface), surface)
+
+    if ratio(color) >= minimum:
+        return color
+    if color.a < 1.0 and ratio(_with_alpha(color, 1.0)) >= minimum:
+        low, high = color.a, 1.0
+        for _ in range(10):
+            middle = (low + high) / 2
+            low, high = (low, middle) if ratio(_with_alpha(color, middle)) >= minimum else (middle, high)
+        return _with_alpha(color, high)
+    opaque = _with_alpha(color, 1.0)
+    target = max((WHITE, BLACK), key=lambda extreme: contrast_ratio(extreme, surface))
+    low, high = 0.0, 1.0
+    for _ in range(12):
+        middle = (low + high) / 2
+        low, high = (low, middle) if ratio(_mix(opaque, target, middle)) >= minimum else (middle, high)
+    return _mix(opaque, target, high)
+
+
+def _get(palette: dict, path: str) -> RGBA | None:
+    node: Any = palette
+    for part in path.split("."):
+        node = node.get(part) if isinstance(node, dict) else None
+    return parse_color(node)
+
+
+def _set(palette: dict, path: str, color: RGBA) -> None:
+    *parents, leaf = path.split(".")
+    node = palette
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = color.css()
+
+
+def apply_suggestion(theme: dict, palette: dict) -> dict:
+    """A copy of ``theme`` with the suggested sections merged in; button images are kept."""
+    merged = copy.deepcopy(theme)
+    for section in ("colors", "text", "lyric"):
+        merged.setdefault(section, {}).update(palette.get(section, {}))
+    buttons = merged.setdefault("buttons", {})
+    for name, values in palette.get("buttons", {}).items():
+        buttons.setdefault(name, {}).update(values)
+    return merged
+
+
+def _resolve(theme: dict, palette: dict) -> ResolvedPalette:
+    merged = apply_suggestion(theme, palette)
+    # The image is the app background; resolution falls back to colors.background under it.
+    merged.setdefault("backgrounds", {})["app"] = {"type": "image", "value": ""}
+    return ResolvedPalette.from_theme(merged)
+
+
+def check_palette(theme: dict, palette: dict) -> list[str]:
+    resolved = _resolve(theme, palette)
+    failures = []
+    for pair in CONTRAST_PAIRS:
+        ratio = contrast_ratio(getattr(resolved, pair.foreground), getattr(resolved, pair.background))
+        if ratio < pair.aa:
+            failures.append(f"{pair.name}: {ratio:.2f} < {pair.aa:g}")
+    return failures
+
+
+def suggest_palette(swatches: list[Swatch], theme: dict | None = None) -> tuple[dict, list[str]]:
+    """Build colors/text/lyric/buttons from ``swatches``; returns the palette and any pairs still failing."""
+    theme = theme or {}
+    if not swatches:
+        swatches = [Swatch(RGBA(0x0D, 0x12, 0x21), 1.0)]
+    background = swatches[0].color
+    large = [swatch.color for swatch in swatches if swatch.weight >= LARGE_AREA] or [background]
+    colourful = [swatch for swatch in swatches if swatch.weight >= 0.02 and _saturation(swatch.color) >= 0.2]
+    accent = (
+        max(colourful, key=lambda swatch: _saturation(swatch.color) * swatch.weight**0.5).color
+        if colourful
+        else FALLBACK_ACCENT
+    )
+
+    candidates = [_mix(WHITE, accent, 0.08), _mix(BLACK, background, 0.15)]
+    text = max(candidates, key=lambda color: min(contrast_ratio(color, area) for area in large))
+    text = ensure_contrast(text, background, 7.0)
+    accent_text = ensure_contrast(accent, background, 4.5)
+    header = ensure_contrast(accent, text, 4.5)
+    unselected = _with_alpha(text, 0.25)
+
+    palette = {
+        "colors": {
+            "theme": header.css(),
+            "background": background.css(),
+            "text_primary": text.css(),
+            "text_secondary": ensure_contrast(_with_alpha(text, 0.7), background, 4.5).css(),
+            "slider_selected": ensure_contrast(accent, unselected.over(background), 3.0).css(),
+            "slider_block": accent_text.css(),
+            "slider_unselected": unselected.css(),
+        },
+        "text": {
+            "title": text.css(),
+            "body": ensure_contrast(_with_alpha(text, 0.9), background, 4.5).css(),
+            "caption": ensure_contrast(_with_alpha(text, 0.7), background, 4.5).css(),
+            "danger": ensure_contrast(DANGER, background, 4.5).css(),
+        },
+        "lyric": {
+            "active": accent_text.css(),
+            "normal": ensure_contrast(_with_alpha(text, 0.7), background, 3.0).css(),
+            "active_bg": _with_alpha(accent, 0.2).css(),
+        },
+        "buttons": {
+            "primary": {
+                "bg": _with_alpha(accent, 0.18).css(),
+                "text": accent_text.css(),
+                "border": _with_alpha(accent, 0.6).css(),
+            },
+            "danger": {
+                "bg": _with_alpha(DANGER, 0.2).css(),
+                "text": ensure_contrast(DANGER, background, 4.5).css(),
+            },
+        },
+    }
+
+    # Translucent colors land on surfaces that depend on the theme (card, button
+    # backgrounds), so settle the remaining pairs on the resolved palette.
+    for _ in range(4):
+        resolved = _resolve(theme, palette)
+        changed = False
+        for pair in CONTRAST_PAIRS:
+            foreground = getattr(resolved, pair.foreground)
+            surface = getattr(resolved, pair.background)
+            if contrast_ratio(foreground, surface) >= pair.aa:
+                continue
+            path, against = _FIXES.get(pair.name, (pair.field, pair.background))
+            current = _get(palette, path) or getattr(resolved, pair.foreground)
+            _set(palette, path, ensure_contrast(current, getattr(resolved, against), pair.aa))
+            changed = True
+        if not changed:
+            break
+    return palette, check_palette(theme, palette)
+
+
+def _swatches_from_json(items: list) -> list[Swatch]:
+    return [Swatch(RGBA(int(r), int(g), int(b)), float(weight)) for r, g, b, weight in items]
+
+
+class PaletteSuggester:
+    """``suggest_palette`` for image files, with swatches cached by image hash."""
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir().parent / "palette"
+        self._memory: dict[str, list[Swatch]] = {}
+
+    def _cache_path(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}-v{SUGGEST_VERSION}.json"
+
+    def swatches(self, path: str | Path) -> tuple[list[Swatch], bool]:
+        data = Path(path).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._memory:
+            return self._memory[digest], True
+        cache_path = self._cache_path(digest)
+        try:
+            swatches = _swatches_from_json(json.loads(cache_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            swatches = extract_swatches(load_rgba(data, SAMPLE_SIDE))
+            items = [[*swatch.color[:3], round(swatch.weight, 4)] for swatch in swatches]
+            write_cache_file(cache_path, json.dumps(items).encode("utf-8"))
+            cached = False
+        else:
+            cached = True
+        self._memory[digest] = swatches
+        return swatches, cached
+
+    def suggest(self, path: str | Path, theme: dict | None = None) -> Suggestion:
+        started = time.perf_counter()
+        swatches, cached = self.swatches(path)
+        palette, failures = suggest_palette(swatches, theme)
+        return Suggestion(palette, swatches, time.perf_counter() - started, cached, failures)
+
+
+class SuggestionWorker:
+    """Runs ``PaletteSuggester.suggest`` on a worker thread; only the latest request is delivered.
+
+    The caller's thread only copies the theme and submits. ``callback(path,
+    suggestion, error)`` runs on the thread that calls ``after`` (the Tk
+    thread) once the newest request is done; superseded requests are
+    cancelled if not started yet and dropped if already running.
+    """
+
+    def __init__(self, suggester: PaletteSuggester, after: Callable[[int, Callable[[], None]], Any]) -> None:
+        self.suggester = suggester
+        self.after = after
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="palette")
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._futures: dict[int, Future] = {}
+        self._serial = 0
+        self._callback: Callable[[str, Suggestion | None, Exception | None], None] | None = None
+        self._polling = False
+
+    def pending(self) -> bool:
+        return self._serial in self._futures
+
+    def request(
+        self,
+        path: str | Path,
+        theme: dict,
+        callback: Callable[[str, Suggestion | None, Exception | None], None],
+    ) -> int:
+        self._serial += 1
+        self._callback = callback
+        for serial, future in list(self._futures.items()):
+            if future.cancel():
+                del self._futures[serial]
+        self._futures[self._serial] = self._pool.submit(self._work, self._serial, str(path), copy.deepcopy(theme))
+        self._schedule()
+        return self._serial
+
+    def _work(self, serial: int, path: str, theme: dict) -> None:
+        try:
+            self._results.put((serial, path, self.suggester.suggest(path, theme), None))
+        except Exception as exc:  # reported on the Tk thread
+            self._results.put((serial, path, None, exc))
+
+    def _schedule(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.after(POLL_MS, self.poll)
+
+    def poll(self) -> None:
+        self._polling = False
+        while True:
+            try:
+                serial, path, suggestion, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._futures.pop(serial, None)
+            if serial == self._serial and self._callback is not None:
+                self._callback(path, suggestion, error)
+        if self._futures:
+            self._schedule()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
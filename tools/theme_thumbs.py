@@ -0,0 +1,227 @@
+"""Display-size preview images: area-averaged thumbnails cached on disk and in memory.
+
+``make_thumbnail`` decodes an image (``theme_raster.load_rgba``), box-filters
+it to fit the preview at any ratio and returns PNG bytes. ``ThumbnailCache``
+keys those by absolute path, mtime, file size and target size, keeps them on
+disk so reopening a project skips the decode, and holds the decoded,
+ready-to-draw objects in an LRU bounded by their pixel memory.
+
+``ThumbnailLoader`` does the decoding on worker threads so the editor never
+blocks on a large background: results come back through a queue that the Tk
+thread drains from ``after`` callbacks, and a newer request supersedes the
+older ones (cancelled if not started yet, not delivered if already running).
+
+Nothing here imports Tk: the GUI passes a ``wrap`` callable that turns PNG
+bytes into a ``PhotoImage`` and an ``after(ms, callback)`` scheduler.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import queue
+import struct
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+from theme_png import default_cache_dir, write_cache_file
+from theme_raster import encode_png, load_fitted, require_numpy
+
+
+THUMB_VERSION = 1
+DEFAULT_MEMORY_BUDGET = 64 << 20
+LOADER_WORKERS = 1
+POLL_MS = 15
+
+
+class LRUCache:
+    """Mapping bounded by the total ``size`` of its values; least recently used goes first."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        # The newest entry is always kept, even when it alone is over budget.
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _key, (_value, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+
+def png_size(data: bytes) -> tuple[int, int]:
+    """Width and height from a PNG's IHDR."""
+    return struct.unpack(">II", data[16:24])
+
+
+def make_thumbnail(source: str | Path | bytes, width: int, height: int) -> bytes:
+    """PNG bytes of ``source`` area-averaged to fit ``width`` x ``height`` (never enlarged)."""
+    return encode_png(load_fitted(source, width, height))
+
+
+class ThumbnailCache:
+    """Thumbnails by (path, mtime, file size, target size): memory LRU first, then disk, then decode."""
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_bytes: int = DEFAULT_MEMORY_BUDGET,
+        wrap: Callable[[bytes], Any] | None = None,
+    ) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir().parent / "thumbs"
+        self.memory = LRUCache(max_bytes)
+        self.wrap = wrap or (lambda data: data)
+
+    @staticmethod
+    def key(path: str | Path, width: int, height: int) -> tuple:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size, int(width), int(height)
+
+    def _cache_path(self, key: tuple) -> Path:
+        digest = hashlib.sha256("\0".join(map(str, key)).encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}-v{THUMB_VERSION}.png"
+
+    def thumbnail_png(self, path: str | Path, width: int, height: int, key: tuple | None = None) -> bytes:
+        key = key or self.key(path, width, height)
+        cache_path = self._cache_path(key)
+        try:
+            return cache_path.read_bytes()
+        except OSError:
+            pass
+        data = make_thumbnail(key[0], width, height)
+        write_cache_file(cache_path, data)
+        return data
+
+    def cached(self, path: str | Path, width: int, height: int) -> Any | None:
+        """The wrapped thumbnail from memory or the disk cache; never decodes the source image."""
+        key = self.key(path, width, height)
+        value = self.memory.get(key)
+        if value is None:
+            try:
+                value = self.store(key, self._cache_path(key).read_bytes())
+            except OSError:
+                return None
+        return value
+
+    def store(self, key: tuple, data: bytes) -> Any:
+        """Wrap thumbnail PNG bytes and keep them in memory under ``key``."""
+        thumb_width, thumb_height = png_size(data)
+        value = self.wrap(data)
+        self.memory.put(key, value, thumb_width * thumb_height * 4)
+        return value
+
+    def get(self, path: str | Path, width: int, height: int) -> Any:
+        """The wrapped thumbnail; the same object is returned while the key is unchanged and cached."""
+        key = self.key(path, width, height)
+        value = self.memory.get(key)
+        if value is None:
+            value = self.store(key, self.thumbnail_png(path, width, height, key))
+        return value
+
+
+class ThumbnailLoader:
+    """Builds thumbnails on worker threads; only the latest request is delivered.
+
+    ``wrap`` and the callback run on the thread that calls ``after`` (the Tk
+    thread); the workers only decode, resize and touch the disk cache.
+    """
+
+    def __init__(
+        self,
+        cache: ThumbnailCache,
+        after: Callable[[int, Callable[[], None]], Any],
+        workers: int = LOADER_WORKERS,
+    ) -> None:
+        self.cache = cache
+        self.after = after
+        self.failed: dict[tuple, str] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._futures: dict[tuple, Future] = {}
+        self._wanted: tuple | None = None
+        self._callback: Callable[[], None] | None = None
+        self._polling = False
+
+    def pending(self, key: tuple) -> bool:
+        return key in self._futures
+
+    def request(self, path: str | Path, width: int, height: int, callback: Callable[[], None]) -> tuple:
+        """Start building a thumbnail and supersede earlier requests; ``callback`` runs once it is cached.
+
+        Raises RuntimeError without NumPy and OSError when the file cannot be
+        stat'ed. A key that already failed is not retried until it changes.
+        """
+        require_numpy()
+        key = self.cache.key(path, width, height)
+        self._wanted = key
+        self._callback = callback
+        for other, future in list(self._futures.items()):
+            if other != key and future.cancel():
+                del self._futures[other]
+        if key not in self._futures and key not in self.failed:
+            self._futures[key] = self._pool.submit(self._work, key)
+            self._schedule()
+        return key
+
+    def _work(self, key: tuple) -> None:
+        try:
+            self._results.put((key, self.cache.thumbnail_png(key[0], key[3], key[4], key), None))
+        except Exception as exc:  # reported on the Tk thread
+            self._results.put((key, None, exc))
+
+    def _schedule(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.after(POLL_MS, self.poll)
+
+    def poll(self) -> None:
+        self._polling = False
+        delivered = False
+        while True:
+            try:
+                key, data, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._futures.pop(key, None)
+            if error is None:
+                # Superseded results that finished anyway are still worth keeping.
+                try:
+                    self.cache.store(key, data)
+                except Exception as exc:  # ``wrap`` rejected the data
+                    error = exc
+            if error is not None:
+                self.failed[key] = str(error)
+            delivered = delivered or key == self._wanted
+        if delivered and self._callback is not None:
+            self._callback()
+        if self._futures:
+            self._schedule()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)